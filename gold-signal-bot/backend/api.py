@@ -5,37 +5,42 @@ Provides REST endpoints for training models and running backtests
 
 import os
 import sys
+import gzip
 import json
+import time
 import uuid
-import threading
 from datetime import datetime
 from telegram_service import telegram_service
 from live_manager import live_manager
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import traceback
 import hashlib
 
 # Add parent directory to path to import project modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import config
-from train_model import main as train_main
-from backtest import GoldBacktester
+from job_runners import JobStatus, update_job_status, bind_store, run_training_job, run_backtest_job, run_sweep_job
+from job_executor import JobExecutor, QueueFullError
+from job_store import JobStore, FINISHED_STATUSES
+from strategy_store import StrategyRepository
+from utils.downsample import downsample_points
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Angular dev server
 
-# In-memory storage for jobs (use Redis in production)
-jobs = {}
-job_results = {}
-last_training_info = {} # Store the params of the last successful training
-last_backtest_results = {} # Store last backtest for manual saving
+# Jobs run in worker processes; status, results and each user's last training/backtest
+# ('last_training_info:<user>', 'last_backtest_results:<user>') persist in the job store
+job_store = JobStore()
+bind_store(job_store)
+executor = JobExecutor(job_store, initializer=bind_store)
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
-STRATEGIES_FILE = os.path.join(DATA_DIR, 'strategies.json')
+STRATEGIES_FILE = os.path.join(DATA_DIR, 'strategies.json')  # Legacy file, imported once
 USERS_FILE = os.path.join(DATA_DIR, 'users.json')
 
+strategy_repo = StrategyRepository(legacy_json=STRATEGIES_FILE)
+
 def load_users():
     if not os.path.exists(USERS_FILE):
         return {}
@@ -50,387 +55,6 @@ def save_users(users):
     with open(USERS_FILE, 'w') as f:
         json.dump(users, f, indent=4)
 
-def save_strategy(strategy):
-    """Save a strategy to the JSON history file"""
-    strategies = []
-    if os.path.exists(STRATEGIES_FILE):
-        try:
-            with open(STRATEGIES_FILE, 'r') as f:
-                strategies = json.load(f)
-        except:
-            strategies = []
-    
-    # Check if this strategy already exists (for updates)
-    existing_idx = -1
-    for i, s in enumerate(strategies):
-        if s.get('id') == strategy.get('id'):
-            existing_idx = i
-            break
-    
-    if existing_idx >= 0:
-        strategies[existing_idx] = strategy
-    else:
-        strategies.append(strategy)
-    
-    os.makedirs(os.path.dirname(STRATEGIES_FILE), exist_ok=True)
-    with open(STRATEGIES_FILE, 'w') as f:
-        json.dump(strategies, f, indent=4)
-
-
-class JobStatus:
-    PENDING = 'pending'
-    RUNNING = 'running'
-    COMPLETED = 'completed'
-    FAILED = 'failed'
-
-
-def update_job_status(job_id, status, progress=0, message='', result=None):
-    """Update job status and store result"""
-    jobs[job_id] = {
-        'status': status,
-        'progress': progress,
-        'message': message,
-        'updated_at': datetime.now().isoformat()
-    }
-    if result:
-        job_results[job_id] = result
-
-
-def sync_config(params):
-    """Update global config with custom parameters"""
-    print(f"\n⚙️ Syncing configuration with params: {params.keys()}")
-    
-    if 'indicators' in params:
-        ind = params['indicators']
-        config.RSI_PERIOD = int(ind.get('rsi_period', config.RSI_PERIOD))
-        config.MACD_FAST = int(ind.get('macd_fast', config.MACD_FAST))
-        config.MACD_SLOW = int(ind.get('macd_slow', config.MACD_SLOW))
-        config.MACD_SIGNAL = int(ind.get('macd_signal', config.MACD_SIGNAL))
-        config.BB_PERIOD = int(ind.get('bb_period', config.BB_PERIOD))
-        config.BB_STD_DEV = float(ind.get('bb_std_dev', config.BB_STD_DEV))
-        config.ATR_PERIOD = int(ind.get('atr_period', config.ATR_PERIOD))
-        config.EMA_FAST = int(ind.get('ema_fast', config.EMA_FAST))
-        config.EMA_SLOW = int(ind.get('ema_slow', config.EMA_SLOW))
-        print(f"   Indicators updated: RSI={config.RSI_PERIOD}, MACD={config.MACD_FAST}/{config.MACD_SLOW}/{config.MACD_SIGNAL}")
-
-    if 'risk' in params:
-        risk = params['risk']
-        config.STOP_LOSS_PERCENT = float(risk.get('stop_loss_percent', config.STOP_LOSS_PERCENT))
-        config.TAKE_PROFIT_PERCENT = float(risk.get('take_profit_percent', config.TAKE_PROFIT_PERCENT))
-        config.PROB_THRESHOLD = float(risk.get('prob_threshold', config.PROB_THRESHOLD))
-        config.USE_ATR_STOPS = bool(risk.get('use_atr_stops', config.USE_ATR_STOPS))
-        config.USE_TREND_FILTER = bool(risk.get('use_trend_filter', config.USE_TREND_FILTER))
-        config.USE_VOLATILITY_FILTER = bool(risk.get('use_volatility_filter', config.USE_VOLATILITY_FILTER))
-        config.ATR_FILTER_MIN = float(risk.get('atr_filter_min', config.ATR_FILTER_MIN))
-        config.ATR_FILTER_MAX = float(risk.get('atr_filter_max', config.ATR_FILTER_MAX))
-        print(f"   Risk updated: SL={config.STOP_LOSS_PERCENT}, TP={config.TAKE_PROFIT_PERCENT}, Prob={config.PROB_THRESHOLD}")
-
-    if 'model' in params:
-        model = params['model']
-        config.MODEL_TYPE = model.get('model_type', config.MODEL_TYPE)
-        config.N_ESTIMATORS = int(model.get('n_estimators', config.N_ESTIMATORS))
-        config.MAX_DEPTH = int(model.get('max_depth', config.MAX_DEPTH))
-        config.MIN_SAMPLES_SPLIT = int(model.get('min_samples_split', config.MIN_SAMPLES_SPLIT))
-        print(f"   Model updated: Type={config.MODEL_TYPE}, Estimators={config.N_ESTIMATORS}")
-
-    if 'data' in params:
-        data = params['data']
-        if 'csv_path' in data and data['csv_path']:
-            # Handle both absolute and relative paths
-            csv_path = data['csv_path']
-            if not os.path.isabs(csv_path):
-                # Join with project root (config.BASE_DIR)
-                config.MT5_CSV_PATH = os.path.join(config.BASE_DIR, csv_path)
-            else:
-                config.MT5_CSV_PATH = csv_path
-        if 'training_period' in data:
-            config.TRAINING_PERIOD = data['training_period']
-        print(f"   Data updated: CSV={config.MT5_CSV_PATH}, Period={config.TRAINING_PERIOD}")
-
-
-def run_training_job(job_id, params):
-    """Run training in background thread"""
-    try:
-        update_job_status(job_id, JobStatus.RUNNING, 10, 'Updating configuration...')
-        
-        # Update config with custom parameters
-        sync_config(params)
-        
-        update_job_status(job_id, JobStatus.RUNNING, 30, 'Starting training...')
-        
-        # Capture training output
-        from io import StringIO
-        import contextlib
-        
-        output_buffer = StringIO()
-        
-        # Run training (this will print to console)
-        def progress_callback(msg, progress):
-            update_job_status(job_id, JobStatus.RUNNING, progress, msg)
-            
-        with contextlib.redirect_stdout(output_buffer):
-            train_main(status_callback=progress_callback)
-        
-        update_job_status(job_id, JobStatus.RUNNING, 90, 'Training complete, saving results...')
-        
-        # Read training metadata
-        metadata_path = os.path.join(config.MODEL_DIR, 'training_metadata.txt')
-        metadata = {}
-        if os.path.exists(metadata_path):
-            with open(metadata_path, 'r') as f:
-                for line in f:
-                    if ':' in line:
-                        key, value = line.strip().split(':', 1)
-                        metadata[key.strip()] = value.strip()
-        
-        result = {
-            'metadata': metadata,
-            'output': output_buffer.getvalue(),
-            'model_path': config.MODEL_PATH,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        update_job_status(job_id, JobStatus.COMPLETED, 100, 'Training completed successfully!', result)
-        
-        # Store for next backtest
-        global last_training_info
-        last_training_info = {
-            'params': params,
-            'metadata': metadata,
-            'timestamp': result['timestamp']
-        }
-        
-    except Exception as e:
-        error_msg = f"Training failed: {str(e)}\n{traceback.format_exc()}"
-        update_job_status(job_id, JobStatus.FAILED, 0, error_msg)
-
-
-def run_backtest_job(job_id, params):
-    """Run backtest in background thread"""
-    try:
-        update_job_status(job_id, JobStatus.RUNNING, 10, 'Updating configuration...')
-        
-        # Update config if needed
-        sync_config(params)
-        
-        initial_balance = float(params.get('initial_capital', 10000))
-        if 'period_days' in params:
-            config.BACKTEST_PERIOD_DAYS = int(params['period_days'])
-        
-        update_job_status(job_id, JobStatus.RUNNING, 30, 'Loading model and data...')
-        
-        # Create backtester
-        backtester = GoldBacktester(days=config.BACKTEST_PERIOD_DAYS)
-        
-        update_job_status(job_id, JobStatus.RUNNING, 50, 'Running backtest...')
-        
-        # Capture output
-        from io import StringIO
-        import contextlib
-        
-        output_buffer = StringIO()
-        
-        with contextlib.redirect_stdout(output_buffer):
-            backtester.run_backtest()
-        
-        update_job_status(job_id, JobStatus.RUNNING, 90, 'Processing results...')
-        
-        # Extract results
-        # Prepare for processing
-        pip_value = initial_balance / 10000.0 
-        
-        # Calculate metrics
-        closed_trades = [t for t in backtester.trades if t['status'] == 'Closed']
-        open_trades = [t for t in backtester.trades if t['status'] == 'Open']
-        winning_trades = [t for t in closed_trades if t['pips'] and t['pips'] > 0]
-        losing_trades = [t for t in closed_trades if t['pips'] and t['pips'] < 0]
-        
-        total_pips = sum(t['pips'] for t in closed_trades if t['pips'])
-        win_rate = (len(winning_trades) / len(closed_trades) * 100) if closed_trades else 0
-        avg_win = sum(t['pips'] for t in winning_trades) / len(winning_trades) if winning_trades else 0
-        avg_loss = sum(t['pips'] for t in losing_trades) / len(losing_trades) if losing_trades else 0
-        
-        # Calculate Profit Factor
-        gross_profit = sum(t['pips'] for t in winning_trades)
-        gross_loss = abs(sum(t['pips'] for t in losing_trades))
-        
-        if gross_loss > 0:
-            profit_factor = gross_profit / gross_loss
-        else:
-            profit_factor = float('inf') if gross_profit > 0 else 0.0
-        
-        avg_win_money = sum(t['pips'] * pip_value for t in winning_trades) / len(winning_trades) if winning_trades else 0
-        avg_loss_money = sum(t['pips'] * pip_value for t in losing_trades) / len(losing_trades) if losing_trades else 0
-
-        equity_curve = []
-        drawdown_curve = [] # NEW: Track drawdown over time
-        current_balance = initial_balance
-        equity_curve.append({
-            'timestamp': 'Start',
-            'balance': current_balance,
-            'pips': 0
-        })
-        
-        monthly_profits = {} # month_str -> total_profit_money
-        
-        total_profit_money = 0
-        cumulative_pips = 0
-        
-        # Max Drawdown tracking
-        peak_balance = initial_balance
-        max_drawdown_amount = 0.0
-        max_drawdown_percent = 0.0
-        
-        
-        # Calculate daily returns for Max Daily Drawdown
-        daily_closing_balances = {}
-        
-        # Helper to get the best timestamp for P&L tracking (Closing time)
-        def get_pl_timestamp(t):
-            return t.get('close_timestamp') or t['timestamp']
-
-        for trade in sorted(closed_trades, key=get_pl_timestamp):
-            if trade['pips'] is not None:
-                profit_money = trade['pips'] * pip_value
-                current_balance += profit_money
-                total_profit_money += profit_money
-                cumulative_pips += trade['pips']
-                
-                # Drawdown Calculation
-                dd_percent = 0.0
-                if current_balance > peak_balance:
-                    peak_balance = current_balance
-                else:
-                    drawdown = peak_balance - current_balance
-                    max_drawdown_amount = max(max_drawdown_amount, drawdown)
-                    if peak_balance > 0:
-                        dd_percent = (drawdown / peak_balance) * 100
-                        max_drawdown_percent = max(max_drawdown_percent, dd_percent)
-                
-                ts = get_pl_timestamp(trade)
-                
-                # Update daily closing balance (latest trade on that day wins)
-                daily_closing_balances[ts.date()] = current_balance
-
-                month_key = ts.strftime('%Y-%m') if hasattr(ts, 'strftime') else str(ts)[:7]
-                monthly_profits[month_key] = monthly_profits.get(month_key, 0) + profit_money
-                
-                equity_curve.append({
-                    'timestamp': ts.isoformat() if hasattr(ts, 'isoformat') else str(ts),
-                    'balance': round(current_balance, 2),
-                    'pips': round(cumulative_pips, 2) 
-                })
-                
-                drawdown_curve.append({
-                    'timestamp': ts.isoformat() if hasattr(ts, 'isoformat') else str(ts),
-                    'drawdown': round(dd_percent, 2)
-                })
-                
-                # Update the trade record in trades_data with the calculated profit_money
-                trade['profit_money'] = round(profit_money, 2)
-
-        # Calculate Daily Performance (Profit, Count, Percent)
-        daily_perf_data = {}
-        sorted_days = sorted(daily_closing_balances.keys())
-        prev_running_balance = initial_balance
-        
-        for day in sorted_days:
-            close_bal = daily_closing_balances[day]
-            profit_today = close_bal - prev_running_balance
-            
-            # Use INITIAL BALANCE as divisor for Daily ROI (to match user expectations)
-            # If he prefers compounded, it would be divided by prev_running_balance
-            percent_today = (profit_today / initial_balance) * 100
-            
-            # Count trades for this day based on get_pl_timestamp
-            trades_today = [t for t in closed_trades if get_pl_timestamp(t).date() == day]
-            
-            daily_perf_data[day.isoformat()] = {
-                'profit': round(profit_today, 2),
-                'percent': round(percent_today, 2),
-                'count': len(trades_today)
-            }
-            prev_running_balance = close_bal
-
-        # Build final trades data for response (now that profit_money is calculated)
-        trades_data = []
-        for trade in backtester.trades:
-            # Use same timestamp logic for status consistency if possible
-            close_ts = trade.get('close_timestamp')
-            trades_data.append({
-                'timestamp': trade['timestamp'].isoformat() if hasattr(trade['timestamp'], 'isoformat') else str(trade['timestamp']),
-                'type': trade['type'],
-                'entry_price': float(trade['entry_price']),
-                'sl': float(trade['sl']),
-                'tp': float(trade['tp']),
-                'close_price': float(trade['close_price']) if trade['close_price'] else None,
-                'close_timestamp': close_ts.isoformat() if close_ts and hasattr(close_ts, 'isoformat') else str(close_ts) if close_ts else None,
-                'close_reason': trade['close_reason'],
-                'pips': float(trade['pips']) if trade['pips'] else None,
-                'profit_money': float(trade['profit_money']) if 'profit_money' in trade else 0.0,
-                'status': trade['status'],
-                'confidence': float(trade['confidence'])
-            })
-
-        # Calculate Max Daily Drawdown (Worst Daily Return %)
-        worst_daily_return_percent = 0.0
-        for day_data in daily_perf_data.values():
-            if day_data['percent'] < worst_daily_return_percent:
-                worst_daily_return_percent = day_data['percent']
-
-        # Convert monthly profits to percentages
-        monthly_perf = []
-        for month in sorted(monthly_profits.keys()):
-            percent_gain = (monthly_profits[month] / initial_balance) * 100
-            monthly_perf.append({
-                'month': month,
-                'percent': round(percent_gain, 2),
-                'profit': round(monthly_profits[month], 2)
-            })
-            
-        result = {
-            'trades': trades_data,
-            'metrics': {
-                'initial_balance': initial_balance,
-                'final_balance': round(current_balance, 2),
-                'total_profit_money': round(total_profit_money, 2),
-                'total_pips': round(total_pips, 2),
-                'total_trades': len(backtester.trades),
-                'closed_trades': len(closed_trades),
-                'open_trades': len(open_trades),
-                'winning_trades': len(winning_trades),
-                'losing_trades': len(losing_trades),
-                'win_rate': round(win_rate, 2),
-                'avg_win': round(avg_win, 2),
-                'avg_loss': round(avg_loss, 2),
-                'profit_factor': round(profit_factor, 2) if profit_factor != float('inf') else 999.99,
-                'avg_win_money': round(avg_win_money, 2),
-                'avg_loss_money': round(avg_loss_money, 2),
-                'period_days': config.BACKTEST_PERIOD_DAYS,
-                'max_drawdown_amount': round(max_drawdown_amount, 2),
-                'max_drawdown_percent': round(max_drawdown_percent, 2),
-                'max_daily_drawdown_percent': round(worst_daily_return_percent, 2)
-            },
-            'equity_curve': equity_curve,
-            'drawdown_curve': drawdown_curve,
-            'monthly_performance': monthly_perf,
-            'daily_performance': daily_perf_data,
-            'output': output_buffer.getvalue(),
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        update_job_status(job_id, JobStatus.COMPLETED, 100, 'Backtest completed successfully!', result)
-        
-        # Store backtest results globally for manual saving
-        # We don't save automatically anymore
-        global last_backtest_results
-        last_backtest_results = result
-        
-    except Exception as e:
-        error_msg = f"Backtest failed: {str(e)}\n{traceback.format_exc()}"
-        update_job_status(job_id, JobStatus.FAILED, 0, error_msg)
-
-
 # ==================== API ENDPOINTS ====================
 
 @app.route('/api/health', methods=['GET'])
@@ -505,23 +129,227 @@ def get_data_files():
     return jsonify({'files': files_with_info})
 
 
+def request_user():
+    """User key for per-user job limits (mock token, else client address)"""
+    user_id = request.headers.get('Authorization', '').replace('Bearer mock-token-', '')
+    return user_id or request.remote_addr
+
+
+def submit_job(fn, params, label):
+    """Queue a job on the executor and return the API response"""
+    job_id = str(uuid.uuid4())
+    executor.start()
+    
+    # Jobs find the submitting user's own artifacts (e.g. a backtest loads their last trained model)
+    params = dict(params or {}, user=request_user())
+    
+    # Initialize job
+    update_job_status(job_id, JobStatus.PENDING, 0, f'{label} job queued')
+    
+    try:
+        position = executor.submit(job_id, fn, params, user=params['user'],
+                                   priority=int(params.get('priority', 0)))
+    except QueueFullError as e:
+        job_store.delete(job_id)
+        return jsonify({'error': str(e)}), 429
+    
+    return jsonify({'job_id': job_id, 'status': 'started', 'queue_position': position}), 202
+
+
+def job_status_response(job_id):
+    """Status entry (with queue position while waiting) or 404"""
+    status = executor.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(status)
+
+
+# Curves that ?points= downsamples, with the value each one plots
+CURVE_FIELDS = {'equity_curve': 'balance', 'drawdown_curve': 'drawdown'}
+
+
+def json_response(payload, etag):
+    """JSON response with a (weak) ETag, gzip-compressed when the client accepts it"""
+    body = app.json.dumps(payload).encode('utf-8')
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Accept-Encoding')
+    if ('gzip' in request.headers.get('Accept-Encoding', '')
+            and len(body) >= getattr(config, 'RESULTS_GZIP_MIN_BYTES', 1024)):
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def result_etag(job_id, entry):
+    """ETag for a view of a job's results (stored results don't change once written)"""
+    query = sorted(request.args.items(multi=True))
+    key = f"{job_id}|{entry.get('updated_at')}|{query}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def not_modified(etag):
+    """304 response when the client already holds this view"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    return None
+
+
+def job_results_response(job_id):
+    """
+    Stored job results or 404
+    
+    Query parameters:
+        fields: Comma-separated top-level fields to return (others aren't loaded)
+        exclude: Comma-separated fields to leave out (e.g. 'output,trades')
+        points: Point budget for the equity/drawdown curves (LTTB downsampling)
+    """
+    entry = job_store.get_status(job_id)
+    if entry is None or not job_store.has_result(job_id):
+        return jsonify({'error': 'Results not found'}), 404
+    
+    etag = result_etag(job_id, entry)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    fields = None
+    if request.args.get('fields'):
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+    if request.args.get('exclude'):
+        exclude = {f.strip() for f in request.args['exclude'].split(',')}
+        fields = [f for f in (fields or job_store.result_fields(job_id)) if f not in exclude]
+    result = job_store.get_result(job_id, fields)
+    
+    points = request.args.get('points', type=int)
+    if points:
+        for field, y_key in CURVE_FIELDS.items():
+            if isinstance(result.get(field), list):
+                result[field] = downsample_points(result[field], y_key, max(points, 3))
+    
+    return json_response(result, etag)
+
+
+def job_trades_response(job_id):
+    """
+    One page of a job's trades
+    
+    Query parameters:
+        cursor: Opaque cursor from the previous page's next_cursor (omit for the first page)
+        limit: Page size (default config.RESULTS_PAGE_SIZE, capped at config.RESULTS_MAX_PAGE_SIZE)
+    """
+    entry = job_store.get_status(job_id)
+    if entry is None or not job_store.has_result(job_id):
+        return jsonify({'error': 'Results not found'}), 404
+    
+    page_size = getattr(config, 'RESULTS_PAGE_SIZE', 100)
+    limit = request.args.get('limit', page_size, type=int)
+    limit = max(1, min(limit, getattr(config, 'RESULTS_MAX_PAGE_SIZE', 1000)))
+    try:
+        offset = int(request.args.get('cursor') or 0)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    etag = result_etag(job_id, entry)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    # Only the stored chunks this page spans are read and decompressed
+    page, total = job_store.get_list_slice(job_id, 'trades', max(offset, 0), limit) or ([], 0)
+    next_offset = max(offset, 0) + len(page)
+    return json_response({
+        'trades': page,
+        'total': total,
+        'next_cursor': str(next_offset) if next_offset < total else None
+    }, etag)
+
+
+def sse_event(kind, data, event_id=None):
+    """Format one Server-Sent Event"""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {kind}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def job_event_stream(job_id, after):
+    """
+    Tail a job's events from the store until its final status
+    
+    Events: 'status' (status entry), 'log' ({'line'}), 'stats' (partial
+    backtest numbers) and 'queue' (queue position while waiting). Event ids
+    are store sequence numbers, so a reconnecting client resumes from
+    Last-Event-ID instead of replaying the whole job.
+    """
+    poll = getattr(config, 'JOB_EVENTS_POLL_SECONDS', 0.25)
+    keepalive = getattr(config, 'JOB_EVENTS_KEEPALIVE_SECONDS', 15)
+    last_write = time.time()
+    last_position = None
+    
+    yield 'retry: 2000\n\n'
+    while True:
+        events = job_store.get_events(job_id, after)
+        for seq, kind, data in events:
+            after = seq
+            yield sse_event(kind, data, seq)
+            if kind == 'status' and data.get('status') in FINISHED_STATUSES:
+                return
+        
+        position = executor.queue_position(job_id)
+        if position != last_position:
+            last_position = position
+            if position is not None:
+                yield sse_event('queue', {'queue_position': position, 'queue_length': executor.queue_length})
+                last_write = time.time()
+        
+        if events:
+            last_write = time.time()
+        else:
+            # Final status events may have been evicted; stop on the stored status
+            entry = job_store.get_status(job_id)
+            if entry is None or entry.get('status') in FINISHED_STATUSES:
+                if entry is not None:
+                    yield sse_event('status', entry)
+                return
+            if time.time() - last_write >= keepalive:
+                yield ': keepalive\n\n'
+                last_write = time.time()
+        
+        time.sleep(poll)
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+@app.route('/api/train/events/<job_id>', methods=['GET'])
+@app.route('/api/backtest/events/<job_id>', methods=['GET'])
+@app.route('/api/sweep/events/<job_id>', methods=['GET'])
+def stream_job_events(job_id):
+    """Stream job progress as Server-Sent Events"""
+    if job_store.get_status(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    after = request.headers.get('Last-Event-ID') or request.args.get('after') or 0
+    try:
+        after = int(after)
+    except ValueError:
+        after = 0
+    
+    return Response(
+        stream_with_context(job_event_stream(job_id, after)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/api/train', methods=['POST'])
 def start_training():
     """Start model training with custom parameters"""
     try:
-        params = request.get_json()
-        job_id = str(uuid.uuid4())
-        
-        # Initialize job
-        update_job_status(job_id, JobStatus.PENDING, 0, 'Training job queued')
-        
-        # Start training in background thread
-        thread = threading.Thread(target=run_training_job, args=(job_id, params))
-        thread.daemon = True
-        thread.start()
-        
-        return jsonify({'job_id': job_id, 'status': 'started'}), 202
-        
+        return submit_job(run_training_job, request.get_json(), 'Training')
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -529,38 +357,20 @@ def start_training():
 @app.route('/api/train/status/<job_id>', methods=['GET'])
 def get_training_status(job_id):
     """Get training job status"""
-    if job_id not in jobs:
-        return jsonify({'error': 'Job not found'}), 404
-    
-    return jsonify(jobs[job_id])
+    return job_status_response(job_id)
 
 
 @app.route('/api/train/results/<job_id>', methods=['GET'])
 def get_training_results(job_id):
     """Get training results"""
-    if job_id not in job_results:
-        return jsonify({'error': 'Results not found'}), 404
-    
-    return jsonify(job_results[job_id])
+    return job_results_response(job_id)
 
 
 @app.route('/api/backtest', methods=['POST'])
 def start_backtest():
     """Start backtest with parameters"""
     try:
-        params = request.get_json()
-        job_id = str(uuid.uuid4())
-        
-        # Initialize job
-        update_job_status(job_id, JobStatus.PENDING, 0, 'Backtest job queued')
-        
-        # Start backtest in background thread
-        thread = threading.Thread(target=run_backtest_job, args=(job_id, params))
-        thread.daemon = True
-        thread.start()
-        
-        return jsonify({'job_id': job_id, 'status': 'started'}), 202
-        
+        return submit_job(run_backtest_job, request.get_json(), 'Backtest')
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
@@ -568,19 +378,55 @@ def start_backtest():
 @app.route('/api/backtest/status/<job_id>', methods=['GET'])
 def get_backtest_status(job_id):
     """Get backtest job status"""
-    if job_id not in jobs:
-        return jsonify({'error': 'Job not found'}), 404
-    
-    return jsonify(jobs[job_id])
+    return job_status_response(job_id)
 
 
 @app.route('/api/backtest/results/<job_id>', methods=['GET'])
 def get_backtest_results(job_id):
     """Get backtest results"""
-    if job_id not in job_results:
-        return jsonify({'error': 'Results not found'}), 404
+    return job_results_response(job_id)
+
+
+@app.route('/api/backtest/results/<job_id>/trades', methods=['GET'])
+def get_backtest_trades(job_id):
+    """Get backtest trades page by page"""
+    return job_trades_response(job_id)
+
+
+@app.route('/api/sweep', methods=['POST'])
+def start_sweep():
+    """Start a hyperparameter sweep (grid or random search with successive halving)"""
+    try:
+        params = request.get_json()
+        if not params or not params.get('space'):
+            return jsonify({'error': 'Search space required'}), 400
+        return submit_job(run_sweep_job, params, 'Sweep')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@app.route('/api/sweep/status/<job_id>', methods=['GET'])
+def get_sweep_status(job_id):
+    """Get sweep job status with the current leaderboard"""
+    return job_status_response(job_id)
+
+
+@app.route('/api/sweep/results/<job_id>', methods=['GET'])
+def get_sweep_results(job_id):
+    """Get full sweep results"""
+    return job_results_response(job_id)
+
+
+@app.route('/api/train/cancel/<job_id>', methods=['POST'])
+@app.route('/api/backtest/cancel/<job_id>', methods=['POST'])
+@app.route('/api/sweep/cancel/<job_id>', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel one of the requesting user's queued or running jobs"""
+    # Other users' jobs are reported as not found
+    if not executor.is_started or not executor.cancel(job_id, user=request_user()):
+        return jsonify({'error': 'Job not found or already finished'}), 404
     
-    return jsonify(job_results[job_id])
+    return jsonify({'job_id': job_id, 'status': JobStatus.CANCELLED})
 
 
 # ==================== AUTH ENDPOINTS ====================
@@ -642,16 +488,8 @@ def login():
 @app.route('/api/strategies', methods=['GET'])
 def get_strategies():
     """Get all PUBLIC (published) strategies"""
-    if not os.path.exists(STRATEGIES_FILE):
-        return jsonify([])
-    
     try:
-        with open(STRATEGIES_FILE, 'r') as f:
-            strategies = json.load(f)
-        
-        # Filter only published ones
-        published = [s for s in strategies if s.get('is_published', False)]
-        return jsonify(published[::-1]) # Return newest first
+        return jsonify(strategy_repo.list_published())  # Newest first
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -663,18 +501,21 @@ def get_my_strategies():
     if not user_id:
         return jsonify({'error': 'Unauthorized'}), 401
         
-    if not os.path.exists(STRATEGIES_FILE):
-        return jsonify([])
-        
     try:
-        with open(STRATEGIES_FILE, 'r') as f:
-            strategies = json.load(f)
-        
-        my_strategies = [s for s in strategies if s.get('owner_id') == user_id]
-        return jsonify(my_strategies[::-1])
+        return jsonify(strategy_repo.list_by_owner(user_id))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/strategies/<strategy_id>', methods=['GET'])
+def get_strategy(strategy_id):
+    """Get one strategy with its full backtest (listings carry a summary only)"""
+    user_id = request.headers.get('Authorization', '').replace('Bearer mock-token-', '')
+    strategy = strategy_repo.get(strategy_id)
+    if strategy is None or not (strategy.get('is_published') or (user_id and strategy.get('owner_id') == user_id)):
+        return jsonify({'error': 'Strategy not found'}), 404
+    
+    return jsonify(strategy)
+
 @app.route('/api/strategies/save', methods=['POST'])
 def save_personal_strategy():
     """Manually save a strategy from the last backtest"""
@@ -688,6 +529,9 @@ def save_personal_strategy():
     if not strategy_name:
         return jsonify({'error': 'Strategy name required'}), 400
         
+    # Only this user's own training and backtest (jobs are keyed by request_user)
+    last_training_info = job_store.get_state(f'last_training_info:{request_user()}')
+    last_backtest_results = job_store.get_state(f'last_backtest_results:{request_user()}')
     if not last_training_info or not last_backtest_results:
         return jsonify({'error': 'No recent backtest results to save'}), 400
         
@@ -701,7 +545,7 @@ def save_personal_strategy():
         'created_at': datetime.now().isoformat()
     }
     
-    save_strategy(strategy)
+    strategy_repo.save(strategy)
     return jsonify({"status": "success", "strategy": strategy})
 
 @app.route('/api/strategies/publish', methods=['POST'])
@@ -710,23 +554,9 @@ def publish_strategy():
     data = request.get_json()
     strategy_id = data.get('strategy_id')
     
-    strategies = []
-    if os.path.exists(STRATEGIES_FILE):
-        with open(STRATEGIES_FILE, 'r') as f:
-            strategies = json.load(f)
-            
-    found = False
-    for s in strategies:
-        if s.get('id') == strategy_id and s.get('owner_id') == user_id:
-            s['is_published'] = not s.get('is_published', False)
-            found = True
-            break
-            
-    if found:
-        # Sort and save
-        with open(STRATEGIES_FILE, 'w') as f:
-            json.dump(strategies, f, indent=4)
-        return jsonify({"status": "success", "is_published": s['is_published']})
+    is_published = strategy_repo.set_flag(strategy_id, 'is_published', owner_id=user_id)
+    if is_published is not None:
+        return jsonify({"status": "success", "is_published": is_published})
         
     return jsonify({"error": "Strategy not found or unauthorized"}), 404
 
@@ -735,16 +565,7 @@ def remove_strategy():
     user_id = request.headers.get('Authorization', '').replace('Bearer mock-token-', '')
     strategy_id = request.args.get('strategy_id')
     
-    strategies = []
-    if os.path.exists(STRATEGIES_FILE):
-        with open(STRATEGIES_FILE, 'r') as f:
-            strategies = json.load(f)
-            
-    new_strategies = [s for s in strategies if not (s.get('id') == strategy_id and s.get('owner_id') == user_id)]
-    
-    if len(new_strategies) < len(strategies):
-        with open(STRATEGIES_FILE, 'w') as f:
-            json.dump(new_strategies, f, indent=4)
+    if strategy_repo.delete(strategy_id, owner_id=user_id):
         return jsonify({"status": "success"})
         
     return jsonify({"error": "Strategy not found or unauthorized"}), 404
@@ -752,32 +573,16 @@ def remove_strategy():
 
 @app.route('/api/strategies/<strategy_id>/toggle-live', methods=['POST'])
 def toggle_strategy_live(strategy_id):
-    strategies = []
-    if os.path.exists(STRATEGIES_FILE):
-        with open(STRATEGIES_FILE, 'r') as f:
-            strategies = json.load(f)
-    
-    found = False
-    for s in strategies:
-        # We need a way to identify strategies. Let's assume they have a 'id' or use timestamp.
-        # For now, let's use the timestamp as ID if 'id' field isn't there.
-        s_id = s.get('id') or s.get('backtest', {}).get('timestamp')
-        if s_id == strategy_id:
-            s['is_live'] = not s.get('is_live', False)
-            found = True
-            
-            if s['is_live']:
-                live_manager.start_monitoring(strategy_id, s)
-            else:
-                live_manager.stop_monitoring(strategy_id)
-            break
-    
-    if found:
-        with open(STRATEGIES_FILE, 'w') as f:
-            json.dump(strategies, f, indent=4)
-        return jsonify({"status": "success", "is_live": s['is_live']})
-    
-    return jsonify({"error": "Strategy not found"}), 404
+    # Legacy strategies without an 'id' are keyed by their backtest timestamp
+    is_live = strategy_repo.set_flag(strategy_id, 'is_live')
+    if is_live is None:
+        return jsonify({"error": "Strategy not found"}), 404
+    
+    if is_live:
+        live_manager.start_monitoring(strategy_id, strategy_repo.get(strategy_id))
+    else:
+        live_manager.stop_monitoring(strategy_id)
+    return jsonify({"status": "success", "is_live": is_live})
 
 @app.route('/api/strategies/telegram-link/<strategy_id>', methods=['GET'])
 def get_telegram_link(strategy_id):
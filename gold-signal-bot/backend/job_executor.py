@@ -0,0 +1,377 @@
+"""
+Job Executor for Gold Signal Bot API
+Runs training/backtest jobs on a fixed pool of worker processes fed from a
+bounded priority queue, with per-user concurrency limits and cancellation.
+Job status lives in a JobStore that the web process and the workers share.
+"""
+
+import os
+import sys
+import heapq
+import atexit
+import signal
+import itertools
+import threading
+import traceback
+import multiprocessing
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class JobCancelled(BaseException):
+    """Raised in a worker when its job is cancelled (BaseException, so job code can't swallow it)"""
+
+
+# pid of the worker whose SIGTERM handler is installed (forked pool children inherit the handler)
+_worker_pid = None
+
+
+def _cancel_running_job(signum, frame):
+    """
+    Worker SIGTERM handler: stop the job's nested process pools and unwind it
+    
+    Pool children are terminated first so the pools shut down at once; the
+    exception then runs the job's finally blocks, which unlink its shared
+    memory segments.
+    """
+    if os.getpid() != _worker_pid:
+        # A forked pool child: die as SIGTERM normally would
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        os.kill(os.getpid(), signal.SIGTERM)
+        return
+    for child in multiprocessing.active_children():
+        child.terminate()
+    raise JobCancelled()
+
+
+def _kill_process_group(pgid, sig):
+    """Signal a worker's process group (no-op where process groups are unavailable)"""
+    if not hasattr(os, 'killpg'):
+        return
+    try:
+        os.killpg(pgid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _worker_main(conn, initializer, initargs):
+    """Worker process loop: run one job at a time as the dispatcher sends them"""
+    global _worker_pid
+    # Own process group, so cancellation can reach the pools a job starts
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    _worker_pid = os.getpid()
+    signal.signal(signal.SIGTERM, _cancel_running_job)
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError, JobCancelled):
+            break
+        if task is None:
+            break
+        job_id, fn, params = task
+        try:
+            fn(job_id, params)
+        except JobCancelled:
+            break
+        except Exception:
+            traceback.print_exc()
+        try:
+            conn.send(('done', job_id))
+        except (EOFError, OSError):
+            break
+
+
+class _WorkerSlot:
+    """One worker process and the job it is running"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.job_id = None
+        self.retired = False  # Being terminated; never receives new jobs
+
+
+class JobExecutor:
+    """
+    Bounded priority queue in front of a pool of worker processes
+
+    Jobs are dispatched highest priority first (FIFO within a priority),
+    skipping jobs whose user already runs the maximum number of jobs.
+    Running jobs are cancelled by terminating their worker together with
+    any processes it started; the worker is then replaced. The pool and the
+    shared store start on first use.
+    """
+
+    def __init__(self, store, max_workers=None, max_queue=None, per_user_limit=None,
+                 start_method=None, initializer=None):
+        """
+        Initialize executor
+
+        Args:
+            store: JobStore holding job status and results
+            max_workers: Worker processes (default config.JOB_WORKERS)
+            max_queue: Maximum queued (not yet running) jobs (default config.JOB_QUEUE_SIZE)
+            per_user_limit: Concurrent running jobs per user (default config.JOB_USER_CONCURRENCY)
+            start_method: multiprocessing start method (default config.JOB_START_METHOD)
+            initializer: Callable run in each worker (and in this process) with the store
+        """
+        self.max_workers = max_workers or getattr(config, 'JOB_WORKERS', 2)
+        self.max_queue = max_queue or getattr(config, 'JOB_QUEUE_SIZE', 20)
+        self.per_user_limit = per_user_limit or getattr(config, 'JOB_USER_CONCURRENCY', 1)
+        self.start_method = start_method or getattr(config, 'JOB_START_METHOD', 'spawn')
+        self.store = store
+        self.initializer = initializer
+
+        self._ctx = multiprocessing.get_context(self.start_method)
+        self._lock = threading.Condition()
+        self._seq = itertools.count()
+        self._queue = []            # heap of (-priority, seq, job_id)
+        self._pending = {}          # job_id -> (fn, params, user)
+        self._running = {}          # job_id -> (_WorkerSlot, user)
+        self._user_running = {}     # user -> running job count
+        self._slots = []
+        self._started = False
+        self._closed = False
+
+    # ---------- lifecycle ----------
+
+    @property
+    def is_started(self):
+        return self._started
+
+    def start(self):
+        """Start the worker processes (idempotent)"""
+        with self._lock:
+            if self._started:
+                return
+            stale = self.store.fail_unfinished('Server restarted before the job finished')
+            if stale:
+                print(f"⚠️ Marked {stale} unfinished jobs from a previous run as failed")
+            if self.initializer is not None:
+                self.initializer(self.store)
+            for _ in range(self.max_workers):
+                self._slots.append(self._spawn_slot())
+            self._started = True
+            atexit.register(self.shutdown)
+        print(f"⚙️ Job executor started: {self.max_workers} workers ({self.start_method}), "
+              f"queue={self.max_queue}, per-user={self.per_user_limit}")
+
+    def shutdown(self):
+        """Stop all workers"""
+        with self._lock:
+            if not self._started or self._closed:
+                return
+            self._closed = True
+            slots = list(self._slots)
+        stoppers = [threading.Thread(target=self._stop_slot, args=(slot, 5)) for slot in slots]
+        for stopper in stoppers:
+            stopper.start()
+        for stopper in stoppers:
+            stopper.join()
+
+    def _stop_slot(self, slot, grace=None):
+        """
+        Stop a worker and every process it started
+        
+        SIGTERM lets the worker shut down its job's pools and unlink shared
+        memory; whatever is left in its process group afterwards is killed.
+        """
+        if grace is None:
+            grace = getattr(config, 'JOB_CANCEL_GRACE_SECONDS', 10)
+        process = slot.process
+        if process.is_alive():
+            process.terminate()
+        process.join(timeout=grace)
+        if process.is_alive():
+            _kill_process_group(process.pid, signal.SIGKILL)
+            process.kill()
+            process.join(timeout=5)
+        else:
+            # Pool children that outlived the worker (the resource tracker ignores SIGTERM)
+            _kill_process_group(process.pid, signal.SIGTERM)
+
+    def _spawn_slot(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.initializer, (self.store,)),
+            daemon=False  # Jobs may start their own process pools
+        )
+        process.start()
+        child_conn.close()
+        slot = _WorkerSlot(process, parent_conn)
+        threading.Thread(target=self._watch_slot, args=(slot,), daemon=True).start()
+        return slot
+
+    def _watch_slot(self, slot):
+        """Collect job completions from one worker; replace it if it exits"""
+        while True:
+            try:
+                kind, job_id = slot.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                if kind == 'done' and slot.job_id == job_id:
+                    self._release_locked(slot)
+                    self._dispatch_locked()
+
+        with self._lock:
+            job_id = slot.job_id
+            if job_id is not None:
+                # Died mid-job without being cancelled
+                self._release_locked(slot)
+                entry = self.store.get_status(job_id) or {}
+                if entry.get('status') not in ('completed', 'failed', 'cancelled'):
+                    self._set_status_locked(job_id, 'failed', 'Worker process exited unexpectedly')
+            if slot in self._slots:
+                self._slots.remove(slot)
+                if not self._closed:
+                    self._slots.append(self._spawn_slot())
+                    self._dispatch_locked()
+
+    # ---------- scheduling ----------
+
+    def submit(self, job_id, fn, params, user=None, priority=0):
+        """
+        Queue a job
+
+        Args:
+            job_id: Job identifier (its status entry must already exist)
+            fn: Picklable module-level callable fn(job_id, params)
+            params: Job parameters
+            user: User key for concurrency limits
+            priority: Higher runs sooner
+
+        Returns:
+            int: 1-based queue position at submission
+
+        Raises:
+            QueueFullError: When max_queue jobs are already waiting
+        """
+        self.start()
+        with self._lock:
+            if len(self._pending) >= self.max_queue:
+                raise QueueFullError(f"Job queue is full ({self.max_queue} jobs waiting)")
+            self._pending[job_id] = (fn, params, user)
+            heapq.heappush(self._queue, (-int(priority), next(self._seq), job_id))
+            self._dispatch_locked()
+            return self._queue_position_locked(job_id)
+
+    def cancel(self, job_id, user=None):
+        """
+        Cancel a queued or running job
+
+        Args:
+            job_id: Job identifier
+            user: When given, only a job submitted by this user is cancelled
+
+        Returns:
+            bool: True if the job was queued or running (and owned by user)
+        """
+        with self._lock:
+            if user is not None and self._job_user_locked(job_id) != user:
+                return False
+            if job_id in self._pending:
+                del self._pending[job_id]
+                self._queue = [item for item in self._queue if item[2] != job_id]
+                heapq.heapify(self._queue)
+                self._set_status_locked(job_id, 'cancelled', 'Job cancelled before it started')
+                return True
+            if job_id in self._running:
+                slot, _ = self._running[job_id]
+                self._set_status_locked(job_id, 'cancelled', 'Job cancelled')
+                self._release_locked(slot)
+                slot.retired = True
+                # _watch_slot replaces the worker once it has exited
+                threading.Thread(target=self._stop_slot, args=(slot,), daemon=True).start()
+                return True
+            return False
+
+    def _job_user_locked(self, job_id):
+        """User that submitted a queued or running job (None otherwise)"""
+        if job_id in self._pending:
+            return self._pending[job_id][2]
+        if job_id in self._running:
+            return self._running[job_id][1]
+        return None
+
+    def queue_position(self, job_id):
+        """1-based position among queued jobs, or None if not queued"""
+        with self._lock:
+            return self._queue_position_locked(job_id)
+
+    @property
+    def queue_length(self):
+        """Number of queued (not yet running) jobs"""
+        return len(self._pending)
+
+    def status(self, job_id):
+        """Job status entry plus 'queue_position' while queued, or None"""
+        entry = self.store.get_status(job_id)
+        if entry is None:
+            return None
+        position = self.queue_position(job_id)
+        if position is not None:
+            entry['queue_position'] = position
+            entry['queue_length'] = self.queue_length
+        return entry
+
+    def _queue_position_locked(self, job_id):
+        if job_id not in self._pending:
+            return None
+        for position, (_, _, queued_id) in enumerate(sorted(self._queue), 1):
+            if queued_id == job_id:
+                return position
+        return None
+
+    def _dispatch_locked(self):
+        """Hand queued jobs to idle workers, respecting per-user limits"""
+        idle = [slot for slot in self._slots
+                if slot.job_id is None and not slot.retired and slot.process.is_alive()]
+        if not idle or not self._queue:
+            return
+        deferred = []
+        while idle and self._queue:
+            item = heapq.heappop(self._queue)
+            job_id = item[2]
+            fn, params, user = self._pending[job_id]
+            if user is not None and self._user_running.get(user, 0) >= self.per_user_limit:
+                deferred.append(item)
+                continue
+            slot = idle.pop()
+            try:
+                slot.conn.send((job_id, fn, params))
+            except (EOFError, OSError):
+                deferred.append(item)  # Worker is being replaced; retry later
+                continue
+            del self._pending[job_id]
+            slot.job_id = job_id
+            self._running[job_id] = (slot, user)
+            if user is not None:
+                self._user_running[user] = self._user_running.get(user, 0) + 1
+        for item in deferred:
+            heapq.heappush(self._queue, item)
+
+    def _release_locked(self, slot):
+        job_id = slot.job_id
+        slot.job_id = None
+        _, user = self._running.pop(job_id, (None, None))
+        if user is not None:
+            self._user_running[user] -= 1
+            if self._user_running[user] <= 0:
+                del self._user_running[user]
+
+    def _set_status_locked(self, job_id, status, message):
+        entry = self.store.get_status(job_id) or {}
+        entry.update(status=status, message=message, updated_at=datetime.now().isoformat())
+        self.store.set_status(job_id, entry)
@@ -0,0 +1,499 @@
+"""
+Job Runners for Gold Signal Bot API
+Training, backtest and sweep jobs executed by the job executor's worker
+processes; status, results and progress events go to the persistent job store
+"""
+
+import os
+import sys
+import time
+import shutil
+import threading
+import contextlib
+import contextvars
+import traceback
+from io import StringIO
+from datetime import datetime
+import numpy as np
+
+# Add parent directory to path to import project modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from train_model import main as train_main, fetch_training_data
+from backtest import GoldBacktester
+from sweep import run_sweep
+from utils.settings import Settings
+from utils.backtest_analytics import pips_summary, equity_report
+
+# JobStore shared with the web process (set by bind_store)
+store = None
+
+
+def bind_store(job_store):
+    """Attach the job store (called in the web process and in every worker)"""
+    global store
+    store = job_store
+
+
+class JobStatus:
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+
+def publish_event(job_id, kind, data):
+    """Publish a progress event ('log', 'stats', ...) to the job's event stream"""
+    store.add_events(job_id, [(kind, data)])
+
+
+def update_job_status(job_id, status, progress=0, message='', result=None, leaderboard=None):
+    """Update job status and store result (sweeps also publish a live leaderboard)"""
+    # Log lines printed before this update reach the stream ahead of it
+    job_output.publish_pending()
+    
+    # A cancelled job keeps its final status even if its worker is still winding down
+    if store.is_finished(job_id):
+        return
+    
+    # Results first, so a client that sees 'completed' can always fetch them
+    if result:
+        store.put_result(job_id, result)
+    
+    entry = {
+        'status': status,
+        'progress': progress,
+        'message': message,
+        'updated_at': datetime.now().isoformat()
+    }
+    if leaderboard is not None:
+        entry['leaderboard'] = leaderboard
+    store.set_status(job_id, entry, keep_finished=True)
+
+
+def job_settings(params):
+    """Build an immutable per-job Settings from config defaults and request parameters"""
+    print(f"\n⚙️ Building job settings from params: {params.keys()}")
+    overrides = {}
+    
+    if 'indicators' in params:
+        ind = params['indicators']
+        overrides['RSI_PERIOD'] = int(ind.get('rsi_period', config.RSI_PERIOD))
+        overrides['MACD_FAST'] = int(ind.get('macd_fast', config.MACD_FAST))
+        overrides['MACD_SLOW'] = int(ind.get('macd_slow', config.MACD_SLOW))
+        overrides['MACD_SIGNAL'] = int(ind.get('macd_signal', config.MACD_SIGNAL))
+        overrides['BB_PERIOD'] = int(ind.get('bb_period', config.BB_PERIOD))
+        overrides['BB_STD_DEV'] = float(ind.get('bb_std_dev', config.BB_STD_DEV))
+        overrides['ATR_PERIOD'] = int(ind.get('atr_period', config.ATR_PERIOD))
+        overrides['EMA_FAST'] = int(ind.get('ema_fast', config.EMA_FAST))
+        overrides['EMA_SLOW'] = int(ind.get('ema_slow', config.EMA_SLOW))
+        print(f"   Indicators: RSI={overrides['RSI_PERIOD']}, MACD={overrides['MACD_FAST']}/{overrides['MACD_SLOW']}/{overrides['MACD_SIGNAL']}")
+
+    if 'risk' in params:
+        risk = params['risk']
+        overrides['STOP_LOSS_PERCENT'] = float(risk.get('stop_loss_percent', config.STOP_LOSS_PERCENT))
+        overrides['TAKE_PROFIT_PERCENT'] = float(risk.get('take_profit_percent', config.TAKE_PROFIT_PERCENT))
+        overrides['PROB_THRESHOLD'] = float(risk.get('prob_threshold', config.PROB_THRESHOLD))
+        overrides['USE_ATR_STOPS'] = bool(risk.get('use_atr_stops', config.USE_ATR_STOPS))
+        overrides['USE_TREND_FILTER'] = bool(risk.get('use_trend_filter', config.USE_TREND_FILTER))
+        overrides['USE_VOLATILITY_FILTER'] = bool(risk.get('use_volatility_filter', config.USE_VOLATILITY_FILTER))
+        overrides['ATR_FILTER_MIN'] = float(risk.get('atr_filter_min', config.ATR_FILTER_MIN))
+        overrides['ATR_FILTER_MAX'] = float(risk.get('atr_filter_max', config.ATR_FILTER_MAX))
+        print(f"   Risk: SL={overrides['STOP_LOSS_PERCENT']}, TP={overrides['TAKE_PROFIT_PERCENT']}, Prob={overrides['PROB_THRESHOLD']}")
+
+    if 'model' in params:
+        model = params['model']
+        overrides['MODEL_TYPE'] = model.get('model_type', config.MODEL_TYPE)
+        overrides['N_ESTIMATORS'] = int(model.get('n_estimators', config.N_ESTIMATORS))
+        overrides['MAX_DEPTH'] = int(model.get('max_depth', config.MAX_DEPTH))
+        overrides['MIN_SAMPLES_SPLIT'] = int(model.get('min_samples_split', config.MIN_SAMPLES_SPLIT))
+        print(f"   Model: Type={overrides['MODEL_TYPE']}, Estimators={overrides['N_ESTIMATORS']}")
+
+    if 'data' in params:
+        data = params['data']
+        if 'csv_path' in data and data['csv_path']:
+            # Handle both absolute and relative paths
+            csv_path = data['csv_path']
+            if not os.path.isabs(csv_path):
+                # Join with project root (config.BASE_DIR)
+                overrides['MT5_CSV_PATH'] = os.path.join(config.BASE_DIR, csv_path)
+            else:
+                overrides['MT5_CSV_PATH'] = csv_path
+        if 'training_period' in data:
+            overrides['TRAINING_PERIOD'] = data['training_period']
+        print(f"   Data: CSV={overrides.get('MT5_CSV_PATH', config.MT5_CSV_PATH)}, "
+              f"Period={overrides.get('TRAINING_PERIOD', config.TRAINING_PERIOD)}")
+
+    if 'period_days' in params:
+        overrides['BACKTEST_PERIOD_DAYS'] = int(params['period_days'])
+
+    return Settings.from_config(**overrides)
+
+
+def job_artifact_dir(job_id):
+    """Directory holding one job's model, metadata and report files"""
+    return os.path.join(getattr(config, 'JOB_ARTIFACTS_DIR', os.path.join(config.BASE_DIR, 'backend', 'data', 'jobs')),
+                        job_id)
+
+
+def with_job_artifacts(settings, job_id):
+    """
+    Point a job's model, metadata and report files at its own directory,
+    so concurrent jobs never overwrite (or read) each other's artifacts
+    """
+    job_dir = job_artifact_dir(job_id)
+    return settings.replace(
+        MODEL_DIR=job_dir,
+        MODEL_PATH=os.path.join(job_dir, os.path.basename(settings.MODEL_PATH)),
+        BACKTEST_REPORT_PATH=os.path.join(job_dir, 'backtest_report.txt')
+    )
+
+
+def prune_job_artifacts(keep=None):
+    """
+    Remove all but the most recent job artifact directories
+
+    Directories holding a user's latest trained model ('trained_model:<user>')
+    are always kept, whatever other users have run since.
+    """
+    keep = keep if keep is not None else getattr(config, 'JOB_ARTIFACTS_KEEP', 50)
+    root = os.path.dirname(job_artifact_dir('x'))
+    if not os.path.isdir(root):
+        return
+    in_use = {trained.get('job_id') for trained in store.get_states('trained_model:').values()}
+    dirs = [entry for entry in os.scandir(root) if entry.is_dir() and entry.name not in in_use]
+    dirs.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in dirs[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def trained_model_path(params, settings):
+    """
+    Model a backtest should load: the requesting user's latest trained model
+    when its type matches the backtest's, else the shared settings.MODEL_PATH
+
+    Raises:
+        FileNotFoundError: If the user's trained model file no longer exists
+    """
+    trained = store.get_state(f"trained_model:{params['user']}") if params.get('user') else None
+    if not trained or trained.get('model_type') != settings.MODEL_TYPE:
+        print(f"ℹ️ No {settings.MODEL_TYPE} model trained by this user, using {settings.MODEL_PATH}")
+        return settings.MODEL_PATH
+    if not os.path.isfile(trained['model_path']):
+        raise FileNotFoundError(
+            f"The model trained by job {trained['job_id']} is no longer available "
+            f"({trained['model_path']}); train the model again before backtesting"
+        )
+    return trained['model_path']
+
+
+class JobLogBuffer(StringIO):
+    """
+    Output buffer that also publishes completed lines as 'log' events,
+    batched so chatty jobs don't write to the store on every print
+    """
+    
+    def __init__(self, job_id, interval=None):
+        super().__init__()
+        self.job_id = job_id
+        self.interval = interval if interval is not None else getattr(config, 'JOB_LOG_FLUSH_SECONDS', 0.25)
+        self._partial = ''
+        self._lines = []
+        self._last_publish = time.time()
+        self._lock = threading.RLock()  # A job's worker threads share its buffer
+    
+    def write(self, text):
+        with self._lock:
+            n = super().write(text)
+            lines = (self._partial + text).split('\n')
+            self._partial = lines.pop()
+            self._lines.extend(line for line in lines if line.strip())
+            if self._lines and time.time() - self._last_publish >= self.interval:
+                self.publish()
+            return n
+    
+    def publish(self, final=False):
+        """Send buffered lines (and, when final, any unterminated last line)"""
+        with self._lock:
+            if final and self._partial.strip():
+                self._lines.append(self._partial)
+                self._partial = ''
+            if self._lines:
+                store.add_events(self.job_id, [('log', {'line': line}) for line in self._lines])
+                self._lines = []
+            self._last_publish = time.time()
+
+
+class JobOutputRouter:
+    """
+    sys.stdout replacement that sends each job thread's prints to its own
+    buffer (contextlib.redirect_stdout swaps stdout for every thread at once)
+    
+    The buffer lives in a context variable: new threads start without one,
+    and helper threads run through contextvars.copy_context().run (as the
+    ensemble training pool does) write to the buffer of the job that
+    started them.
+    """
+    
+    def __init__(self, fallback):
+        self._fallback = fallback
+        self._buffer = contextvars.ContextVar('job_output_buffer', default=None)
+    
+    def write(self, text):
+        return (self._buffer.get() or self._fallback).write(text)
+    
+    def flush(self):
+        (self._buffer.get() or self._fallback).flush()
+    
+    def __getattr__(self, name):
+        return getattr(self._fallback, name)
+    
+    @contextlib.contextmanager
+    def capture(self, job_id=None):
+        """
+        Collect this thread's output in a StringIO for the duration of the block
+        
+        Args:
+            job_id: When given, lines are also streamed as the job's 'log' events
+        """
+        buffer = JobLogBuffer(job_id) if job_id else StringIO()
+        token = self._buffer.set(buffer)
+        try:
+            yield buffer
+        finally:
+            self._buffer.reset(token)
+            if job_id:
+                buffer.publish(final=True)
+    
+    def publish_pending(self):
+        """Stream the current thread's buffered log lines now"""
+        buffer = self._buffer.get()
+        if isinstance(buffer, JobLogBuffer):
+            buffer.publish()
+
+
+job_output = JobOutputRouter(sys.stdout)
+sys.stdout = job_output
+
+
+def run_training_job(job_id, params):
+    """Run training in background thread"""
+    try:
+        update_job_status(job_id, JobStatus.RUNNING, 10, 'Updating configuration...')
+        
+        # Per-job settings (the shared config module is never modified) and artifact files
+        settings = with_job_artifacts(job_settings(params), job_id)
+        
+        update_job_status(job_id, JobStatus.RUNNING, 30, 'Starting training...')
+        
+        # Run training, capturing this job's console output
+        def progress_callback(msg, progress):
+            update_job_status(job_id, JobStatus.RUNNING, progress, msg)
+            
+        with job_output.capture(job_id) as output_buffer:
+            train_main(status_callback=progress_callback, settings=settings)
+        
+        update_job_status(job_id, JobStatus.RUNNING, 90, 'Training complete, saving results...')
+        
+        # Read training metadata
+        metadata_path = os.path.join(settings.MODEL_DIR, 'training_metadata.txt')
+        metadata = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                for line in f:
+                    if ':' in line:
+                        key, value = line.strip().split(':', 1)
+                        metadata[key.strip()] = value.strip()
+        
+        result = {
+            'metadata': metadata,
+            'output': output_buffer.getvalue(),
+            'model_path': settings.MODEL_PATH,
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        update_job_status(job_id, JobStatus.COMPLETED, 100, 'Training completed successfully!', result)
+        
+        # Store for this user's next backtest and strategy save
+        if params.get('user'):
+            store.set_state(f"last_training_info:{params['user']}", {
+                'params': {key: value for key, value in params.items() if key != 'user'},
+                'metadata': metadata,
+                'model_path': settings.MODEL_PATH,
+                'timestamp': result['timestamp']
+            })
+            store.set_state(f"trained_model:{params['user']}", {
+                'job_id': job_id,
+                'model_path': settings.MODEL_PATH,
+                'model_type': settings.MODEL_TYPE,
+                'timestamp': result['timestamp']
+            })
+        prune_job_artifacts()
+        
+    except Exception as e:
+        error_msg = f"Training failed: {str(e)}\n{traceback.format_exc()}"
+        update_job_status(job_id, JobStatus.FAILED, 0, error_msg)
+
+
+def run_backtest_job(job_id, params):
+    """Run backtest in background thread"""
+    try:
+        update_job_status(job_id, JobStatus.RUNNING, 10, 'Updating configuration...')
+        
+        # Per-job settings (the shared config module is never modified) and report file
+        base_settings = job_settings(params)
+        settings = with_job_artifacts(base_settings, job_id)
+        model_path = trained_model_path(params, base_settings)
+        
+        initial_balance = float(params.get('initial_capital', 10000))
+        
+        update_job_status(job_id, JobStatus.RUNNING, 30, 'Loading model and data...')
+        
+        # Create backtester
+        backtester = GoldBacktester(model_path=model_path, settings=settings)
+        
+        update_job_status(job_id, JobStatus.RUNNING, 50, 'Running backtest...')
+        
+        def progress_callback(msg, progress):
+            update_job_status(job_id, JobStatus.RUNNING, progress, msg)
+        
+        # Capture (and stream) this job's output
+        with job_output.capture(job_id) as output_buffer:
+            backtester.run_backtest(status_callback=progress_callback)
+        
+        update_job_status(job_id, JobStatus.RUNNING, 90, 'Processing results...')
+        
+        # Extract results
+        # Prepare for processing
+        pip_value = initial_balance / 10000.0 
+        
+        # Calculate metrics
+        closed_trades = [t for t in backtester.trades if t['status'] == 'Closed']
+        open_trades = [t for t in backtester.trades if t['status'] == 'Open']
+        summary = pips_summary([t['pips'] for t in closed_trades])
+        
+        # Headline numbers go out before the curves and breakdowns are built
+        publish_event(job_id, 'stats', {
+            'total_trades': len(backtester.trades),
+            'closed_trades': len(closed_trades),
+            'open_trades': len(open_trades),
+            'total_pips': round(summary['total_pips'], 2),
+            'win_rate': round(summary['win_rate'], 2)
+        })
+        
+        # Equity/drawdown curves and daily/monthly performance in one pass
+        report = equity_report(backtester.trades, initial_balance, pip_value)
+        for trade, profit_money in zip(closed_trades, report['profit_money']):
+            if not np.isnan(profit_money):
+                trade['profit_money'] = round(float(profit_money), 2)
+        
+        # Build final trades data for response (now that profit_money is calculated)
+        trades_data = []
+        for trade in backtester.trades:
+            # Use same timestamp logic for status consistency if possible
+            close_ts = trade.get('close_timestamp')
+            trades_data.append({
+                'timestamp': trade['timestamp'].isoformat() if hasattr(trade['timestamp'], 'isoformat') else str(trade['timestamp']),
+                'type': trade['type'],
+                'entry_price': float(trade['entry_price']),
+                'sl': float(trade['sl']),
+                'tp': float(trade['tp']),
+                'close_price': float(trade['close_price']) if trade['close_price'] else None,
+                'close_timestamp': close_ts.isoformat() if close_ts and hasattr(close_ts, 'isoformat') else str(close_ts) if close_ts else None,
+                'close_reason': trade['close_reason'],
+                'pips': float(trade['pips']) if trade['pips'] else None,
+                'profit_money': float(trade['profit_money']) if 'profit_money' in trade else 0.0,
+                'status': trade['status'],
+                'confidence': float(trade['confidence'])
+            })
+        
+        result = {
+            'trades': trades_data,
+            'metrics': {
+                'initial_balance': initial_balance,
+                'final_balance': round(report['final_balance'], 2),
+                'total_profit_money': round(report['total_profit_money'], 2),
+                'total_pips': round(summary['total_pips'], 2),
+                'total_trades': len(backtester.trades),
+                'closed_trades': len(closed_trades),
+                'open_trades': len(open_trades),
+                'winning_trades': summary['winning_trades'],
+                'losing_trades': summary['losing_trades'],
+                'win_rate': round(summary['win_rate'], 2),
+                'avg_win': round(summary['avg_win'], 2),
+                'avg_loss': round(summary['avg_loss'], 2),
+                'profit_factor': round(summary['profit_factor'], 2) if summary['profit_factor'] != float('inf') else 999.99,
+                'avg_win_money': round(summary['avg_win'] * pip_value, 2),
+                'avg_loss_money': round(summary['avg_loss'] * pip_value, 2),
+                'period_days': settings.BACKTEST_PERIOD_DAYS,
+                'max_drawdown_amount': round(report['max_drawdown_amount'], 2),
+                'max_drawdown_percent': round(report['max_drawdown_percent'], 2),
+                'max_daily_drawdown_percent': round(report['max_daily_drawdown_percent'], 2)
+            },
+            'equity_curve': report['equity_curve'],
+            'drawdown_curve': report['drawdown_curve'],
+            'monthly_performance': report['monthly_performance'],
+            'daily_performance': report['daily_performance'],
+            'model_path': model_path,
+            'output': output_buffer.getvalue(),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        update_job_status(job_id, JobStatus.COMPLETED, 100, 'Backtest completed successfully!', result)
+        
+        # Store this user's backtest results for manual saving
+        # We don't save automatically anymore
+        if params.get('user'):
+            store.set_state(f"last_backtest_results:{params['user']}", result)
+        prune_job_artifacts()
+        
+    except Exception as e:
+        error_msg = f"Backtest failed: {str(e)}\n{traceback.format_exc()}"
+        update_job_status(job_id, JobStatus.FAILED, 0, error_msg)
+
+
+def run_sweep_job(job_id, params):
+    """Run a hyperparameter sweep in background thread"""
+    try:
+        update_job_status(job_id, JobStatus.RUNNING, 2, 'Updating configuration...')
+        
+        # Base settings for every trial; swept values override them per trial
+        settings = job_settings(params)
+        
+        update_job_status(job_id, JobStatus.RUNNING, 5, 'Loading data...')
+        
+        def progress_callback(msg, progress, leaderboard):
+            update_job_status(job_id, JobStatus.RUNNING, progress, msg, leaderboard=leaderboard)
+        
+        with job_output.capture(job_id) as output_buffer:
+            df, _, _, _ = fetch_training_data(ticker=settings.TICKER, period=settings.TRAINING_PERIOD,
+                                              interval=settings.INTERVAL, settings=settings)
+            if df is None:
+                raise ValueError('Failed to load training data')
+            sweep = run_sweep(
+                df,
+                params.get('space', {}),
+                search=params.get('search', getattr(settings, 'SWEEP_SEARCH', 'grid')),
+                n_trials=params.get('n_trials'),
+                objective=params.get('objective'),
+                eta=params.get('eta'),
+                min_fraction=params.get('min_fraction'),
+                seed=params.get('seed'),
+                status_callback=progress_callback,
+                settings=settings
+            )
+        
+        result = {
+            **sweep,
+            'output': output_buffer.getvalue(),
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        update_job_status(job_id, JobStatus.COMPLETED, 100, 'Sweep completed successfully!', result,
+                          leaderboard=sweep['leaderboard'][:20])
+        
+    except Exception as e:
+        error_msg = f"Sweep failed: {str(e)}\n{traceback.format_exc()}"
+        update_job_status(job_id, JobStatus.FAILED, 0, error_msg)
@@ -0,0 +1,427 @@
+"""
+Job Store for Gold Signal Bot API
+SQLite-backed job status, results, progress events and shared state. The web
+process and the job workers open the same database file, results are stored
+per top-level field as compressed blobs (loaded only when requested; long
+lists such as trades in fixed-size chunks, so one page reads only its own),
+and finished jobs are evicted by age and by a total result-size budget.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+
+
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated_at);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    blob BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (job_id, field)
+);
+CREATE INDEX IF NOT EXISTS job_results_created ON job_results (created_at);
+CREATE TABLE IF NOT EXISTS job_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS job_events_job ON job_events (job_id, seq);
+CREATE TABLE IF NOT EXISTS job_state (
+    key TEXT PRIMARY KEY,
+    blob BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, default=str).encode('utf-8'), 6)
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+def _base_field(name):
+    """Result field a stored row belongs to ('trades:3' -> 'trades')"""
+    return name.split(':', 1)[0]
+
+
+def _join_chunks(rows):
+    """
+    Rebuild result fields from stored rows
+
+    Args:
+        rows: (field, blob) rows; chunked fields appear as '<field>:meta'
+              plus '<field>:0', '<field>:1', ...
+
+    Returns:
+        dict of field -> value
+    """
+    result, chunks = {}, {}
+    for name, blob in rows:
+        field, _, part = name.partition(':')
+        if not part:
+            result[field] = _unpack(blob)
+        elif part == 'meta':
+            result.setdefault(field, [])
+        else:
+            chunks.setdefault(field, []).append((int(part), blob))
+    for field, parts in chunks.items():
+        result[field] = [item for _, blob in sorted(parts) for item in _unpack(blob)]
+    return result
+
+
+class JobStore:
+    """
+    Persistent job store
+
+    Safe to share between threads and processes: each thread opens its own
+    connection, and the object pickles to its path and limits.
+    """
+
+    def __init__(self, path=None, ttl_hours=None, max_result_mb=None):
+        """
+        Initialize store
+
+        Args:
+            path: SQLite file (default config.JOB_STORE_PATH)
+            ttl_hours: Age after which finished jobs are removed (default config.JOB_TTL_HOURS)
+            max_result_mb: Budget for stored results; oldest are evicted first
+                           (default config.JOB_RESULTS_MAX_MB)
+        """
+        self.path = path or getattr(config, 'JOB_STORE_PATH',
+                                    os.path.join(config.BASE_DIR, 'backend', 'data', 'jobs.sqlite3'))
+        self.ttl_hours = ttl_hours if ttl_hours is not None else getattr(config, 'JOB_TTL_HOURS', 24)
+        self.max_result_mb = max_result_mb if max_result_mb is not None else getattr(config, 'JOB_RESULTS_MAX_MB', 256)
+        self._local = threading.local()
+        self._last_ttl_sweep = 0.0
+
+    def __getstate__(self):
+        return {'path': self.path, 'ttl_hours': self.ttl_hours, 'max_result_mb': self.max_result_mb}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # ---------- job status ----------
+
+    def set_status(self, job_id, entry, keep_finished=False):
+        """
+        Insert or replace a job's status entry and publish it as a 'status' event
+
+        Args:
+            job_id: Job identifier
+            entry: Status dict ('status', 'progress', 'message', ...)
+            keep_finished: Leave the entry alone if the job already has a final
+                           status (so a late update can't undo a cancellation)
+
+        Returns:
+            bool: False if the update was skipped because of keep_finished
+        """
+        now = time.time()
+        data = json.dumps(entry, default=str)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if keep_finished:
+                row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+                if row and row[0] in FINISHED_STATUSES:
+                    return False
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, entry, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(job_id) DO UPDATE SET status = excluded.status, entry = excluded.entry, "
+                "updated_at = excluded.updated_at",
+                (job_id, entry.get('status', ''), data, now, now)
+            )
+            conn.execute(
+                "INSERT INTO job_events (job_id, kind, data, created_at) VALUES (?, 'status', ?, ?)",
+                (job_id, data, now)
+            )
+        self._maybe_expire()
+        return True
+
+    def get_status(self, job_id):
+        """Status entry dict, or None"""
+        row = self._conn().execute("SELECT entry FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def is_finished(self, job_id):
+        """True if the job has a final status (completed, failed or cancelled)"""
+        row = self._conn().execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row is not None and row[0] in FINISHED_STATUSES
+
+    def delete(self, job_id):
+        """Remove a job and its results"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def fail_unfinished(self, message):
+        """Mark jobs left pending/running by a previous server process as failed"""
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT job_id, entry FROM jobs WHERE status NOT IN (?, ?, ?)", FINISHED_STATUSES
+        ).fetchall()
+        for job_id, entry in rows:
+            entry = json.loads(entry)
+            entry.update(status='failed', message=message)
+            self.set_status(job_id, entry)
+        return len(rows)
+
+    # ---------- results ----------
+
+    def put_result(self, job_id, result):
+        """
+        Store a job result, one compressed blob per top-level field
+
+        Lists in config.RESULTS_CHUNKED_FIELDS are split into blobs of
+        config.RESULTS_CHUNK_SIZE items ('trades:0', 'trades:1', ...) next
+        to a 'trades:meta' row with their length, for get_list_slice.
+
+        Args:
+            job_id: Job identifier
+            result: JSON-serializable dict
+        """
+        chunked_fields = getattr(config, 'RESULTS_CHUNKED_FIELDS', ('trades',))
+        chunk_size = max(1, getattr(config, 'RESULTS_CHUNK_SIZE', 500))
+        now = time.time()
+        rows = []
+        for field, value in result.items():
+            if field in chunked_fields and isinstance(value, list):
+                blob = _pack({'length': len(value), 'chunk_size': chunk_size})
+                rows.append((job_id, f'{field}:meta', blob, len(blob), now))
+                for index, start in enumerate(range(0, len(value), chunk_size)):
+                    blob = _pack(value[start:start + chunk_size])
+                    rows.append((job_id, f'{field}:{index}', blob, len(blob), now))
+                continue
+            blob = _pack(value)
+            rows.append((job_id, field, blob, len(blob), now))
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM job_results WHERE job_id = ?", (job_id,))
+            conn.executemany(
+                "INSERT INTO job_results (job_id, field, blob, size, created_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+        self._enforce_size_budget()
+
+    def has_result(self, job_id):
+        row = self._conn().execute("SELECT 1 FROM job_results WHERE job_id = ? LIMIT 1", (job_id,)).fetchone()
+        return row is not None
+
+    def get_result(self, job_id, fields=None):
+        """
+        Load a job result
+
+        Args:
+            job_id: Job identifier
+            fields: Optional iterable of top-level fields to load (others are
+                    not read or decompressed)
+
+        Returns:
+            dict, or None if there is no stored result
+        """
+        conn = self._conn()
+        if fields is None:
+            rows = conn.execute("SELECT field, blob FROM job_results WHERE job_id = ?", (job_id,)).fetchall()
+            if not rows:
+                return None
+        else:
+            fields = list(fields)
+            if not self.has_result(job_id):
+                return None
+            placeholders = ','.join('?' * len(fields))
+            rows = conn.execute(
+                f"SELECT field, blob FROM job_results WHERE job_id = ? "
+                f"AND substr(field, 1, instr(field || ':', ':') - 1) IN ({placeholders})",
+                (job_id, *fields)
+            ).fetchall() if fields else []
+        return _join_chunks(rows)
+
+    def get_list_slice(self, job_id, field, offset, limit):
+        """
+        Load part of a list field, reading only the chunks it spans
+
+        Args:
+            job_id: Job identifier
+            field: List field of the result (e.g. 'trades')
+            offset: Index of the first item
+            limit: Maximum number of items
+
+        Returns:
+            tuple (items, total length), or None if there is no stored result
+        """
+        conn = self._conn()
+        meta = conn.execute(
+            "SELECT blob FROM job_results WHERE job_id = ? AND field = ?", (job_id, f'{field}:meta')
+        ).fetchone()
+        if meta is None:
+            # Stored whole (not a chunked field)
+            result = self.get_result(job_id, [field])
+            if result is None:
+                return None
+            items = result.get(field) or []
+            return items[offset:offset + limit], len(items)
+
+        meta = _unpack(meta[0])
+        total, chunk_size = meta['length'], meta['chunk_size']
+        end = min(offset + limit, total)
+        if offset >= end:
+            return [], total
+        first, last = offset // chunk_size, (end - 1) // chunk_size
+        names = [f'{field}:{index}' for index in range(first, last + 1)]
+        placeholders = ','.join('?' * len(names))
+        rows = conn.execute(
+            f"SELECT field, blob FROM job_results WHERE job_id = ? AND field IN ({placeholders})",
+            (job_id, *names)
+        ).fetchall()
+        items = _join_chunks(rows).get(field, [])
+        start = offset - first * chunk_size
+        return items[start:start + (end - offset)], total
+
+    def result_fields(self, job_id):
+        """Stored field names and compressed sizes for a result (chunks summed per field)"""
+        sizes = {}
+        rows = self._conn().execute("SELECT field, size FROM job_results WHERE job_id = ?", (job_id,)).fetchall()
+        for name, size in rows:
+            field = _base_field(name)
+            sizes[field] = sizes.get(field, 0) + size
+        return sizes
+
+    # ---------- progress events ----------
+
+    def add_events(self, job_id, events):
+        """
+        Append progress events for a job
+
+        Args:
+            job_id: Job identifier
+            events: Iterable of (kind, data) with JSON-serializable data
+        """
+        now = time.time()
+        rows = [(job_id, kind, json.dumps(data, default=str), now) for kind, data in events]
+        if rows:
+            self._conn().executemany(
+                "INSERT INTO job_events (job_id, kind, data, created_at) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def get_events(self, job_id, after=0, limit=500):
+        """
+        Events for a job newer than a sequence number
+
+        Returns:
+            list of (seq, kind, data) in publication order
+        """
+        rows = self._conn().execute(
+            "SELECT seq, kind, data FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+            (job_id, after, limit)
+        ).fetchall()
+        return [(seq, kind, json.loads(data)) for seq, kind, data in rows]
+
+    # ---------- shared state ----------
+
+    def set_state(self, key, value):
+        """Store a small shared value (e.g. the last training info)"""
+        self._conn().execute(
+            "INSERT OR REPLACE INTO job_state (key, blob, updated_at) VALUES (?, ?, ?)",
+            (key, _pack(value), time.time())
+        )
+
+    def get_state(self, key, default=None):
+        row = self._conn().execute("SELECT blob FROM job_state WHERE key = ?", (key,)).fetchone()
+        return _unpack(row[0]) if row else default
+
+    def get_states(self, prefix):
+        """Shared values whose key starts with prefix (e.g. 'trained_model:'), by key"""
+        rows = self._conn().execute(
+            "SELECT key, blob FROM job_state WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+        ).fetchall()
+        return {key: _unpack(blob) for key, blob in rows}
+
+    # ---------- eviction ----------
+
+    def expire(self):
+        """Remove finished jobs (and their results and events) older than the TTL"""
+        if not self.ttl_hours:
+            return 0
+        cutoff = time.time() - self.ttl_hours * 3600
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM job_results WHERE job_id IN (SELECT job_id FROM jobs WHERE updated_at < ? "
+                "AND status IN (?, ?, ?))", (cutoff, *FINISHED_STATUSES)
+            )
+            conn.execute(
+                "DELETE FROM job_events WHERE job_id IN (SELECT job_id FROM jobs WHERE updated_at < ? "
+                "AND status IN (?, ?, ?))", (cutoff, *FINISHED_STATUSES)
+            )
+            removed = conn.execute(
+                "DELETE FROM jobs WHERE updated_at < ? AND status IN (?, ?, ?)", (cutoff, *FINISHED_STATUSES)
+            ).rowcount
+        self._last_ttl_sweep = time.time()
+        return removed
+
+    def _maybe_expire(self):
+        # TTL sweeps are cheap but needn't run on every status update
+        if time.time() - self._last_ttl_sweep > 60:
+            self.expire()
+
+    def _enforce_size_budget(self):
+        """Drop the oldest results until the stored total fits the budget"""
+        budget = int(self.max_result_mb * 1024 * 1024)
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM job_results").fetchone()[0]
+        if total <= budget:
+            return
+        rows = conn.execute(
+            "SELECT job_id, SUM(size), MIN(created_at) AS created FROM job_results "
+            "GROUP BY job_id ORDER BY created ASC"
+        ).fetchall()
+        evict = []
+        for job_id, size, _ in rows[:-1]:  # Never evict the newest result
+            if total <= budget:
+                break
+            evict.append((job_id,))
+            total -= size
+        if evict:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("DELETE FROM job_results WHERE job_id = ?", evict)
+            print(f"🧹 Evicted {len(evict)} job results to stay within {self.max_result_mb} MB")
@@ -1,10 +1,14 @@
 import threading
 import time
-import joblib
 import pandas as pd
 import os
+import sys
 from telegram_service import telegram_service
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.model_loader import load_model
+
 class LiveManager:
     def __init__(self):
         self.active_strategies = {} # strategy_id -> thread
@@ -27,12 +31,11 @@ class LiveManager:
     def _monitor_loop(self, strategy_id, strategy_data):
         print(f"📡 Started monitoring strategy: {strategy_id}")
         
-        # Load model
+        # Load model (one shared instance for all strategies using the same artifact)
         model_path = os.path.join(os.path.dirname(__file__), "..", "models", "gold_signal_model.pkl")
-        try:
-            model = joblib.load(model_path)
-        except Exception as e:
-            print(f"❌ Failed to load model for {strategy_id}: {e}")
+        model = load_model(model_path)
+        if model is None:
+            print(f"❌ Failed to load model for {strategy_id}")
             return
 
         while self.is_running:
@@ -0,0 +1,242 @@
+"""
+Strategy Repository for Gold Signal Bot API
+SQLite-backed saved strategies, indexed by id, owner and published flag.
+Listings read a small row per strategy (metrics and a downsampled equity
+curve); the full backtest is a compressed blob loaded only when a single
+strategy is requested. Every change is one transaction, so concurrent
+requests can't lose or corrupt each other's writes.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from utils.downsample import downsample_points
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS strategies (
+    id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    owner_id TEXT,
+    is_published INTEGER NOT NULL DEFAULT 0,
+    is_live INTEGER NOT NULL DEFAULT 0,
+    doc TEXT NOT NULL,
+    preview TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS strategies_owner ON strategies (owner_id, seq);
+CREATE INDEX IF NOT EXISTS strategies_published ON strategies (is_published, seq);
+CREATE TABLE IF NOT EXISTS strategy_backtests (
+    strategy_id TEXT PRIMARY KEY,
+    blob BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS strategy_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Strategy keys kept in their own (indexed) columns rather than the document
+FLAG_COLUMNS = ('is_published', 'is_live')
+
+
+def strategy_id(strategy):
+    """Strategy identifier (legacy entries without an id use their backtest timestamp)"""
+    return strategy.get('id') or (strategy.get('backtest') or {}).get('timestamp')
+
+
+class StrategyRepository:
+    """
+    Saved strategies
+
+    Safe to share between threads: each thread opens its own connection.
+    """
+
+    def __init__(self, path=None, legacy_json=None, preview_points=None):
+        """
+        Initialize repository
+
+        Args:
+            path: SQLite file (default config.STRATEGY_STORE_PATH)
+            legacy_json: strategies.json to import once when the store is first opened
+            preview_points: Equity-curve points kept for listings (default config.STRATEGY_PREVIEW_POINTS)
+        """
+        self.path = path or getattr(config, 'STRATEGY_STORE_PATH',
+                                    os.path.join(config.BASE_DIR, 'backend', 'data', 'strategies.sqlite3'))
+        self.legacy_json = legacy_json
+        self.preview_points = preview_points or getattr(config, 'STRATEGY_PREVIEW_POINTS', 200)
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._import_legacy(conn)
+        return conn
+
+    # ---------- reads ----------
+
+    def get(self, strategy_id, full=True):
+        """
+        One strategy, or None
+
+        Args:
+            strategy_id: Strategy identifier
+            full: Load the complete backtest (otherwise the listing preview)
+        """
+        row = self._conn().execute(
+            "SELECT id, is_published, is_live, doc, preview FROM strategies WHERE id = ?", (strategy_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        backtest = None
+        if full:
+            blob = self._conn().execute(
+                "SELECT blob FROM strategy_backtests WHERE strategy_id = ?", (strategy_id,)
+            ).fetchone()
+            backtest = json.loads(zlib.decompress(blob[0])) if blob else None
+        return self._to_strategy(row, backtest)
+
+    def list_published(self):
+        """Published strategies, newest first (listing previews)"""
+        return self._list("WHERE is_published = 1", ())
+
+    def list_by_owner(self, owner_id):
+        """A user's strategies, newest first (listing previews)"""
+        return self._list("WHERE owner_id = ?", (owner_id,))
+
+    def _list(self, where, args):
+        rows = self._conn().execute(
+            f"SELECT id, is_published, is_live, doc, preview FROM strategies {where} ORDER BY seq DESC", args
+        ).fetchall()
+        return [self._to_strategy(row) for row in rows]
+
+    @staticmethod
+    def _to_strategy(row, backtest=None):
+        sid, is_published, is_live, doc, preview = row
+        strategy = json.loads(doc)
+        strategy['is_published'] = bool(is_published)
+        if is_live:
+            strategy['is_live'] = True
+        strategy['backtest'] = backtest if backtest is not None else json.loads(preview)
+        return strategy
+
+    # ---------- writes ----------
+
+    def save(self, strategy):
+        """Insert or replace a strategy (keeps its listing position when replacing)"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._write(conn, strategy)
+
+    def set_flag(self, strategy_id, flag, value=None, owner_id=None):
+        """
+        Set or toggle 'is_published' / 'is_live'
+
+        Args:
+            strategy_id: Strategy identifier
+            flag: One of FLAG_COLUMNS
+            value: New value (None toggles the current one)
+            owner_id: When given, only the owner's strategy matches
+
+        Returns:
+            bool: The new value, or None if no strategy matched
+        """
+        if flag not in FLAG_COLUMNS:
+            raise ValueError(f"Unknown strategy flag '{flag}'")
+        where, args = "id = ?", [strategy_id]
+        if owner_id is not None:
+            where += " AND owner_id = ?"
+            args.append(owner_id)
+        new_value = f"1 - {flag}" if value is None else str(int(bool(value)))
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            updated = conn.execute(
+                f"UPDATE strategies SET {flag} = {new_value}, updated_at = ? WHERE {where}",
+                (time.time(), *args)
+            ).rowcount
+            if not updated:
+                return None
+            row = conn.execute(f"SELECT {flag} FROM strategies WHERE id = ?", (strategy_id,)).fetchone()
+        return bool(row[0])
+
+    def delete(self, strategy_id, owner_id=None):
+        """Remove a strategy (only the owner's when owner_id is given); True if removed"""
+        where, args = "id = ?", [strategy_id]
+        if owner_id is not None:
+            where += " AND owner_id = ?"
+            args.append(owner_id)
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            removed = conn.execute(f"DELETE FROM strategies WHERE {where}", args).rowcount
+            if removed:
+                conn.execute("DELETE FROM strategy_backtests WHERE strategy_id = ?", (strategy_id,))
+        return bool(removed)
+
+    def _write(self, conn, strategy):
+        sid = strategy_id(strategy)
+        if not sid:
+            raise ValueError("Strategy has no id")
+        backtest = strategy.get('backtest') or {}
+        doc = {k: v for k, v in strategy.items() if k not in FLAG_COLUMNS and k != 'backtest'}
+        doc['id'] = sid
+        preview = {k: backtest[k] for k in ('metrics', 'timestamp') if k in backtest}
+        if backtest.get('equity_curve'):
+            preview['equity_curve'] = downsample_points(backtest['equity_curve'], 'balance', self.preview_points)
+
+        existing = conn.execute("SELECT seq FROM strategies WHERE id = ?", (sid,)).fetchone()
+        seq = existing[0] if existing else conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) + 1 FROM strategies").fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO strategies (id, seq, owner_id, is_published, is_live, doc, preview, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (sid, seq, strategy.get('owner_id'), int(bool(strategy.get('is_published', False))),
+             int(bool(strategy.get('is_live', False))), json.dumps(doc, default=str),
+             json.dumps(preview, default=str), time.time())
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO strategy_backtests (strategy_id, blob) VALUES (?, ?)",
+            (sid, zlib.compress(json.dumps(backtest, default=str).encode('utf-8'), 6))
+        )
+
+    # ---------- legacy import ----------
+
+    def _import_legacy(self, conn):
+        """Import strategies.json the first time the store is opened"""
+        if not self.legacy_json or not os.path.exists(self.legacy_json):
+            return
+        with conn:
+            # Checked inside the write lock so concurrent processes import once
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM strategy_meta WHERE key = 'legacy_import'").fetchone():
+                return
+            try:
+                with open(self.legacy_json, 'r') as f:
+                    strategies = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Could not import {self.legacy_json}: {e}")
+                strategies = []
+            for strategy in strategies:
+                if strategy_id(strategy):
+                    self._write(conn, strategy)
+            conn.execute(
+                "INSERT OR REPLACE INTO strategy_meta (key, value) VALUES ('legacy_import', ?)",
+                (self.legacy_json,)
+            )
+        print(f"📦 Imported {len(strategies)} strategies from {self.legacy_json}")
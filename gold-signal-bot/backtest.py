@@ -8,63 +8,88 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
-import config
-from utils.indicators import add_all_indicators, prepare_features
+from utils.indicators import prepare_features, indicator_warmup_bars
+from utils.indicator_cache import cached_indicators, find_csv_indicators
 from utils.model_loader import load_model
 from utils.av_fetch import fetch_fx_history
 from utils.mt5_fetch import load_csv_data
+from utils.bar_cache import window_offset
+from utils.resample import infer_timeframe
+from utils.backtest_engine import simulate_trades, OpenPositionIndex
+from utils.backtest_analytics import pips_summary, monthly_breakdown
+from utils.settings import resolve_settings
 import os
 
 
 class GoldBacktester:
     """Backtester for Gold Signal Bot"""
     
-    def __init__(self, days=None, model_path=config.MODEL_PATH):
+    def __init__(self, days=None, model_path=None, settings=None):
         """
         Initialize backtester
+        
+        Args:
+            days: Backtest window in days (default settings.BACKTEST_PERIOD_DAYS)
+            model_path: Model file (default settings.MODEL_PATH)
+            settings: Optional per-job Settings (default: current config)
         """
+        self.settings = resolve_settings(settings)
         if days is None:
-            days = config.BACKTEST_PERIOD_DAYS
+            days = self.settings.BACKTEST_PERIOD_DAYS
+        if model_path is None:
+            model_path = self.settings.MODEL_PATH
         self.days = days
+        self.start_date = None
+        self.csv_path = None
         self.model_path = model_path
         self.trades = []
-        self.ticker = config.TICKER
-        self.interval = config.INTERVAL
+        self.ticker = self.settings.TICKER
+        self.interval = self.settings.INTERVAL
         self.used_ticker = self.ticker
         self.used_interval = self.interval
-        self.model_type = getattr(config, 'MODEL_TYPE', 'rf')
+        self.model_type = getattr(self.settings, 'MODEL_TYPE', 'rf')
+        backend = getattr(self.settings, 'INFERENCE_BACKEND', 'native')
         
         # Load models
         if self.model_type == 'ensemble':
             self.models = {}
-            for mtype in config.ENSEMBLE_MODELS:
+            for mtype in self.settings.ENSEMBLE_MODELS:
                 m_path = os.path.join(os.path.dirname(model_path), f'gold_signal_model_{mtype}.pkl')
-                m = load_model(m_path)
+                m = load_model(m_path, backend=backend)
                 if m is not None:
                     self.models[mtype] = m
             if not self.models:
                 raise Exception("No component models found for ensemble. Please train ensemble first.")
             print(f"✅ Loaded ensemble with {len(self.models)} models")
         else:
-            self.model = load_model(model_path)
+            self.model = load_model(model_path, backend=backend)
             if self.model is None:
                 raise Exception("Model not found. Please run train_model.py first.")
     
     def fetch_data(self):
         """Fetch historical data for backtest period"""
-        data_source = getattr(config, "DATA_SOURCE", "").lower()
+        data_source = getattr(self.settings, "DATA_SOURCE", "").lower()
         
         # MT5 CSV mode
         if data_source == "mt5_csv":
-            csv_path = getattr(config, "MT5_CSV_PATH", "data/mt5_history.csv")
-            symbol = getattr(config, "MT5_SYMBOL", "XAUUSD")
-            timeframe = getattr(config, "MT5_TIMEFRAME", "H4")
+            csv_path = getattr(self.settings, "MT5_CSV_PATH", "data/mt5_history.csv")
+            symbol = getattr(self.settings, "MT5_SYMBOL", "XAUUSD")
+            timeframe = getattr(self.settings, "MT5_TIMEFRAME", "H4")
             
             print(f"\n📊 Loading {self.days} days from MT5 CSV for backtest...")
             print(f"   Symbol: {symbol}, Timeframe: {timeframe}")
             
-            data = load_csv_data(csv_path, days=self.days)
+            # Only the backtest window plus indicator warm-up bars is materialized
+            # (cached bars are memory-mapped); the warm-up follows the bars' own timeframe
+            self.start_date = datetime.now() - timedelta(days=self.days)
+            data = load_csv_data(csv_path)
+            if data is not None and len(data) >= 2:
+                if not data.index.is_monotonic_increasing:
+                    data = data.sort_index()
+                warmup_bars = indicator_warmup_bars(self.settings, base_timeframe=infer_timeframe(data.index))
+                data = data.iloc[window_offset(data.index.values, self.start_date, warmup_bars):].copy()
             if data is not None and not data.empty:
+                self.csv_path = csv_path
                 self.used_ticker = symbol
                 self.used_interval = timeframe
                 print(f"✅ Loaded {len(data)} candles")
@@ -77,7 +102,7 @@ class GoldBacktester:
             print(f"\n📊 Fetching {self.days} days of historical data from Alpha Vantage...")
             data = fetch_fx_history(self.days)
             if not data.empty:
-                self.used_ticker = config.TICKER
+                self.used_ticker = self.settings.TICKER
                 self.used_interval = "1d"
                 print(f"✅ Downloaded {len(data)} candles (ticker={self.used_ticker}, interval={self.used_interval})")
                 return data
@@ -87,33 +112,65 @@ class GoldBacktester:
         print(f"❌ Unsupported DATA_SOURCE: {data_source}. Use 'mt5_csv' or 'alphavantage'.")
         return None
     
-    def run_backtest(self):
-        """Run backtest on historical data"""
+    def run_backtest(self, status_callback=None):
+        """
+        Run backtest on historical data
+        
+        Args:
+            status_callback: Optional callback(message, progress) for stage updates
+        """
         data = self.fetch_data()
         if data is None:
             return
         
         print(f"\n🔄 Running backtest on {self.days} days of data...")
         print(f"   Model Type: {self.model_type}")
-        print(f"   RSI Period: {getattr(config, 'RSI_PERIOD', 'N/A')}")
-        print(f"   Prob Threshold: {getattr(config, 'PROB_THRESHOLD', 'N/A')}")
-        print(f"   Use ATR Stops: {getattr(config, 'USE_ATR_STOPS', 'N/A')}")
-        print(f"   Stop Loss %: {getattr(config, 'STOP_LOSS_PERCENT', 'N/A')}")
-        print(f"   Take Profit %: {getattr(config, 'TAKE_PROFIT_PERCENT', 'N/A')}")
+        print(f"   RSI Period: {getattr(self.settings, 'RSI_PERIOD', 'N/A')}")
+        print(f"   Prob Threshold: {getattr(self.settings, 'PROB_THRESHOLD', 'N/A')}")
+        print(f"   Use ATR Stops: {getattr(self.settings, 'USE_ATR_STOPS', 'N/A')}")
+        print(f"   Stop Loss %: {getattr(self.settings, 'STOP_LOSS_PERCENT', 'N/A')}")
+        print(f"   Take Profit %: {getattr(self.settings, 'TAKE_PROFIT_PERCENT', 'N/A')}")
 
         # Debug: show columns to diagnose missing OHLCV fields
         print(f"   Data columns: {list(data.columns)}")
         print(f"   Using ticker={self.used_ticker}, interval={self.used_interval}")
         
         # Add indicators
-        data_with_indicators = add_all_indicators(data)
+        if status_callback:
+            status_callback(f'Computing indicators on {len(data)} bars...', 55)
+        # After training on the same CSV, the window is cut from its full-history
+        # frame; otherwise only the loaded window (plus warm-up) is computed
+        data_with_indicators = None
+        if self.csv_path is not None:
+            data_with_indicators = find_csv_indicators(self.csv_path, settings=self.settings, start=self.start_date)
+        if data_with_indicators is None:
+            data_with_indicators = cached_indicators(data, settings=self.settings)
+            
+            # Drop the warm-up bars so the backtest covers exactly the requested window
+            if self.start_date is not None:
+                data_with_indicators = data_with_indicators[data_with_indicators.index >= self.start_date]
         
         if len(data_with_indicators) == 0:
             print("❌ Not enough data to compute indicators")
             return
         
+        if status_callback:
+            status_callback(f'Predicting {len(data_with_indicators)} bars...', 65)
+        results_df = self._build_results_frame(data_with_indicators)
+        
+        print(f"\n🎯 Generating signals...")
+        if status_callback:
+            status_callback('Simulating trades...', 75)
+        stats = self.simulate(results_df)
+        if status_callback:
+            status_callback(f'Simulated {len(self.trades)} trades', 85)
+        
+        self._print_results(**stats)
+    
+    def _build_results_frame(self, data_with_indicators):
+        """Attach model predictions and probabilities to the indicator frame"""
         # Prepare features
-        X, _ = prepare_features(data_with_indicators)
+        X, _ = prepare_features(data_with_indicators, settings=self.settings)
         
         # Make predictions with probabilities
         if self.model_type == 'ensemble':
@@ -136,15 +193,37 @@ class GoldBacktester:
         results_df['Prob_Up'] = probabilities[:, 1]
         results_df['Prob_Down'] = probabilities[:, 0]
         results_df['Prev_Prediction'] = results_df['Prediction'].shift(1)
+        return results_df
+    
+    def simulate(self, results_df, engine=None):
+        """
+        Simulate trades over a prediction frame
+        
+        Args:
+            results_df: Frame returned by _build_results_frame
+            engine: 'vectorized' or 'loop' (default settings.BACKTEST_ENGINE)
         
+        Returns:
+            dict: Signal and filter-reject counters
+        """
+        if engine is None:
+            engine = getattr(self.settings, 'BACKTEST_ENGINE', 'vectorized')
+        
+        self.trades = []
+        if engine == 'loop':
+            return self._simulate_loop(results_df)
+        
+        self.trades, stats = simulate_trades(results_df, self.settings)
+        return stats
+    
+    def _simulate_loop(self, results_df):
+        """Reference per-bar simulation (kept for parity checks and benchmarks)"""
         # Track trades and filters
-        prev_prediction = None
         confidence_rejects = 0
         macd_rejects = 0
         volatility_rejects = 0
         signals_generated = 0
-        
-        print(f"\n🎯 Generating signals...")
+        self._open_positions = OpenPositionIndex()
         
         for idx in range(len(results_df)):
             timestamp = results_df.index[idx]
@@ -171,9 +250,9 @@ class GoldBacktester:
             # --- REGIME FILTERS ---
             
             # 1. Volatility Filter (ATR)
-            if getattr(config, 'USE_VOLATILITY_FILTER', False):
-                min_atr = getattr(config, 'ATR_FILTER_MIN', 0)
-                max_atr = getattr(config, 'ATR_FILTER_MAX', 999999)
+            if getattr(self.settings, 'USE_VOLATILITY_FILTER', False):
+                min_atr = getattr(self.settings, 'ATR_FILTER_MIN', 0)
+                max_atr = getattr(self.settings, 'ATR_FILTER_MAX', 999999)
                 
                 # Check if current ATR is outside allowed range
                 if atr_val < min_atr or atr_val > max_atr:
@@ -182,15 +261,15 @@ class GoldBacktester:
                     continue
 
             # 2. Trend filter: only trade with EMA200 trend
-            use_trend_filter = getattr(config, 'USE_TREND_FILTER', False)
+            use_trend_filter = getattr(self.settings, 'USE_TREND_FILTER', False)
             trend_ok_buy = (current_price > ema_slow) if use_trend_filter else True
             trend_ok_sell = (current_price < ema_slow) if use_trend_filter else True
             
-            macd_ok_buy = bool((macd_val > macd_sig) and (rsi_val > config.RSI_BUY_MIN) and trend_ok_buy)
-            macd_ok_sell = bool((macd_val < macd_sig) and (rsi_val < config.RSI_SELL_MAX) and trend_ok_sell)
+            macd_ok_buy = bool((macd_val > macd_sig) and (rsi_val > self.settings.RSI_BUY_MIN) and trend_ok_buy)
+            macd_ok_sell = bool((macd_val < macd_sig) and (rsi_val < self.settings.RSI_SELL_MAX) and trend_ok_sell)
             
             # Confidence gate
-            if confidence < float(config.PROB_THRESHOLD):
+            if confidence < float(self.settings.PROB_THRESHOLD):
                 confidence_rejects += 1
                 self._check_trade_exits(current_price, idx)
                 continue
@@ -198,15 +277,15 @@ class GoldBacktester:
             # BUY signal: previous = 0, current = 1
             if (prev_pred == 0) and (curr_pred == 1) and macd_ok_buy:
                 # Use ATR-based stops if enabled
-                use_atr = getattr(config, 'USE_ATR_STOPS', False)
+                use_atr = getattr(self.settings, 'USE_ATR_STOPS', False)
                 if use_atr and atr_val > 0:
-                    atr_stop_mult = getattr(config, 'ATR_STOP_MULTIPLIER', 2.0)
-                    atr_tp_mult = getattr(config, 'ATR_TP_MULTIPLIER', 10)
+                    atr_stop_mult = getattr(self.settings, 'ATR_STOP_MULTIPLIER', 2.0)
+                    atr_tp_mult = getattr(self.settings, 'ATR_TP_MULTIPLIER', 10)
                     sl = round(current_price - (atr_val * atr_stop_mult), 2)
                     tp = round(current_price + (atr_val * atr_tp_mult), 2)
                 else:
-                    sl = round(current_price * (1 - config.STOP_LOSS_PERCENT), 2)
-                    tp = round(current_price * (1 + config.TAKE_PROFIT_PERCENT), 2)
+                    sl = round(current_price * (1 - self.settings.STOP_LOSS_PERCENT), 2)
+                    tp = round(current_price * (1 + self.settings.TAKE_PROFIT_PERCENT), 2)
                 
                 self.trades.append({
                     'timestamp': timestamp,
@@ -221,20 +300,21 @@ class GoldBacktester:
                     'status': 'Open',
                     'confidence': confidence
                 })
+                self._open_positions.add(self.trades[-1])
                 signals_generated += 1
             
             # SELL signal: previous = 1, current = 0
             elif (prev_pred == 1) and (curr_pred == 0) and macd_ok_sell:
                 # Use ATR-based stops if enabled
-                use_atr = getattr(config, 'USE_ATR_STOPS', False)
+                use_atr = getattr(self.settings, 'USE_ATR_STOPS', False)
                 if use_atr and atr_val > 0:
-                    atr_stop_mult = getattr(config, 'ATR_STOP_MULTIPLIER', 2.0)
-                    atr_tp_mult = getattr(config, 'ATR_TP_MULTIPLIER', 5.0)
+                    atr_stop_mult = getattr(self.settings, 'ATR_STOP_MULTIPLIER', 2.0)
+                    atr_tp_mult = getattr(self.settings, 'ATR_TP_MULTIPLIER', 5.0)
                     sl = round(current_price + (atr_val * atr_stop_mult), 2)
                     tp = round(current_price - (atr_val * atr_tp_mult), 2)
                 else:
-                    sl = round(current_price * (1 + config.STOP_LOSS_PERCENT), 2)
-                    tp = round(current_price * (1 - config.TAKE_PROFIT_PERCENT), 2)
+                    sl = round(current_price * (1 + self.settings.STOP_LOSS_PERCENT), 2)
+                    tp = round(current_price * (1 - self.settings.TAKE_PROFIT_PERCENT), 2)
                 
                 self.trades.append({
                     'timestamp': timestamp,
@@ -249,6 +329,7 @@ class GoldBacktester:
                     'status': 'Open',
                     'confidence': confidence
                 })
+                self._open_positions.add(self.trades[-1])
                 signals_generated += 1
             else:
                 # MACD/RSI gate failed
@@ -257,7 +338,12 @@ class GoldBacktester:
             # Check if any open trades hit SL or TP
             self._check_trade_exits(current_price, idx)
         
-        self._print_results(signals_generated, confidence_rejects, macd_rejects, volatility_rejects)
+        return {
+            'signals_generated': signals_generated,
+            'confidence_rejects': confidence_rejects,
+            'macd_rejects': macd_rejects,
+            'volatility_rejects': volatility_rejects
+        }
     
     def _check_trade_exits(self, current_price, idx):
         """Check if open trades hit SL or TP"""
@@ -266,40 +352,23 @@ class GoldBacktester:
         if hasattr(self, '_current_timestamp'):
             current_timestamp = self._current_timestamp
         
-        for trade in self.trades:
-            if trade['status'] == 'Open':
-                if trade['type'] == 'BUY':
-                    # Check SL
-                    if current_price <= trade['sl']:
-                        trade['close_price'] = trade['sl']
-                        trade['close_timestamp'] = current_timestamp
-                        trade['close_reason'] = 'SL_HIT'
-                        # For Gold: pips = price_diff * 10 (each 0.1 = 1 pip)
-                        trade['pips'] = (trade['sl'] - trade['entry_price']) * 10
-                        trade['status'] = 'Closed'
-                    # Check TP
-                    elif current_price >= trade['tp']:
-                        trade['close_price'] = trade['tp']
-                        trade['close_timestamp'] = current_timestamp
-                        trade['close_reason'] = 'TP_HIT'
-                        trade['pips'] = (trade['tp'] - trade['entry_price']) * 10
-                        trade['status'] = 'Closed'
-                
-                elif trade['type'] == 'SELL':
-                    # Check SL
-                    if current_price >= trade['sl']:
-                        trade['close_price'] = trade['sl']
-                        trade['close_timestamp'] = current_timestamp
-                        trade['close_reason'] = 'SL_HIT'
-                        trade['pips'] = (trade['entry_price'] - trade['sl']) * 10
-                        trade['status'] = 'Closed'
-                    # Check TP
-                    elif current_price <= trade['tp']:
-                        trade['close_price'] = trade['tp']
-                        trade['close_timestamp'] = current_timestamp
-                        trade['close_reason'] = 'TP_HIT'
-                        trade['pips'] = (trade['entry_price'] - trade['tp']) * 10
-                        trade['status'] = 'Closed'
+        # SL takes precedence over TP when both are crossed on the same bar
+        for trade in self._open_positions.pop_stop_losses(current_price):
+            self._close_trade(trade, trade['sl'], 'SL_HIT', current_timestamp)
+        for trade in self._open_positions.pop_take_profits(current_price):
+            self._close_trade(trade, trade['tp'], 'TP_HIT', current_timestamp)
+    
+    def _close_trade(self, trade, close_price, reason, close_timestamp):
+        """Mark an open trade as closed at the given level"""
+        trade['close_price'] = close_price
+        trade['close_timestamp'] = close_timestamp
+        trade['close_reason'] = reason
+        # For Gold: pips = price_diff * 10 (each 0.1 = 1 pip)
+        if trade['type'] == 'BUY':
+            trade['pips'] = (close_price - trade['entry_price']) * 10
+        else:
+            trade['pips'] = (trade['entry_price'] - close_price) * 10
+        trade['status'] = 'Closed'
     
     def _print_results(self, signals_generated, confidence_rejects, macd_rejects, volatility_rejects=0):
         """Print backtest results with monthly breakdown"""
@@ -324,55 +393,30 @@ class GoldBacktester:
         
         # Overall metrics
         if closed_trades:
-            pips_list = [t['pips'] for t in closed_trades if t['pips'] is not None]
-            if pips_list:
-                total_pips = sum(pips_list)
-                winning_trades = len([p for p in pips_list if p > 0])
-                losing_trades = len([p for p in pips_list if p < 0])
-                win_rate = (winning_trades / len(pips_list) * 100) if pips_list else 0
+            summary = pips_summary([t['pips'] for t in closed_trades])
+            if summary['trades']:
                 lines.append("\n💰 P&L METRICS (Total):")
-                lines.append(f"   Total Pips: {total_pips:.2f}")
-                lines.append(f"   Winning Trades: {winning_trades} ✅")
-                lines.append(f"   Losing Trades: {losing_trades} ❌")
-                lines.append(f"   Win Rate: {win_rate:.2f}%")
-                if winning_trades > 0:
-                    avg_win = np.mean([p for p in pips_list if p > 0])
-                    lines.append(f"   Avg Win: {avg_win:.2f} pips")
-                if losing_trades > 0:
-                    avg_loss = np.mean([p for p in pips_list if p < 0])
-                    lines.append(f"   Avg Loss: {avg_loss:.2f} pips")
-                if winning_trades > 0 and losing_trades > 0:
-                    avg_win = np.mean([p for p in pips_list if p > 0])
-                    avg_loss = abs(np.mean([p for p in pips_list if p < 0]))
-                    profit_factor = avg_win * winning_trades / (avg_loss * losing_trades)
-                    lines.append(f"   Profit Factor: {profit_factor:.2f}")
+                lines.append(f"   Total Pips: {summary['total_pips']:.2f}")
+                lines.append(f"   Winning Trades: {summary['winning_trades']} ✅")
+                lines.append(f"   Losing Trades: {summary['losing_trades']} ❌")
+                lines.append(f"   Win Rate: {summary['win_rate']:.2f}%")
+                if summary['winning_trades'] > 0:
+                    lines.append(f"   Avg Win: {summary['avg_win']:.2f} pips")
+                if summary['losing_trades'] > 0:
+                    lines.append(f"   Avg Loss: {summary['avg_loss']:.2f} pips")
+                if summary['winning_trades'] > 0 and summary['losing_trades'] > 0:
+                    lines.append(f"   Profit Factor: {summary['profit_factor']:.2f}")
         
         # Monthly breakdown (by close timestamp)
         if closed_trades:
-            month_buckets = {}
-            for t in closed_trades:
-                ts = t['timestamp']
-                month_key = ts.strftime('%Y-%m') if hasattr(ts, 'strftime') else str(ts)[:7]
-                month_buckets.setdefault(month_key, []).append(t)
+            months = monthly_breakdown([t['timestamp'] for t in closed_trades], [t['pips'] for t in closed_trades])
             lines.append("\n📅 MONTHLY P&L (by close date):")
-            for month in sorted(month_buckets.keys()):
-                trades = month_buckets[month]
-                pips = [tr['pips'] for tr in trades if tr['pips'] is not None]
-                total_pips = sum(pips) if pips else 0.0
-                wins = len([p for p in pips if p > 0])
-                losses = len([p for p in pips if p < 0])
-                win_rate = (wins / len(pips) * 100) if pips else 0
-                if wins > 0 and losses > 0:
-                    avg_win = np.mean([p for p in pips if p > 0])
-                    avg_loss = abs(np.mean([p for p in pips if p < 0]))
-                    profit_factor = avg_win * wins / (avg_loss * losses)
-                else:
-                    profit_factor = float('inf') if wins > 0 else 0.0
-                lines.append(f"   {month}: Total Pips={total_pips:.2f} | Trades={len(pips)} (✅{wins} wins, ❌{losses} losses) | WinRate={win_rate:.1f}% | ProfitFactor={profit_factor:.2f}")
+            for month, row in months.iterrows():
+                lines.append(f"   {month}: Total Pips={row['total_pips']:.2f} | Trades={int(row['trades'])} (✅{int(row['wins'])} wins, ❌{int(row['losses'])} losses) | WinRate={row['win_rate']:.1f}% | ProfitFactor={row['profit_factor']:.2f}")
         
         # Detailed closed trades
         if closed_trades:
-            tz_offset = pd.Timedelta(hours=getattr(config, 'TIMEZONE_OFFSET_HOURS', 0))
+            tz_offset = pd.Timedelta(hours=getattr(self.settings, 'TIMEZONE_OFFSET_HOURS', 0))
             lines.append("\n📋 CLOSED TRADE DETAILS:")
             lines.append("-"*70)
             for i, trade in enumerate(closed_trades, 1):
@@ -391,8 +435,9 @@ class GoldBacktester:
         lines.append("\n" + "="*70)
         output_text = "\n".join(lines)
         print(output_text)
-        os.makedirs(config.DATA_DIR, exist_ok=True)
-        report_path = os.path.join(config.DATA_DIR, "backtest_report.txt")
+        report_path = getattr(self.settings, 'BACKTEST_REPORT_PATH',
+                              os.path.join(self.settings.DATA_DIR, "backtest_report.txt"))
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
         with open(report_path, "w", encoding="utf-8") as f:
             f.write(output_text)
         print(f"\n📝 Backtest report saved to: {report_path}")
@@ -0,0 +1,112 @@
+"""
+Benchmark Inference Backends
+Times the library predict_proba against the compiled flat-array trees
+(utils/tree_inference.py) for single-bar and full-history batches, and
+checks that both backends give the same probabilities and predictions
+"""
+
+import os
+import time
+import statistics
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+
+import config
+from train_model import train_model
+from utils.indicators import add_all_indicators, prepare_features
+from utils.mt5_fetch import load_csv_data
+from utils.tree_inference import compile_model
+
+
+BENCHMARK_FILE = os.path.join(config.DATA_DIR, 'XAUUSD_h4.csv')
+MODEL_TYPES = ('rf', 'xgboost', 'lightgbm')
+PARITY_TOLERANCE = 1e-6   # XGBoost sums leaves in float32
+
+
+def _single_bar_latency(model, X, n_bars):
+    """Median seconds per predict_proba call on one bar (the last n_bars, one at a time)"""
+    timings = []
+    for i in range(len(X) - n_bars, len(X)):
+        row = X[i:i + 1]
+        start = time.perf_counter()
+        model.predict_proba(row)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def _batch_time(model, X, repeats):
+    """Best wall time of predict_proba over all rows"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict_proba(X)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_parity(model, compiled, X):
+    """Largest probability difference and whether predicted labels agree"""
+    max_diff = float(np.abs(model.predict_proba(X) - compiled.predict_proba(X)).max())
+    labels_match = bool(np.array_equal(model.predict(X), compiled.predict(X)))
+    return max_diff, labels_match
+
+
+def benchmark_model(model_type, X, y, n_bars=200, repeats=3):
+    """Train one model type and benchmark both backends"""
+    model = train_model(X, y, model_type=model_type, n_estimators=config.N_ESTIMATORS,
+                        random_state=config.RANDOM_STATE, max_depth=config.MAX_DEPTH,
+                        min_samples_split=config.MIN_SAMPLES_SPLIT)
+    start = time.perf_counter()
+    compiled = compile_model(model)
+    compile_time = time.perf_counter() - start
+
+    max_diff, labels_match = check_parity(model, compiled, X)
+    native_one = _single_bar_latency(model, X, n_bars)
+    compiled_one = _single_bar_latency(compiled, X, n_bars)
+    return {
+        'trees': compiled.n_trees,
+        'depth': compiled.max_depth,
+        'compile_time': compile_time,
+        'native_one': native_one,
+        'compiled_one': compiled_one,
+        'native_batch': _batch_time(model, X, repeats),
+        'compiled_batch': _batch_time(compiled, X, repeats),
+        'max_diff': max_diff,
+        'parity': labels_match and max_diff <= PARITY_TOLERANCE
+    }
+
+
+def main():
+    print("=" * 70)
+    print("INFERENCE BACKEND BENCHMARK")
+    print("=" * 70)
+
+    df = load_csv_data(BENCHMARK_FILE)
+    if df is None:
+        return
+    X, y = prepare_features(add_all_indicators(df))
+
+    results = {model_type: benchmark_model(model_type, X, y) for model_type in MODEL_TYPES}
+
+    print(f"\nSingle bar (median per call) and full history ({len(X)} bars, best of 3)")
+    print(f"\n{'Model':<10} {'Native 1 (us)':>14} {'Compiled 1 (us)':>16} {'Native N (s)':>13} "
+          f"{'Compiled N (s)':>15}")
+    print("-" * 70)
+    for model_type, r in results.items():
+        print(f"{model_type:<10} {r['native_one'] * 1e6:>14.0f} {r['compiled_one'] * 1e6:>16.0f} "
+              f"{r['native_batch']:>13.3f} {r['compiled_batch']:>15.3f}")
+
+    print(f"\n{'Model':<10} {'Trees':>6} {'Depth':>6} {'Compile (s)':>12} {'Max |dP|':>10} {'Parity':>7}")
+    print("-" * 70)
+    for model_type, r in results.items():
+        print(f"{model_type:<10} {r['trees']:>6} {r['depth']:>6} {r['compile_time']:>12.3f} "
+              f"{r['max_diff']:>10.1e} {str(r['parity']):>7}")
+
+    if not all(r['parity'] for r in results.values()):
+        raise SystemExit("❌ Compiled predictions differ from the library's")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark Model Serialization
+Compares load time, resident memory and file size of the rf/xgboost/lightgbm
+models across save formats: joblib uncompressed, joblib compressed,
+joblib memory-mapped and the native XGBoost/LightGBM booster files. Every
+load runs in a fresh interpreter so memory figures are not shared.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+import warnings
+warnings.filterwarnings('ignore')
+
+import config
+from train_model import train_model
+from utils.indicators import add_all_indicators, prepare_features
+from utils.model_loader import save_model
+from utils.mt5_fetch import load_csv_data
+
+
+BENCHMARK_FILE = os.path.join(config.DATA_DIR, 'XAUUSD_h4.csv')
+MODEL_TYPES = ('rf', 'xgboost', 'lightgbm')
+N_ESTIMATORS = 300
+
+
+def _rss_mb():
+    """(total, anonymous) resident memory of this process in MB (Linux)"""
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('VmRSS', 'RssAnon'):
+                values[key] = int(rest.split()[0]) / 1024
+    return values.get('VmRSS', 0.0), values.get('RssAnon', 0.0)
+
+
+def _load(path, fmt, model_type):
+    """Load one artifact in the given format"""
+    import joblib
+    if fmt == 'native' and model_type == 'xgboost':
+        import xgboost
+        model = xgboost.XGBClassifier()
+        model.load_model(path)
+        return model
+    if fmt == 'native' and model_type == 'lightgbm':
+        import lightgbm
+        return lightgbm.Booster(model_file=path)
+    return joblib.load(path, mmap_mode='r' if fmt == 'mmap' else None)
+
+
+def measure(path, fmt, model_type, repeats):
+    """Run in a child process: memory added by the first load, best load time"""
+    # Import the libraries first so only the model itself is measured
+    import numpy, sklearn, xgboost, lightgbm  # noqa: F401
+    rss_before, anon_before = _rss_mb()
+    start = time.perf_counter()
+    model = _load(path, fmt, model_type)
+    first = time.perf_counter() - start
+    rss_after, anon_after = _rss_mb()
+
+    best = first
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        _load(path, fmt, model_type)
+        best = min(best, time.perf_counter() - start)
+    del model
+    return {'load_time': best, 'rss_mb': rss_after - rss_before, 'anon_mb': anon_after - anon_before}
+
+
+def _measure_in_child(path, fmt, model_type, repeats):
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--measure', path, fmt, model_type, str(repeats)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def save_formats(model, model_type, model_dir):
+    """Write one model in every format it supports; returns {format: path}"""
+    name = f'bench_{model_type}'
+    paths = {
+        'joblib': save_model(model, model_dir=model_dir, model_name=f'{name}.pkl', compress=0),
+        'compressed': save_model(model, model_dir=model_dir, model_name=f'{name}_z.pkl', compress=3)
+    }
+    paths['mmap'] = paths['joblib']
+    if model_type == 'xgboost':
+        paths['native'] = os.path.join(model_dir, f'{name}.ubj')
+        model.save_model(paths['native'])
+    elif model_type == 'lightgbm':
+        paths['native'] = os.path.join(model_dir, f'{name}.txt')
+        model.booster_.save_model(paths['native'])
+    return paths
+
+
+def main(repeats=5):
+    print("=" * 70)
+    print("MODEL SERIALIZATION BENCHMARK")
+    print("=" * 70)
+
+    df = load_csv_data(BENCHMARK_FILE)
+    if df is None:
+        return
+    X, y = prepare_features(add_all_indicators(df))
+
+    rows = []
+    with tempfile.TemporaryDirectory() as model_dir:
+        for model_type in MODEL_TYPES:
+            model = train_model(X, y, model_type=model_type, n_estimators=N_ESTIMATORS,
+                                random_state=config.RANDOM_STATE, max_depth=config.MAX_DEPTH,
+                                min_samples_split=config.MIN_SAMPLES_SPLIT)
+            for fmt, path in save_formats(model, model_type, model_dir).items():
+                result = _measure_in_child(path, fmt, model_type, repeats)
+                result.update(model=model_type, format=fmt, size_mb=os.path.getsize(path) / 1024 / 1024)
+                rows.append(result)
+
+    print(f"\n{'Model':<10} {'Format':<12} {'Size (MB)':>10} {'Load (ms)':>10} {'RSS (MB)':>10} {'Private (MB)':>13}")
+    print("-" * 70)
+    for r in rows:
+        print(f"{r['model']:<10} {r['format']:<12} {r['size_mb']:>10.2f} {r['load_time'] * 1000:>10.1f} "
+              f"{r['rss_mb']:>10.1f} {r['anon_mb']:>13.1f}")
+    print("\nRSS: resident memory added by the first load; Private: the part not shared through the page cache")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--measure':
+        path, fmt, model_type, repeats = sys.argv[2:6]
+        print(json.dumps(measure(path, fmt, model_type, int(repeats))))
+    else:
+        main()
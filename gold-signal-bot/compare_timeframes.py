@@ -1,8 +1,16 @@
 """
 Compare Timeframes Script
-Trains and backtests multiple timeframes to find the best performing one
+Trains and backtests multiple timeframes to find the best performing one.
+Each timeframe's load -> indicators -> train -> backtest pipeline runs as an
+independent task on a process pool, with the CPU cores split between tasks.
+Timeframes come from one CSV each, or are all resampled from a single base
+export (BASE_BARS_CSV_PATH).
 """
 
+import io
+import time
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
@@ -10,61 +18,98 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import warnings
 import os
-import pickle
 from datetime import datetime, timedelta
 
 warnings.filterwarnings('ignore')
 
 import config
-from utils.indicators import add_all_indicators, prepare_features
+from utils.indicators import prepare_features, htf_feature_specs
+from utils.indicator_cache import cached_indicators
 from utils.model_loader import save_model, save_training_metadata
 from utils.mt5_fetch import load_csv_data
+from utils.backtest_engine import simulate_single_position
+from utils.resample import TIMEFRAME_MINUTES, bar_store, normalize_timeframe
+from utils.settings import Settings
+from train_model import split_core_budget
 
 
 class TimeframeComparator:
     """Compare performance across multiple timeframes"""
     
-    def __init__(self):
+    def __init__(self, base_csv=None):
+        """
+        Initialize comparator
+        
+        Args:
+            base_csv: Finest-granularity export to resample every timeframe from
+                      (default config.BASE_BARS_CSV_PATH; None reads one CSV per timeframe)
+        """
         self.results = {}
+        self.wall_time = None
+        self.base_csv = base_csv or getattr(config, 'BASE_BARS_CSV_PATH', None)
         self.timeframes = {
             '1D': 'data/XAUUSD_1D.csv',
             'H4': 'data/XAUUSD_h4.csv',
             'H1': 'data/XAUUSD_h1.csv'
         }
     
-    def train_timeframe(self, timeframe_name, csv_path):
-        """Train model for a specific timeframe"""
+    @staticmethod
+    def timeframe_settings(timeframe_name):
+        """Config snapshot keeping only the HTF_FEATURES above this timeframe"""
+        settings = Settings.from_config()
+        minutes = TIMEFRAME_MINUTES[normalize_timeframe(timeframe_name)]
+        htf_features = [(timeframe, column) for timeframe, column in htf_feature_specs(settings)
+                        if TIMEFRAME_MINUTES[timeframe] > minutes]
+        return settings.replace(HTF_FEATURES=htf_features)
+    
+    def train_timeframe(self, timeframe_name, csv_path, n_jobs=-1):
+        """
+        Train model for a specific timeframe
+        
+        Args:
+            timeframe_name: Timeframe label ('1D', 'H4', 'H1')
+            csv_path: Bars CSV
+            n_jobs: Cores the model may use (-1 = all)
+        
+        Returns:
+            dict: Model, data and metrics ('timings' holds seconds per stage), or None
+        """
+        timings = {}
+        stage_start = time.perf_counter()
         print(f"\n{'='*70}")
         print(f"🔄 TRAINING: {timeframe_name}")
         print(f"{'='*70}")
-        print(f"CSV Path: {csv_path}")
         
         # Load data
-        if not os.path.exists(csv_path):
-            print(f"❌ File not found: {csv_path}")
-            return None
-        
-        df = load_csv_data(csv_path)
-        if df is None or df.empty:
-            print(f"❌ Failed to load {csv_path}")
+        if self.base_csv:
+            print(f"Source: {self.base_csv} (resampled to {timeframe_name})")
+            try:
+                bars = bar_store(self.base_csv).get(timeframe_name)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return None
+        else:
+            print(f"CSV Path: {csv_path}")
+            if not os.path.exists(csv_path):
+                print(f"❌ File not found: {csv_path}")
+                return None
+            bars = load_csv_data(csv_path)
+        if bars is None or bars.empty:
+            print(f"❌ Failed to load bars for {timeframe_name}")
             return None
         
-        print(f"✅ Loaded {len(df)} candles")
-        
-        # Sample for speed (max 10k candles for training)
-        if len(df) > 10000:
-            sample_idx = np.random.choice(len(df), 10000, replace=False)
-            sample_idx.sort()
-            df = df.iloc[sample_idx].reset_index(drop=True)
-            print(f"   Sampled to {len(df)} candles for speed")
+        print(f"✅ Loaded {len(bars)} candles")
+        timings['load'] = time.perf_counter() - stage_start
         
-        # Add indicators
+        # Add indicators (computed once; the backtest reuses the test rows)
+        stage_start = time.perf_counter()
         print(f"📊 Computing indicators...")
-        df = add_all_indicators(df)
+        settings = self.timeframe_settings(timeframe_name)
+        df = cached_indicators(bars, settings=settings)
         
         # Prepare features
         print(f"🎯 Preparing features...")
-        X, y = prepare_features(df)
+        X, y = prepare_features(df, settings=settings)
         
         if X is None or len(X) == 0:
             print(f"❌ Failed to prepare features")
@@ -80,8 +125,10 @@ class TimeframeComparator:
         y_train, y_test = y[:split_idx], y[split_idx:]
         
         print(f"   Train samples: {len(X_train)}, Test samples: {len(X_test)}")
+        timings['indicators'] = time.perf_counter() - stage_start
         
         # Train model
+        stage_start = time.perf_counter()
         print(f"🤖 Training RandomForest ({config.N_ESTIMATORS} trees)...")
         model = RandomForestClassifier(
             n_estimators=config.N_ESTIMATORS,
@@ -90,15 +137,16 @@ class TimeframeComparator:
             min_samples_leaf=config.MIN_SAMPLES_LEAF,
             random_state=config.RANDOM_STATE,
             class_weight='balanced',
-            n_jobs=-1,
+            n_jobs=n_jobs,
             verbose=0
         )
         
         model.fit(X_train, y_train)
         
-        # Evaluate
+        # Evaluate (test probabilities are kept for the backtest)
         y_pred_train = model.predict(X_train)
-        y_pred_test = model.predict(X_test)
+        test_proba = model.predict_proba(X_test)
+        y_pred_test = model.classes_[np.argmax(test_proba, axis=1)]
         
         train_acc = accuracy_score(y_train, y_pred_train)
         test_acc = accuracy_score(y_test, y_pred_test)
@@ -108,21 +156,23 @@ class TimeframeComparator:
         
         # Save model
         model_name = f'gold_signal_model_{timeframe_name}.pkl'
-        model_path = os.path.join(config.MODEL_DIR, model_name)
-        os.makedirs(config.MODEL_DIR, exist_ok=True)
-        with open(model_path, 'wb') as f:
-            pickle.dump(model, f)
-        print(f"💾 Model saved: {model_path}")
+        model_path = save_model(model, model_dir=config.MODEL_DIR, model_name=model_name)
+        timings['train'] = time.perf_counter() - stage_start
         
         return {
             'model': model,
             'model_path': model_path,
             'train_acc': train_acc,
             'test_acc': test_acc,
+            'bars': bars,
             'df': df,
+            'X': X,
             'X_test': X_test,
             'y_test': y_test,
-            'num_candles': len(df)
+            'test_proba': test_proba,
+            'split_idx': split_idx,
+            'num_candles': len(df),
+            'timings': timings
         }
     
     def backtest_timeframe(self, timeframe_name, model_data):
@@ -136,121 +186,21 @@ class TimeframeComparator:
         print(f"{'='*70}")
         
         model = model_data['model']
-        df = model_data['df'].copy()
         
-        # Limit backtest to last 1000 candles for speed
-        df = df.tail(1000).reset_index(drop=True)
+        # Backtest the held-out test segment with the features and
+        # predictions computed at training time (rows of X align with df)
+        df = model_data['df'].iloc[model_data['split_idx']:]
+        y_pred_proba = model_data['test_proba']
         
-        # Add indicators and features
-        df = add_all_indicators(df)
-        X, y = prepare_features(df)
-        
-        if X is None or len(X) == 0:
-            print(f"❌ Failed to prepare features for backtest")
+        if len(df) == 0:
+            print(f"❌ No test bars to backtest")
             return None
         
-        # Get predictions
-        y_pred = model.predict(X)
-        y_pred_proba = model.predict_proba(X)
-        
-        # Add predictions to dataframe
-        df['pred'] = y_pred
-        df['pred_proba'] = y_pred_proba.max(axis=1)
-        
-        # Simulate trading (optimized)
-        trades = []
-        position = None
-        entry_price = None
-        entry_idx = None
-        entry_time = None
-        
-        for i in range(1, len(df)):
-            current_pred = df.iloc[i]['pred']
-            current_proba = df.iloc[i]['pred_proba']
-            current_price = df.iloc[i]['Close']
-            current_time = i
-            
-            prev_pred = df.iloc[i-1]['pred'] if i > 0 else None
-            
-            # Entry signals
-            if position is None and current_proba >= config.PROB_THRESHOLD:
-                # BUY signal (pred=1)
-                if current_pred == 1 and prev_pred == 0:
-                    rsi = df.iloc[i].get('RSI', 50)
-                    if rsi >= config.RSI_BUY_MIN:
-                        position = 'BUY'
-                        entry_price = current_price
-                        entry_idx = i
-                        entry_time = current_time
-                
-                # SELL signal (pred=0)
-                elif current_pred == 0 and prev_pred == 1:
-                    rsi = df.iloc[i].get('RSI', 50)
-                    if rsi <= config.RSI_SELL_MAX:
-                        position = 'SELL'
-                        entry_price = current_price
-                        entry_idx = i
-                        entry_time = current_time
-            
-            # Exit signals
-            elif position is not None:
-                if position == 'BUY':
-                    pips = (current_price - entry_price) * 100
-                    stop_loss = entry_price * (1 - config.STOP_LOSS_PERCENT)
-                    take_profit = entry_price * (1 + config.TAKE_PROFIT_PERCENT)
-                    
-                    # SL hit
-                    if current_price <= stop_loss:
-                        trades.append({
-                            'Pips': -abs(config.STOP_LOSS_PERCENT * 100),
-                            'Reason': 'SL'
-                        })
-                        position = None
-                    
-                    # TP hit
-                    elif current_price >= take_profit:
-                        trades.append({
-                            'Pips': config.TAKE_PROFIT_PERCENT * 100,
-                            'Reason': 'TP'
-                        })
-                        position = None
-                    
-                    # Signal reversal
-                    elif current_pred == 0 and current_proba >= config.PROB_THRESHOLD:
-                        trades.append({
-                            'Pips': pips,
-                            'Reason': 'Signal'
-                        })
-                        position = None
-                
-                elif position == 'SELL':
-                    pips = (entry_price - current_price) * 100
-                    stop_loss = entry_price * (1 + config.STOP_LOSS_PERCENT)
-                    take_profit = entry_price * (1 - config.TAKE_PROFIT_PERCENT)
-                    
-                    # SL hit
-                    if current_price >= stop_loss:
-                        trades.append({
-                            'Pips': -abs(config.STOP_LOSS_PERCENT * 100),
-                            'Reason': 'SL'
-                        })
-                        position = None
-                    
-                    # TP hit
-                    elif current_price <= take_profit:
-                        trades.append({
-                            'Pips': config.TAKE_PROFIT_PERCENT * 100,
-                            'Reason': 'TP'
-                        })
-                        position = None
-                    
-                    # Signal reversal
-                    elif current_pred == 1 and current_proba >= config.PROB_THRESHOLD:
-                        trades.append({
-                            'Pips': pips,
-                            'Reason': 'Signal'
-                        })
-                        position = None
+        y_pred = model.classes_[np.argmax(y_pred_proba, axis=1)]
+        
+        # Simulate trading
+        rsi = df['RSI'] if 'RSI' in df else np.full(len(df), 50.0)
+        trades = simulate_single_position(df['Close'], y_pred, y_pred_proba.max(axis=1), rsi)
         
         # Calculate metrics
         if len(trades) == 0:
@@ -304,20 +254,80 @@ class TimeframeComparator:
             'model_path': model_data['model_path']
         }
     
-    def run_comparison(self):
-        """Run full comparison across all timeframes"""
+    def run_pipeline(self, timeframe, csv_path, n_jobs=-1):
+        """
+        Train and backtest one timeframe (runs in a worker process)
+        
+        Args:
+            timeframe: Timeframe label
+            csv_path: Bars CSV
+            n_jobs: Cores the model may use
+        
+        Returns:
+            (model_data, backtest_result, log): model_data without the model and
+            bars (the model is saved to disk), and the pipeline's console output
+        """
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            model_data = self.train_timeframe(timeframe, csv_path, n_jobs=n_jobs)
+            stage_start = time.perf_counter()
+            backtest_result = self.backtest_timeframe(timeframe, model_data)
+            if model_data is not None:
+                model_data['timings']['backtest'] = time.perf_counter() - stage_start
+        
+        # Only the metrics go back to the parent process
+        if model_data is not None:
+            model_data = {k: v for k, v in model_data.items()
+                          if k not in ('model', 'bars', 'df', 'X', 'X_test', 'y_test', 'test_proba')}
+        return model_data, backtest_result, log.getvalue()
+    
+    def run_comparison(self, workers=None, core_budget=None):
+        """
+        Run full comparison across all timeframes
+        
+        Args:
+            workers: Parallel timeframe pipelines (default config.COMPARE_WORKERS,
+                     else one per timeframe capped by CPU count)
+            core_budget: Cores shared by the pipelines (default config.COMPARE_CORE_BUDGET, else all)
+        
+        Returns:
+            dict: Backtest results per timeframe
+        """
         print(f"\n🌟 MULTI-TIMEFRAME COMPARISON 🌟")
         print(f"Timeframes: {', '.join(self.timeframes.keys())}")
         
-        # Train all timeframes
-        model_data = {}
-        for timeframe, csv_path in self.timeframes.items():
-            model_data[timeframe] = self.train_timeframe(timeframe, csv_path)
+        cpu_count = os.cpu_count() or 1
+        if workers is None:
+            workers = getattr(config, 'COMPARE_WORKERS', None) or min(len(self.timeframes), cpu_count)
+        workers = max(1, min(workers, len(self.timeframes)))
+        if core_budget is None:
+            core_budget = getattr(config, 'COMPARE_CORE_BUDGET', None) or cpu_count
+        # Each running pipeline gets an equal share of the cores
+        n_jobs = split_core_budget(core_budget, workers)[-1]
+        print(f"⚙️ {workers} parallel pipelines x {n_jobs} cores")
+        if self.base_csv:
+            # Parse the base export once; workers reuse it (or its binary bar cache)
+            store = bar_store(self.base_csv)
+            print(f"📦 Resampling every timeframe from {store.base_timeframe} bars in {self.base_csv}")
         
-        # Backtest all timeframes
+        model_data = {}
         backtest_results = {}
-        for timeframe in self.timeframes.keys():
-            backtest_results[timeframe] = self.backtest_timeframe(timeframe, model_data[timeframe])
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(self.run_pipeline, timeframe, csv_path, n_jobs): timeframe
+                for timeframe, csv_path in self.timeframes.items()
+            }
+            for future in as_completed(futures):
+                timeframe = futures[future]
+                model_data[timeframe], backtest_results[timeframe], log = future.result()
+                print(log, end='')
+                print(f"🏁 {timeframe} finished after {time.perf_counter() - start:.1f}s")
+        self.wall_time = time.perf_counter() - start
+        
+        # Report in the configured timeframe order
+        model_data = {tf: model_data[tf] for tf in self.timeframes}
+        backtest_results = {tf: backtest_results[tf] for tf in self.timeframes}
         
         # Generate comparison report
         self.generate_report(model_data, backtest_results)
@@ -388,6 +398,19 @@ class TimeframeComparator:
                     f.write(f"Avg Loss: {results['avg_loss']:.2f} pips\n")
                     f.write(f"Profit Factor: {results['profit_factor']:.2f}\n")
                     f.write(f"Model Path: {results['model_path']}\n")
+            
+            # Stage timings
+            f.write("\n\nSTAGE TIMINGS (seconds)\n")
+            f.write("-" * 80 + "\n")
+            f.write(f"{'Timeframe':<12} {'Load':>10} {'Indicators':>12} {'Train':>10} {'Backtest':>10} {'Total':>10}\n")
+            f.write("-" * 80 + "\n")
+            for timeframe, data in model_data.items():
+                if data:
+                    t = data['timings']
+                    f.write(f"{timeframe:<12} {t.get('load', 0):>10.2f} {t.get('indicators', 0):>12.2f} "
+                           f"{t.get('train', 0):>10.2f} {t.get('backtest', 0):>10.2f} {sum(t.values()):>10.2f}\n")
+            if self.wall_time is not None:
+                f.write(f"\nWall time (pipelines in parallel): {self.wall_time:.2f}s\n")
         
         print(f"\n✅ Report saved: {report_path}")
 
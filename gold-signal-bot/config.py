@@ -26,6 +26,7 @@ TIMEZONE_OFFSET_HOURS = 1      # Timezone offset for display (UTC+1 = 1, UTC-5 =
 # AI Model Settings
 MODEL_TYPE = 'xgboost'          # 'rf', 'xgboost', 'lightgbm', or 'ensemble'
 ENSEMBLE_MODELS = ['rf', 'xgboost', 'lightgbm'] # Models used in ensemble
+ENSEMBLE_CORE_BUDGET = None    # Cores shared by ensemble members trained in parallel (None = all)
 MODEL_PATH = os.path.join(BASE_DIR, 'models/gold_signal_model.pkl')
 N_ESTIMATORS = 300             # Reduced from 1000: prevent overfitting
 MAX_DEPTH = 6                  # Reduced from 12: simpler, more robust model
@@ -58,18 +59,68 @@ BB_STD_DEV = 2
 ATR_PERIOD = 14
 EMA_FAST = 50
 EMA_SLOW = 200
+HTF_FEATURES = []              # Higher-timeframe features as (timeframe, indicator column), e.g. [('D1', 'RSI'), ('D1', 'EMA_Ratio')]
 
 # Training Settings
 TRAINING_PERIOD = '1y'         # Historical data period for training
 TRAIN_TEST_SPLIT = 0.8         # 80% train, 20% test (for proper evaluation)
+WALK_FORWARD = False           # Also run a walk-forward evaluation after training
+WALK_FORWARD_FOLDS = 5         # Number of walk-forward test folds
+WALK_FORWARD_MODE = 'expanding' # 'expanding' or 'rolling' training windows
+WALK_FORWARD_WORKERS = None    # Worker processes (None = one per fold, capped by CPUs)
+SWEEP_SEARCH = 'grid'          # Hyperparameter sweep: 'grid' or 'random'
+SWEEP_MAX_TRIALS = 50          # Trial cap (random search draws this many)
+SWEEP_OBJECTIVE = 'total_pips' # 'total_pips', 'accuracy' or 'profit_factor' on the holdout
+SWEEP_ETA = 3                  # Successive halving: keep the best 1/ETA trials per rung
+SWEEP_MIN_FRACTION = 0.1       # Share of the training data used by the first rung
+SWEEP_WORKERS = None           # Worker processes (None = CPU count)
+COMPARE_WORKERS = None         # Timeframe pipelines run in parallel by compare_timeframes (None = one per timeframe, capped by CPUs)
+COMPARE_CORE_BUDGET = None     # Cores shared by those pipelines (None = all)
+
+# API Job Execution
+JOB_WORKERS = 2                # Worker processes running API jobs
+JOB_QUEUE_SIZE = 20            # Maximum jobs waiting for a worker
+JOB_USER_CONCURRENCY = 1       # Jobs one user may run at the same time
+JOB_START_METHOD = 'spawn'     # Worker start method ('spawn' is safe with Flask threads)
+JOB_STORE_PATH = os.path.join(BASE_DIR, 'backend', 'data', 'jobs.sqlite3')  # Persistent job status/results
+JOB_ARTIFACTS_DIR = os.path.join(BASE_DIR, 'backend', 'data', 'jobs')  # Per-job model, metadata and report files
+JOB_ARTIFACTS_KEEP = 50        # Most recent job artifact directories kept on disk
+JOB_TTL_HOURS = 24             # Finished jobs and their results are removed after this age
+JOB_RESULTS_MAX_MB = 256       # Stored result budget; oldest results are evicted first
+JOB_EVENTS_POLL_SECONDS = 0.25 # How often progress streams check the store for new events
+JOB_EVENTS_KEEPALIVE_SECONDS = 15  # Idle progress streams send a comment this often
+JOB_LOG_FLUSH_SECONDS = 0.25   # Job log lines are published in batches at most this far apart
+JOB_CANCEL_GRACE_SECONDS = 10  # Time a cancelled job gets to stop its pools before its processes are killed
+RESULTS_PAGE_SIZE = 100        # Default trades per page of /results/<job_id>/trades
+RESULTS_MAX_PAGE_SIZE = 1000   # Largest trades page a client may request
+RESULTS_CHUNKED_FIELDS = ('trades',)  # Result lists stored in chunks so a page only loads its own
+RESULTS_CHUNK_SIZE = 500       # Items per stored chunk of those lists
+RESULTS_GZIP_MIN_BYTES = 1024  # Result responses at least this large are gzip-compressed
+STRATEGY_STORE_PATH = os.path.join(BASE_DIR, 'backend', 'data', 'strategies.sqlite3')  # Saved strategies
+STRATEGY_PREVIEW_POINTS = 200  # Equity-curve points included in strategy listings
 
 # Backtesting Settings
 BACKTEST_PERIOD_DAYS = 350     # Number of days to backtest (~8 years)
+BACKTEST_ENGINE = 'vectorized' # 'vectorized' (array engine) or 'loop' (per-bar reference)
 
 # Data Storage
 SIGNALS_CSV_PATH = os.path.join(BASE_DIR, 'data/signals.csv')
 MODEL_DIR = os.path.join(BASE_DIR, 'models')
 DATA_DIR = os.path.join(BASE_DIR, 'data')
+BACKTEST_REPORT_PATH = os.path.join(DATA_DIR, 'backtest_report.txt')
+USE_CSV_CACHE = True           # Cache parsed CSV bars as memory-mapped .npy files
+CSV_CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+BASE_BARS_CSV_PATH = None      # Finest-granularity export resampled into every timeframe (e.g. data/XAUUSD_h1.csv); None = one CSV per timeframe
+RESAMPLE_SESSION_OFFSET_HOURS = 0  # Session start after midnight of the bar clock when resampling (0 = broker server midnight)
+INDICATOR_CACHE_MAX_MB = 256   # In-memory budget for cached indicator frames
+INDICATOR_CACHE_DISK = True    # Also keep indicator frames on disk (shared by job worker processes, survives restarts)
+INDICATOR_CACHE_DIR = os.path.join(DATA_DIR, 'cache', 'indicators')
+MODEL_CACHE_MAX_MB = 512       # Loaded models kept in memory (by artifact size), least recently used evicted
+MODEL_REGISTRY_PATH = os.path.join(MODEL_DIR, 'registry.json')  # Versions of saved models (hash, params, metrics)
+MODEL_REGISTRY_KEEP = 100      # Most recent versions kept in the registry
+MODEL_COMPRESS = 0             # joblib compression level for saved models (0 keeps arrays memory-mappable)
+MODEL_MMAP_MODE = None         # 'r' memory-maps model arrays on load (uncompressed files only)
+INFERENCE_BACKEND = 'native'   # 'native' (library predict_proba) or 'compiled' (flat-array NumPy trees, fastest per bar)
 
 # Display Settings
 DISPLAY_DECIMALS = 2           # Price decimal places
@@ -38,10 +38,12 @@ export interface BacktestParams {
 }
 
 export interface JobStatus {
-  status: "pending" | "running" | "completed" | "failed";
+  status: "pending" | "running" | "completed" | "failed" | "cancelled";
   progress: number;
   message: string;
   updated_at: string;
+  queue_position?: number;
+  queue_length?: number;
 }
 
 export interface TrainingResults {
@@ -116,10 +118,16 @@ export interface BacktestResults {
     timestamp: string;
     drawdown: number;
   }[];
-  output: string;
+  output?: string;
   timestamp: string;
 }
 
+export interface TradesPage {
+  trades: Trade[];
+  total: number;
+  next_cursor: string | null;
+}
+
 export interface Config {
   indicators: {
     rsi_period: number;
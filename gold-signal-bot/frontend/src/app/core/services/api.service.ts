@@ -1,6 +1,6 @@
 import { Injectable } from "@angular/core";
 import { HttpClient, HttpErrorResponse } from "@angular/common/http";
-import { Observable, throwError, interval } from "rxjs";
+import { Observable, Subscription, throwError, interval } from "rxjs";
 import { catchError, switchMap, takeWhile } from "rxjs/operators";
 import {
   Config,
@@ -10,6 +10,7 @@ import {
   JobStatus,
   TrainingResults,
   BacktestResults,
+  TradesPage,
   Strategy,
 } from "../models/models";
 
@@ -55,14 +56,10 @@ export class ApiService {
       .pipe(catchError(this.handleError));
   }
 
-  // Poll training status until complete
+  // Follow training status until complete
   pollTrainingStatus(jobId: string): Observable<JobStatus> {
-    return interval(1000).pipe(
-      switchMap(() => this.getTrainingStatus(jobId)),
-      takeWhile(
-        (status) => status.status === "pending" || status.status === "running",
-        true
-      )
+    return this.watchJobStatus("train", jobId, () =>
+      this.getTrainingStatus(jobId)
     );
   }
 
@@ -84,23 +81,85 @@ export class ApiService {
       .pipe(catchError(this.handleError));
   }
 
-  getBacktestResults(jobId: string): Observable<BacktestResults> {
+  // Curves are downsampled server-side and the console output is skipped
+  getBacktestResults(
+    jobId: string,
+    points = 1000
+  ): Observable<BacktestResults> {
+    return this.http
+      .get<BacktestResults>(`${this.baseUrl}/backtest/results/${jobId}`, {
+        params: { points, exclude: "output" },
+      })
+      .pipe(catchError(this.handleError));
+  }
+
+  getBacktestTrades(
+    jobId: string,
+    cursor?: string | null,
+    limit = 100
+  ): Observable<TradesPage> {
+    const params: { [key: string]: string | number } = { limit };
+    if (cursor) {
+      params["cursor"] = cursor;
+    }
     return this.http
-      .get<BacktestResults>(`${this.baseUrl}/backtest/results/${jobId}`)
+      .get<TradesPage>(`${this.baseUrl}/backtest/results/${jobId}/trades`, {
+        params,
+      })
       .pipe(catchError(this.handleError));
   }
 
-  // Poll backtest status until complete
+  // Follow backtest status until complete
   pollBacktestStatus(jobId: string): Observable<JobStatus> {
-    return interval(1000).pipe(
-      switchMap(() => this.getBacktestStatus(jobId)),
-      takeWhile(
-        (status) => status.status === "pending" || status.status === "running",
-        true
-      )
+    return this.watchJobStatus("backtest", jobId, () =>
+      this.getBacktestStatus(jobId)
     );
   }
 
+  // Stream job status over Server-Sent Events; fall back to polling every
+  // second if the stream can't be opened or drops
+  private watchJobStatus(
+    kind: "train" | "backtest" | "sweep",
+    jobId: string,
+    getStatus: () => Observable<JobStatus>
+  ): Observable<JobStatus> {
+    const isActive = (status: JobStatus) =>
+      status.status === "pending" || status.status === "running";
+    const poll = interval(1000).pipe(
+      switchMap(() => getStatus()),
+      takeWhile(isActive, true)
+    );
+
+    if (typeof EventSource === "undefined") {
+      return poll;
+    }
+
+    return new Observable<JobStatus>((observer) => {
+      const source = new EventSource(
+        `${this.baseUrl}/${kind}/events/${jobId}`
+      );
+      let fallback: Subscription | undefined;
+
+      source.addEventListener("status", (event) => {
+        const status: JobStatus = JSON.parse((event as MessageEvent).data);
+        observer.next(status);
+        if (!isActive(status)) {
+          source.close();
+          observer.complete();
+        }
+      });
+      source.onerror = () => {
+        source.close();
+        fallback = poll.subscribe(observer);
+      };
+
+      return () => {
+        source.close();
+        fallback?.unsubscribe();
+      };
+    });
+  }
+
   toggleStrategyLive(strategyId: string): Observable<any> {
     return this.http
       .post<any>(`${this.baseUrl}/strategies/${strategyId}/toggle-live`, {})
@@ -121,6 +180,13 @@ export class ApiService {
       .pipe(catchError(this.handleError));
   }
 
+  // Listings carry metrics and a short equity curve; this loads everything
+  getStrategy(strategyId: string): Observable<Strategy> {
+    return this.http
+      .get<Strategy>(`${this.baseUrl}/strategies/${strategyId}`)
+      .pipe(catchError(this.handleError));
+  }
+
   // Auth endpoints
   register(data: any): Observable<any> {
     return this.http
@@ -850,8 +850,18 @@ export class DashboardComponent implements OnInit {
   onStrategyBacktest(strategy: Strategy) {
     this.selectedStrategy = strategy;
     this.isViewOnly = true; // Strategies from this tab are view-only
-    // For Top Strategies, we already have the backtest results in the strategy object
+    // Listings only carry a summary; show it until the full backtest arrives
     this.backtestResults = strategy.backtest || null;
+    const strategyId = strategy.id || strategy.backtest?.timestamp;
+    this.apiService.getStrategy(strategyId).subscribe({
+      next: (full) => {
+        if (this.selectedStrategy === strategy) {
+          this.selectedStrategy = full;
+          this.backtestResults = full.backtest || null;
+        }
+      },
+      error: (error) => console.error("Failed to load strategy:", error),
+    });
   }
 
   closeDetailView() {
@@ -13,7 +13,9 @@ import warnings
 warnings.filterwarnings('ignore')
 
 # Import custom utilities
-from utils.indicators import add_all_indicators, prepare_features
+from utils.indicators import normalize_price_frame, feature_columns, htf_feature_specs, indicator_warmup_bars
+from utils.incremental_indicators import IncrementalIndicators, HigherTimeframeIndicators, to_feature_row
+from utils.resample import TIMEFRAME_MINUTES, normalize_timeframe
 from utils.model_loader import load_model
 from utils.signal_logic import generate_signal, format_signal_output, save_signal_to_csv
 import config
@@ -29,6 +31,10 @@ class GoldSignalBot:
         self.model_path = model_path
         self.model = None
         self.previous_prediction = None
+        self.indicator_state = None  # IncrementalIndicators, warmed on first prediction
+        self.htf_features = htf_feature_specs()
+        self.htf_state = None        # HigherTimeframeIndicators when HTF_FEATURES is set
+        self.feature_columns = feature_columns()
         
         # SL/TP settings (can be customized)
         self.sl_percent = config.STOP_LOSS_PERCENT
@@ -47,19 +53,23 @@ class GoldSignalBot:
         
         return True
     
-    def fetch_latest_data(self, lookback_period='5d'):
+    def fetch_latest_data(self, lookback_period='5d', start=None):
         """
         Fetch latest market data
         
         Args:
             lookback_period: How much historical data to fetch (default '5d')
+            start: Optional first date to fetch instead of lookback_period
         
         Returns:
             pandas DataFrame with latest data
         """
         try:
             gold = yf.Ticker(self.ticker)
-            df = gold.history(period=lookback_period, interval=self.interval)
+            if start is not None:
+                df = gold.history(start=start, interval=self.interval)
+            else:
+                df = gold.history(period=lookback_period, interval=self.interval)
             
             if df.empty:
                 print("⚠️ No data retrieved from Yahoo Finance")
@@ -71,23 +81,66 @@ class GoldSignalBot:
             print(f"❌ Error fetching data: {e}")
             return None
     
+    def htf_warmup_days(self):
+        """Calendar days of bars needed to warm up the higher-timeframe features"""
+        bars = indicator_warmup_bars(base_timeframe=self.interval)
+        # Room for weekends, holidays and the daily session break
+        return int(np.ceil(bars * TIMEFRAME_MINUTES[normalize_timeframe(self.interval)] / 1440 * 1.6)) + 7
+    
+    def _latest_indicators(self, df):
+        """
+        Advance the incremental indicator state (and the higher-timeframe
+        state when HTF_FEATURES is set) with newly completed bars and return
+        indicator values for the latest (possibly forming) bar
+        
+        Returns:
+            dict of indicator values, or None while the fetched history is too
+            short to warm up the higher timeframes
+        """
+        frame = normalize_price_frame(df)
+        completed = frame.iloc[:-1]
+        state = self.indicator_state
+        htf_state = self.htf_state
+        
+        # Continue from the last committed bar if it is inside the fetched window,
+        # otherwise (first run or a gap in the feed) warm up from the whole history
+        if (state is not None and state.last_timestamp is not None and len(completed) > 0
+                and completed.index[0] <= state.last_timestamp <= completed.index[-1]
+                and (htf_state is not None or not self.htf_features)):
+            new_bars = completed[completed.index > state.last_timestamp]
+            for timestamp, bar in zip(new_bars.index, new_bars[['High', 'Low', 'Close']].to_numpy()):
+                state.update(bar[0], bar[1], bar[2], timestamp=timestamp)
+                if htf_state is not None:
+                    htf_state.update(bar[0], bar[1], bar[2], timestamp=timestamp)
+        else:
+            state = IncrementalIndicators.from_history(completed)
+            htf_state = None
+            if self.htf_features:
+                if len(completed) < indicator_warmup_bars(base_timeframe=self.interval):
+                    # The next cycle fetches the full higher-timeframe warm-up (see run_once)
+                    self.indicator_state, self.htf_state = state, None
+                    return None
+                htf_state = HigherTimeframeIndicators.from_history(completed, self.htf_features)
+        self.indicator_state = state
+        self.htf_state = htf_state
+        
+        last = frame.iloc[-1]
+        values = state.preview(last['High'], last['Low'], last['Close'], timestamp=frame.index[-1])
+        if htf_state is not None:
+            values.update(htf_state.preview(last['High'], last['Low'], last['Close'], frame.index[-1]))
+        return values
+    
     def make_prediction(self, df):
         """Make prediction on latest data with confidence and indicator filters"""
         try:
-            # Add indicators
-            df_with_indicators = add_all_indicators(df)
+            # Indicators for the latest bar (O(1) per new bar after warm-up)
+            latest_row = self._latest_indicators(df)
+            latest_features = to_feature_row(latest_row, self.feature_columns)
             
-            if len(df_with_indicators) == 0:
+            if latest_features is None:
                 print("⚠️ Not enough data to compute indicators")
                 return None, None, None
             
-            # Prepare features
-            X, _ = prepare_features(df_with_indicators)
-            
-            # Get latest feature vector
-            latest_features = X[-1].reshape(1, -1)
-            latest_row = df_with_indicators.iloc[-1]
-            
             # Probabilistic prediction
             proba = self.model.predict_proba(latest_features)[0]
             prob_down, prob_up = float(proba[0]), float(proba[1])
@@ -157,8 +210,11 @@ class GoldSignalBot:
         print(f"⏰ {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Analyzing {self.ticker}...")
         print("=" * 70)
         
-        # Fetch latest data
-        df = self.fetch_latest_data(lookback_period='5d')
+        # Fetch latest data (the first run with HTF_FEATURES loads enough bars to warm them up)
+        if self.htf_features and self.htf_state is None:
+            df = self.fetch_latest_data(start=datetime.now() - timedelta(days=self.htf_warmup_days()))
+        else:
+            df = self.fetch_latest_data(lookback_period='5d')
         
         if df is None:
             print("⚠️ Skipping this cycle due to data fetch error")
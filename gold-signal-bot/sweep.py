@@ -0,0 +1,366 @@
+"""
+Hyperparameter Sweep Script
+Grid or random search over model and risk settings with successive halving:
+the CSV and features are loaded once, trials are fanned out over a process
+pool, and clearly losing trials are pruned on small training budgets before
+the survivors are re-run on more data
+"""
+
+import os
+import io
+import math
+import random
+import itertools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+from sklearn.metrics import accuracy_score
+import warnings
+warnings.filterwarnings('ignore')
+
+from utils.indicators import prepare_features
+from utils.indicator_cache import cached_indicators
+from utils.backtest_engine import simulate_trades
+from utils.settings import resolve_settings
+from train_model import fetch_training_data, train_model, _attach_shared_matrix, _shared_fold_data
+
+
+# Searchable parameters -> settings name they override
+MODEL_PARAMS = {
+    'model_type': 'MODEL_TYPE',
+    'n_estimators': 'N_ESTIMATORS',
+    'max_depth': 'MAX_DEPTH',
+    'min_samples_split': 'MIN_SAMPLES_SPLIT'
+}
+RISK_PARAMS = {
+    'prob_threshold': 'PROB_THRESHOLD',
+    'stop_loss_percent': 'STOP_LOSS_PERCENT',
+    'take_profit_percent': 'TAKE_PROFIT_PERCENT',
+    'use_atr_stops': 'USE_ATR_STOPS',
+    'use_trend_filter': 'USE_TREND_FILTER',
+    'use_volatility_filter': 'USE_VOLATILITY_FILTER',
+    'atr_filter_min': 'ATR_FILTER_MIN',
+    'atr_filter_max': 'ATR_FILTER_MAX'
+}
+OBJECTIVES = ('total_pips', 'accuracy', 'profit_factor')
+
+# Indicator columns the trade simulation reads from the holdout frame
+SIMULATION_COLUMNS = ['Close', 'ATR', 'MACD', 'MACD_Signal', 'RSI', 'EMA_Slow']
+
+
+def expand_search_space(space, search='grid', n_trials=50, seed=None):
+    """
+    Turn a search space into a list of trial parameter dicts
+
+    Args:
+        space: dict of parameter name -> list of values, or (random search
+               only) {'low': a, 'high': b} for a uniform range; integer
+               bounds draw integers
+        search: 'grid' (every combination) or 'random'
+        n_trials: Number of random trials; also caps the grid
+        seed: Random seed for random search
+
+    Returns:
+        list of dicts with one value per parameter
+    """
+    unknown = set(space) - set(MODEL_PARAMS) - set(RISK_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+
+    names = sorted(space)
+    if search == 'grid':
+        for name in names:
+            if not isinstance(space[name], (list, tuple)):
+                raise ValueError(f"Grid search needs a list of values for '{name}'")
+        trials = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+        if len(trials) > n_trials:
+            print(f"⚠️ Grid has {len(trials)} combinations, keeping the first {n_trials}")
+        return trials[:n_trials]
+
+    if search != 'random':
+        raise ValueError(f"Unknown search type '{search}' (use 'grid' or 'random')")
+
+    rng = random.Random(seed)
+    trials, seen = [], set()
+    for _ in range(n_trials * 10):
+        if len(trials) >= n_trials:
+            break
+        trial = {}
+        for name in names:
+            values = space[name]
+            if isinstance(values, dict):
+                low, high = values['low'], values['high']
+                if isinstance(low, int) and isinstance(high, int):
+                    trial[name] = rng.randint(low, high)
+                else:
+                    trial[name] = rng.uniform(float(low), float(high))
+            else:
+                trial[name] = rng.choice(list(values))
+        key = tuple(sorted(trial.items()))
+        if key not in seen:
+            seen.add(key)
+            trials.append(trial)
+    return trials
+
+
+def halving_schedule(n_trials, eta, min_fraction):
+    """
+    Training-set fractions for each successive-halving rung
+
+    Returns:
+        list of fractions ending at 1.0 (a single rung when pruning is pointless)
+    """
+    if n_trials <= 1 or eta <= 1:
+        return [1.0]
+    rungs = int(math.floor(math.log(1.0 / min_fraction, eta) + 1e-9))
+    rungs = min(rungs, int(math.floor(math.log(n_trials, eta) + 1e-9)))
+    return [eta ** (r - rungs) for r in range(rungs + 1)]
+
+
+def _model_key(trial):
+    """Model-side parameters of a trial (trials sharing them share one fit)"""
+    return tuple(sorted((k, v) for k, v in trial.items() if k in MODEL_PARAMS))
+
+
+def _init_sweep_worker(x_name, x_shape, y_name, y_shape, holdout):
+    """Process-pool initializer: map the shared feature matrix and keep the holdout bars"""
+    _attach_shared_matrix(x_name, x_shape, y_name, y_shape)
+    _shared_fold_data['holdout'] = holdout
+
+
+def _score_trades(trades, accuracy):
+    """Summarize simulated holdout trades"""
+    closed = [t for t in trades if t['status'] == 'Closed']
+    pips = np.array([t['pips'] for t in closed], dtype=np.float64)
+    gross_profit = float(pips[pips > 0].sum())
+    gross_loss = float(-pips[pips < 0].sum())
+    if gross_loss > 0:
+        profit_factor = gross_profit / gross_loss
+    else:
+        profit_factor = 999.99 if gross_profit > 0 else 0.0
+    return {
+        'accuracy': round(accuracy, 4),
+        'total_pips': round(float(pips.sum()), 2),
+        'trades': len(trades),
+        'win_rate': round(float((pips > 0).mean() * 100), 2) if len(pips) else 0.0,
+        'profit_factor': round(profit_factor, 2)
+    }
+
+
+def _run_sweep_task(task):
+    """
+    Fit one model configuration on a training budget and score every risk
+    variant that shares it on the holdout window (runs in a worker process)
+    """
+    X = _shared_fold_data['X']
+    y = _shared_fold_data['y']
+    holdout = _shared_fold_data['holdout']
+    train_start, train_end = task['train']
+    test_start, test_end = task['test']
+    settings = task['settings']
+    model_params = dict(task['model_key'])
+    model_type = model_params.pop('model_type', settings.MODEL_TYPE)
+    params = {
+        'n_estimators': int(model_params.get('n_estimators', settings.N_ESTIMATORS)),
+        'max_depth': int(model_params.get('max_depth', settings.MAX_DEPTH)),
+        'min_samples_split': int(model_params.get('min_samples_split', settings.MIN_SAMPLES_SPLIT)),
+        'random_state': settings.RANDOM_STATE
+    }
+
+    # Ensemble trials average member probabilities, as in the backtester
+    members = settings.ENSEMBLE_MODELS if model_type == 'ensemble' else [model_type]
+    X_test = X[test_start:test_end]
+    with contextlib.redirect_stdout(io.StringIO()):
+        probabilities = np.mean([
+            train_model(X[train_start:train_end], y[train_start:train_end],
+                        model_type=mtype, n_jobs=task['n_jobs'], **params).predict_proba(X_test)
+            for mtype in members
+        ], axis=0)
+    predictions = (probabilities[:, 1] > 0.5).astype(int)
+    accuracy = float(accuracy_score(y[test_start:test_end], predictions))
+
+    results_df = holdout.copy()
+    results_df['Prediction'] = predictions
+    results_df['Prob_Up'] = probabilities[:, 1]
+    results_df['Prob_Down'] = probabilities[:, 0]
+
+    scores = []
+    for trial_id, risk in task['variants']:
+        trial_settings = settings.replace(**{RISK_PARAMS[name]: value for name, value in risk.items()})
+        trades, _ = simulate_trades(results_df, trial_settings)
+        scores.append((trial_id, _score_trades(trades, accuracy)))
+    return scores
+
+
+def _leaderboard(trials, objective, limit=None):
+    """Trials ranked by the furthest rung reached, then by objective"""
+    ranked = sorted(
+        (t for t in trials if t['score'] is not None),
+        key=lambda t: (t['rung'], t['score'][objective]),
+        reverse=True
+    )
+    board = [{
+        'rank': i + 1,
+        'trial': t['id'],
+        'params': t['params'],
+        'rung': t['rung'],
+        'train_fraction': t['train_fraction'],
+        'pruned': t['pruned'],
+        **t['score']
+    } for i, t in enumerate(ranked)]
+    return board[:limit] if limit else board
+
+
+def run_sweep(df, space, *, search='grid', n_trials=None, objective=None, eta=None,
+              min_fraction=None, workers=None, seed=None, status_callback=None, settings=None):
+    """
+    Hyperparameter sweep with successive halving
+
+    Indicators and the feature matrix are computed once; the matrix is placed
+    in shared memory for the worker processes. At each rung every surviving
+    model configuration is trained on the most recent 'fraction' of the
+    training split and scored by a backtest on the holdout split; only the
+    top 1/eta trials advance to the next (larger) training budget.
+
+    Args:
+        df: pandas DataFrame with OHLCV data
+        space: Search space (see expand_search_space)
+        search: 'grid' or 'random'
+        n_trials: Trial cap (default settings.SWEEP_MAX_TRIALS)
+        objective: 'total_pips', 'accuracy' or 'profit_factor'
+        eta: Halving rate (keep 1/eta trials per rung)
+        min_fraction: Training fraction of the first rung
+        workers: Worker processes (default: CPU count)
+        seed: Random seed for random search
+        status_callback: Optional callback(message, progress, leaderboard)
+        settings: Optional per-job Settings; swept values override it per trial
+
+    Returns:
+        dict: 'leaderboard' (ranked trials), 'best' and run details
+    """
+    settings = resolve_settings(settings)
+    objective = objective or getattr(settings, 'SWEEP_OBJECTIVE', 'total_pips')
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{objective}' (use one of {OBJECTIVES})")
+    eta = eta or getattr(settings, 'SWEEP_ETA', 3)
+    min_fraction = min_fraction or getattr(settings, 'SWEEP_MIN_FRACTION', 0.1)
+    n_trials = n_trials or getattr(settings, 'SWEEP_MAX_TRIALS', 50)
+
+    trials = [{
+        'id': i,
+        'params': params,
+        'rung': -1,
+        'train_fraction': 0.0,
+        'score': None,
+        'pruned': False
+    } for i, params in enumerate(expand_search_space(space, search, n_trials, seed))]
+    if not trials:
+        raise ValueError("Search space produced no trials")
+
+    data = cached_indicators(df, settings=settings)
+    X, y = prepare_features(data, settings=settings)
+    split_index = int(len(X) * getattr(settings, 'TRAIN_TEST_SPLIT', 0.8))
+    holdout = data[SIMULATION_COLUMNS].iloc[split_index:].copy()
+
+    schedule = halving_schedule(len(trials), eta, min_fraction)
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, workers or getattr(settings, 'SWEEP_WORKERS', None) or cpu_count)
+    n_jobs = max(1, cpu_count // workers)
+
+    print(f"\n🔎 Sweep: {len(trials)} trials ({search}), objective={objective}, "
+          f"rungs={[round(f, 3) for f in schedule]}, {workers} workers")
+
+    X_shared = np.ascontiguousarray(X, dtype=np.float64)
+    y_shared = np.ascontiguousarray(y, dtype=np.int64)
+    x_shm = shared_memory.SharedMemory(create=True, size=max(1, X_shared.nbytes))
+    y_shm = shared_memory.SharedMemory(create=True, size=max(1, y_shared.nbytes))
+    try:
+        np.ndarray(X_shared.shape, dtype=np.float64, buffer=x_shm.buf)[:] = X_shared
+        np.ndarray(y_shared.shape, dtype=np.int64, buffer=y_shm.buf)[:] = y_shared
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_sweep_worker,
+                                 initargs=(x_shm.name, X_shared.shape, y_shm.name, y_shared.shape, holdout)) as pool:
+            survivors = trials
+            for rung, fraction in enumerate(schedule):
+                n_train = max(1, int(split_index * fraction))
+
+                # One task per distinct model configuration; risk variants ride along
+                groups = {}
+                for t in survivors:
+                    risk = {k: v for k, v in t['params'].items() if k in RISK_PARAMS}
+                    groups.setdefault(_model_key(t['params']), []).append((t['id'], risk))
+                futures = [pool.submit(_run_sweep_task, {
+                    'model_key': key,
+                    'variants': variants,
+                    'settings': settings,
+                    'train': (split_index - n_train, split_index),
+                    'test': (split_index, len(X)),
+                    'n_jobs': n_jobs
+                }) for key, variants in groups.items()]
+
+                for done, future in enumerate(as_completed(futures), 1):
+                    for trial_id, score in future.result():
+                        trials[trial_id].update(rung=rung, train_fraction=round(fraction, 4), score=score)
+                    if status_callback:
+                        progress = 10 + int(85 * (rung + done / len(futures)) / len(schedule))
+                        status_callback(f"Rung {rung + 1}/{len(schedule)} ({fraction:.0%} of training data): "
+                                        f"{done}/{len(futures)} fits done", progress,
+                                        _leaderboard(trials, objective, limit=20))
+
+                ranked = sorted(survivors, key=lambda t: t['score'][objective], reverse=True)
+                best = ranked[0]
+                print(f"   Rung {rung + 1}/{len(schedule)}: {len(survivors)} trials on {n_train} samples, "
+                      f"best {objective}={best['score'][objective]} (trial {best['id']})")
+                if rung < len(schedule) - 1:
+                    keep = max(1, int(math.ceil(len(ranked) / eta)))
+                    for t in ranked[keep:]:
+                        t['pruned'] = True
+                    survivors = ranked[:keep]
+    finally:
+        x_shm.close()
+        x_shm.unlink()
+        y_shm.close()
+        y_shm.unlink()
+
+    leaderboard = _leaderboard(trials, objective)
+    return {
+        'objective': objective,
+        'search': search,
+        'trials': len(trials),
+        'rungs': [round(f, 4) for f in schedule],
+        'train_samples': split_index,
+        'test_samples': len(X) - split_index,
+        'best': leaderboard[0] if leaderboard else None,
+        'leaderboard': leaderboard
+    }
+
+
+def main():
+    """Run a sweep over the default search space on the configured data"""
+    print("=" * 60)
+    print("ML GOLD SIGNAL BOT - HYPERPARAMETER SWEEP")
+    print("=" * 60)
+
+    settings = resolve_settings()
+    df, _, _, _ = fetch_training_data(ticker=settings.TICKER, period=settings.TRAINING_PERIOD,
+                                      interval=settings.INTERVAL, settings=settings)
+    if df is None:
+        return None
+
+    space = getattr(settings, 'SWEEP_SPACE', {
+        'n_estimators': [100, 300],
+        'max_depth': [3, 5, 8],
+        'prob_threshold': [0.5, 0.55, 0.6]
+    })
+    results = run_sweep(df, space, search=getattr(settings, 'SWEEP_SEARCH', 'grid'), settings=settings)
+
+    print("\n🏆 Top trials:")
+    for row in results['leaderboard'][:10]:
+        print(f"   #{row['rank']:<3} {results['objective']}={row[results['objective']]:<10} "
+              f"pips={row['total_pips']:<10} acc={row['accuracy']:.4f} trades={row['trades']:<5} {row['params']}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
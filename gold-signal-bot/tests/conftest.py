@@ -0,0 +1,91 @@
+"""
+Shared fixtures for the parity tests
+The bundled XAUUSD bar exports in data/ are not tracked by git; tests that
+need them are skipped when the files are missing.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Project modules are imported the same way the scripts import them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from utils.settings import Settings
+from utils.mt5_fetch import load_csv_data
+from utils.indicators import add_all_indicators, prepare_features, normalize_price_frame
+
+# Recent H4 bars are enough to exercise every code path and keep the suite fast
+PARITY_BARS = 4000
+
+
+def load_bars(filename, bars=PARITY_BARS):
+    """Most recent bars of a bundled CSV export, or skip the test"""
+    csv_path = os.path.join(config.DATA_DIR, filename)
+    if not os.path.exists(csv_path):
+        pytest.skip(f"{csv_path} is not available")
+    df = load_csv_data(csv_path)
+    return normalize_price_frame(df.sort_index().iloc[-bars:])
+
+
+@pytest.fixture(scope='session')
+def settings():
+    """Config defaults without higher-timeframe features"""
+    return Settings.from_config(HTF_FEATURES=[])
+
+
+@pytest.fixture(scope='session')
+def h4_bars():
+    return load_bars('XAUUSD_h4.csv')
+
+
+@pytest.fixture(scope='session')
+def h4_indicators(h4_bars, settings):
+    return add_all_indicators(h4_bars, settings=settings)
+
+
+@pytest.fixture(scope='session')
+def h4_features(h4_indicators, settings):
+    return prepare_features(h4_indicators, settings=settings)
+
+
+@pytest.fixture(scope='session')
+def forest(h4_features):
+    """Small RandomForest fitted on the first 70% of the H4 features"""
+    from sklearn.ensemble import RandomForestClassifier
+    X, y = h4_features
+    split = int(len(X) * 0.7)
+    model = RandomForestClassifier(n_estimators=25, max_depth=6, random_state=42, n_jobs=1)
+    model.fit(X[:split], y[:split])
+    return model
+
+
+@pytest.fixture(scope='session')
+def results_frame(h4_indicators, h4_features, forest):
+    """Indicator frame with predictions, as GoldBacktester._build_results_frame builds it"""
+    X, _ = h4_features
+    probabilities = forest.predict_proba(X)
+    results_df = h4_indicators.copy()
+    results_df['Prediction'] = forest.predict(X)
+    results_df['Prob_Up'] = probabilities[:, 1]
+    results_df['Prob_Down'] = probabilities[:, 0]
+    results_df['Prev_Prediction'] = results_df['Prediction'].shift(1)
+    assert np.isin(results_df['Prediction'].unique(), [0, 1]).all()
+    return results_df
+
+
+def strategy_variants(settings, results_df):
+    """Settings covering every entry filter and stop mode of the backtest"""
+    atr = results_df['ATR']
+    return {
+        'default': settings,
+        'atr_stops': settings.replace(USE_ATR_STOPS=True),
+        'trend_filter': settings.replace(USE_TREND_FILTER=True),
+        'volatility_filter': settings.replace(USE_VOLATILITY_FILTER=True,
+                                              ATR_FILTER_MIN=float(atr.quantile(0.2)),
+                                              ATR_FILTER_MAX=float(atr.quantile(0.8))),
+        'high_threshold': settings.replace(PROB_THRESHOLD=0.55)
+    }
@@ -0,0 +1,143 @@
+"""
+Parity of the array trade simulator with the original per-bar backtest loop
+"""
+
+import pandas as pd
+import pytest
+
+from conftest import strategy_variants
+from utils.backtest_engine import simulate_trades
+from backtest import GoldBacktester
+
+
+def per_bar_loop(results_df, settings):
+    """
+    The backtest loop GoldBacktester.run_backtest used before the array engine:
+    every bar evaluates the filters and then scans all open trades for SL/TP
+    """
+    trades = []
+    stats = {'signals_generated': 0, 'confidence_rejects': 0, 'macd_rejects': 0, 'volatility_rejects': 0}
+
+    def check_trade_exits(current_price, timestamp):
+        for trade in trades:
+            if trade['status'] != 'Open':
+                continue
+            if trade['type'] == 'BUY':
+                if current_price <= trade['sl']:
+                    level, reason = trade['sl'], 'SL_HIT'
+                elif current_price >= trade['tp']:
+                    level, reason = trade['tp'], 'TP_HIT'
+                else:
+                    continue
+                pips = (level - trade['entry_price']) * 10
+            else:
+                if current_price >= trade['sl']:
+                    level, reason = trade['sl'], 'SL_HIT'
+                elif current_price <= trade['tp']:
+                    level, reason = trade['tp'], 'TP_HIT'
+                else:
+                    continue
+                pips = (trade['entry_price'] - level) * 10
+            trade.update(close_price=level, close_timestamp=timestamp, close_reason=reason,
+                         pips=pips, status='Closed')
+
+    for idx in range(len(results_df)):
+        row = results_df.iloc[idx]
+        timestamp = results_df.index[idx]
+        current_price = float(row['Close'])
+        curr_pred = int(row['Prediction'])
+        prev_pred = row['Prev_Prediction']
+        confidence = float(max(row['Prob_Up'], row['Prob_Down']))
+        if pd.isna(prev_pred):
+            continue
+        prev_pred = int(prev_pred)
+        atr_val = float(row['ATR'])
+
+        if getattr(settings, 'USE_VOLATILITY_FILTER', False):
+            if atr_val < settings.ATR_FILTER_MIN or atr_val > settings.ATR_FILTER_MAX:
+                stats['volatility_rejects'] += 1
+                check_trade_exits(current_price, timestamp)
+                continue
+
+        use_trend_filter = getattr(settings, 'USE_TREND_FILTER', False)
+        trend_ok_buy = (current_price > row['EMA_Slow']) if use_trend_filter else True
+        trend_ok_sell = (current_price < row['EMA_Slow']) if use_trend_filter else True
+        macd_ok_buy = bool(row['MACD'] > row['MACD_Signal'] and row['RSI'] > settings.RSI_BUY_MIN and trend_ok_buy)
+        macd_ok_sell = bool(row['MACD'] < row['MACD_Signal'] and row['RSI'] < settings.RSI_SELL_MAX and trend_ok_sell)
+
+        if confidence < float(settings.PROB_THRESHOLD):
+            stats['confidence_rejects'] += 1
+            check_trade_exits(current_price, timestamp)
+            continue
+
+        use_atr = getattr(settings, 'USE_ATR_STOPS', False) and atr_val > 0
+        if prev_pred == 0 and curr_pred == 1 and macd_ok_buy:
+            trade_type = 'BUY'
+            if use_atr:
+                sl = round(current_price - atr_val * getattr(settings, 'ATR_STOP_MULTIPLIER', 2.0), 2)
+                tp = round(current_price + atr_val * getattr(settings, 'ATR_TP_MULTIPLIER', 10), 2)
+            else:
+                sl = round(current_price * (1 - settings.STOP_LOSS_PERCENT), 2)
+                tp = round(current_price * (1 + settings.TAKE_PROFIT_PERCENT), 2)
+        elif prev_pred == 1 and curr_pred == 0 and macd_ok_sell:
+            trade_type = 'SELL'
+            if use_atr:
+                sl = round(current_price + atr_val * getattr(settings, 'ATR_STOP_MULTIPLIER', 2.0), 2)
+                tp = round(current_price - atr_val * getattr(settings, 'ATR_TP_MULTIPLIER', 5.0), 2)
+            else:
+                sl = round(current_price * (1 + settings.STOP_LOSS_PERCENT), 2)
+                tp = round(current_price * (1 - settings.TAKE_PROFIT_PERCENT), 2)
+        else:
+            trade_type = None
+            stats['macd_rejects'] += 1
+
+        if trade_type is not None:
+            trades.append({
+                'timestamp': timestamp, 'type': trade_type, 'entry_price': current_price,
+                'sl': sl, 'tp': tp, 'close_price': None, 'close_timestamp': None,
+                'close_reason': None, 'pips': None, 'status': 'Open', 'confidence': confidence
+            })
+            stats['signals_generated'] += 1
+
+        check_trade_exits(current_price, timestamp)
+
+    return trades, stats
+
+
+def assert_same_trades(trades, expected):
+    assert len(trades) == len(expected)
+    for trade, ref in zip(trades, expected):
+        for key in ('timestamp', 'type', 'sl', 'tp', 'close_price', 'close_timestamp', 'close_reason', 'status'):
+            assert trade[key] == ref[key], (ref['timestamp'], key)
+        assert trade['entry_price'] == pytest.approx(ref['entry_price'])
+        assert trade['confidence'] == pytest.approx(ref['confidence'])
+        if ref['pips'] is None:
+            assert trade['pips'] is None
+        else:
+            assert trade['pips'] == pytest.approx(ref['pips'])
+
+
+@pytest.mark.parametrize('variant', ['default', 'atr_stops', 'trend_filter', 'volatility_filter', 'high_threshold'])
+def test_simulate_trades_matches_per_bar_loop(results_frame, settings, variant):
+    strategy = strategy_variants(settings, results_frame)[variant]
+    expected, expected_stats = per_bar_loop(results_frame, strategy)
+    assert expected, "the fixture should produce trades"
+
+    trades, stats = simulate_trades(results_frame, strategy)
+
+    assert stats == expected_stats
+    assert_same_trades(trades, expected)
+
+
+@pytest.mark.parametrize('variant', ['default', 'atr_stops', 'volatility_filter'])
+def test_loop_engine_with_position_index_matches_per_bar_loop(results_frame, settings, variant):
+    strategy = strategy_variants(settings, results_frame)[variant]
+    expected, expected_stats = per_bar_loop(results_frame, strategy)
+
+    # The engine only needs the settings; skip loading a model
+    backtester = GoldBacktester.__new__(GoldBacktester)
+    backtester.settings = strategy
+    stats = backtester.simulate(results_frame, engine='loop')
+
+    assert stats == expected_stats
+    assert_same_trades(backtester.trades, expected)
@@ -0,0 +1,35 @@
+"""
+Parity of batch_feature_matrices with prepare_features(add_all_indicators(...))
+"""
+
+import numpy as np
+import pytest
+
+from utils.indicators import add_all_indicators, batch_feature_matrices, indicator_params, prepare_features
+
+PARAM_SETS = [
+    {},
+    {'rsi_period': 7, 'ema_fast': 20, 'ema_slow': 100},
+    {'macd_fast': 8, 'macd_slow': 21, 'macd_signal': 5, 'bb_period': 30, 'bb_std_dev': 2.5},
+    {'atr_period': 10, 'rsi_period': 21}
+]
+
+
+def expected_matrices(bars, overrides, settings):
+    params = indicator_params(overrides, settings=settings)
+    set_settings = settings.replace(**{name.upper(): value for name, value in params if name != 'htf_features'})
+    return params, prepare_features(add_all_indicators(bars, settings=set_settings), settings=set_settings)
+
+
+@pytest.mark.parametrize('htf_features', [[], [('D1', 'RSI'), ('D1', 'EMA_Ratio')]], ids=['base', 'htf'])
+def test_batch_matrices_match_add_all_indicators(h4_bars, settings, htf_features):
+    settings = settings.replace(HTF_FEATURES=htf_features)
+    batch = batch_feature_matrices(h4_bars, PARAM_SETS, settings=settings)
+
+    assert len(batch) == len(PARAM_SETS)
+    for overrides in PARAM_SETS:
+        params, (X, y) = expected_matrices(h4_bars, overrides, settings)
+        batch_X, batch_y = batch[params]
+        assert batch_X.shape == X.shape
+        np.testing.assert_allclose(batch_X, X, rtol=1e-7, atol=1e-9)
+        np.testing.assert_array_equal(batch_y, y)
@@ -0,0 +1,61 @@
+"""
+Parity of the streaming indicator state with add_all_indicators / add_htf_features
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.indicators import FEATURE_COLUMNS, add_all_indicators, add_htf_features
+from utils.incremental_indicators import IncrementalIndicators, HigherTimeframeIndicators, to_feature_row
+
+
+def stream(bars, state):
+    """Feed every bar through state.update and collect the returned values"""
+    rows = []
+    for timestamp, (high, low, close) in zip(bars.index, bars[['High', 'Low', 'Close']].to_numpy()):
+        rows.append(state.update(high, low, close, timestamp=timestamp))
+    return pd.DataFrame(rows, index=bars.index)
+
+
+def test_streaming_matches_add_all_indicators(h4_bars, h4_indicators):
+    streamed = stream(h4_bars, IncrementalIndicators())
+
+    # add_all_indicators drops the warm-up rows; every remaining bar must match
+    streamed = streamed.loc[h4_indicators.index]
+    for column in FEATURE_COLUMNS:
+        np.testing.assert_allclose(streamed[column], h4_indicators[column], rtol=1e-7, atol=1e-9,
+                                   err_msg=column)
+
+
+def test_streaming_respects_indicator_periods(h4_bars, settings):
+    periods = {'rsi_period': 7, 'macd_fast': 8, 'macd_slow': 21, 'macd_signal': 5, 'bb_period': 30,
+               'bb_std_dev': 2.5, 'atr_period': 10, 'ema_fast': 20, 'ema_slow': 100}
+    expected = add_all_indicators(h4_bars, settings=settings.replace(**{k.upper(): v for k, v in periods.items()}))
+
+    streamed = stream(h4_bars, IncrementalIndicators(**periods)).loc[expected.index]
+    for column in FEATURE_COLUMNS:
+        np.testing.assert_allclose(streamed[column], expected[column], rtol=1e-7, atol=1e-9, err_msg=column)
+
+
+def test_preview_does_not_commit(h4_bars, h4_indicators):
+    state = IncrementalIndicators.from_history(h4_bars.iloc[:-1])
+    last = h4_bars.iloc[-1]
+    committed = state.last_timestamp
+
+    preview = state.preview(last['High'], last['Low'], last['Close'], timestamp=h4_bars.index[-1])
+
+    assert state.last_timestamp == committed
+    np.testing.assert_allclose(to_feature_row(preview), h4_indicators[FEATURE_COLUMNS].iloc[[-1]].to_numpy(),
+                               rtol=1e-7, atol=1e-9)
+
+
+def test_higher_timeframe_streaming_matches_add_htf_features(h4_bars):
+    specs = [('D1', 'RSI'), ('D1', 'EMA_Ratio')]
+    expected = add_htf_features(h4_bars.copy(), specs)
+
+    streamed = stream(h4_bars, HigherTimeframeIndicators(specs, 'H4'))
+    for column in ('D1_RSI', 'D1_EMA_Ratio'):
+        assert (streamed[column].isna() == expected[column].isna()).all(), column
+        valid = expected[column].notna()
+        assert valid.sum() > 0
+        np.testing.assert_allclose(streamed.loc[valid, column], expected.loc[valid, column], rtol=1e-7, atol=1e-9)
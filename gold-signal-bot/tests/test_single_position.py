@@ -0,0 +1,85 @@
+"""
+Parity of the timeframe-comparison trade simulator with its original per-bar loop
+"""
+
+import numpy as np
+import pytest
+
+from utils.backtest_engine import simulate_single_position
+
+
+def per_bar_loop(close, pred, proba, rsi, settings):
+    """
+    The loop TimeframeComparator.backtest_timeframe used before the array
+    engine (one position at a time; SL, then TP, then a confident reversal)
+    """
+    trades = []
+    position = None
+    entry_price = entry_idx = None
+    sl_pct, tp_pct = settings.STOP_LOSS_PERCENT, settings.TAKE_PROFIT_PERCENT
+
+    for i in range(1, len(close)):
+        current_pred, current_proba, current_price = pred[i], proba[i], close[i]
+        prev_pred = pred[i - 1]
+
+        if position is None and current_proba >= settings.PROB_THRESHOLD:
+            if current_pred == 1 and prev_pred == 0 and rsi[i] >= settings.RSI_BUY_MIN:
+                position, entry_price, entry_idx = 'BUY', current_price, i
+            elif current_pred == 0 and prev_pred == 1 and rsi[i] <= settings.RSI_SELL_MAX:
+                position, entry_price, entry_idx = 'SELL', current_price, i
+            continue
+        if position is None:
+            continue
+
+        if position == 'BUY':
+            pips = (current_price - entry_price) * 100
+            hit_sl = current_price <= entry_price * (1 - sl_pct)
+            hit_tp = current_price >= entry_price * (1 + tp_pct)
+            reversal = current_pred == 0
+        else:
+            pips = (entry_price - current_price) * 100
+            hit_sl = current_price >= entry_price * (1 + sl_pct)
+            hit_tp = current_price <= entry_price * (1 - tp_pct)
+            reversal = current_pred == 1
+
+        if hit_sl:
+            trade = {'Pips': -abs(sl_pct * 100), 'Reason': 'SL'}
+        elif hit_tp:
+            trade = {'Pips': tp_pct * 100, 'Reason': 'TP'}
+        elif reversal and current_proba >= settings.PROB_THRESHOLD:
+            trade = {'Pips': pips, 'Reason': 'Signal'}
+        else:
+            continue
+        trades.append(dict(trade, Type=position, Entry=entry_idx, Exit=i))
+        position = None
+
+    return trades
+
+
+@pytest.fixture(scope='module')
+def prediction_arrays(results_frame):
+    return (
+        results_frame['Close'].to_numpy(),
+        results_frame['Prediction'].to_numpy(),
+        results_frame[['Prob_Up', 'Prob_Down']].max(axis=1).to_numpy(),
+        results_frame['RSI'].to_numpy()
+    )
+
+
+@pytest.mark.parametrize('overrides', [
+    {},
+    {'PROB_THRESHOLD': 0.55},
+    {'STOP_LOSS_PERCENT': 0.02, 'TAKE_PROFIT_PERCENT': 0.04},
+    {'RSI_BUY_MIN': 50, 'RSI_SELL_MAX': 50}
+], ids=['default', 'high_threshold', 'wide_stops', 'strict_rsi'])
+def test_simulate_single_position_matches_per_bar_loop(prediction_arrays, settings, overrides):
+    strategy = settings.replace(**overrides)
+    close, pred, proba, rsi = prediction_arrays
+    expected = per_bar_loop(close, pred, proba, rsi, strategy)
+    assert expected, "the fixture should produce trades"
+
+    trades = simulate_single_position(close, pred, proba, rsi, strategy)
+
+    assert [(t['Type'], t['Entry'], t['Exit'], t['Reason']) for t in trades] == \
+        [(t['Type'], t['Entry'], t['Exit'], t['Reason']) for t in expected]
+    np.testing.assert_allclose([t['Pips'] for t in trades], [t['Pips'] for t in expected])
@@ -0,0 +1,70 @@
+"""
+Parity of compiled flat-array tree inference with the libraries' own predict_proba
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from utils.tree_inference import compile_model
+
+
+def split_features(h4_features):
+    X, y = h4_features
+    split = int(len(X) * 0.7)
+    return X[:split], y[:split], X[split:]
+
+
+def fit_xgboost(X, y):
+    xgb = pytest.importorskip('xgboost')
+    return xgb.XGBClassifier(n_estimators=40, max_depth=5, learning_rate=0.1, random_state=42,
+                             n_jobs=1, eval_metric='logloss').fit(X, y)
+
+
+def fit_lightgbm(X, y):
+    lgb = pytest.importorskip('lightgbm')
+    return lgb.LGBMClassifier(n_estimators=40, num_leaves=15, random_state=42, n_jobs=1,
+                              verbose=-1).fit(X, y)
+
+
+def fit_extra_trees(X, y):
+    from sklearn.ensemble import ExtraTreesClassifier
+    return ExtraTreesClassifier(n_estimators=25, max_depth=8, random_state=42, n_jobs=1).fit(X, y)
+
+
+def test_random_forest_matches_sklearn(forest, h4_features):
+    _, _, X_test = split_features(h4_features)
+    compiled = compile_model(forest)
+
+    np.testing.assert_allclose(compiled.predict_proba(X_test), forest.predict_proba(X_test), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(compiled.predict(X_test), forest.predict(X_test))
+
+
+@pytest.mark.parametrize('fit', [fit_xgboost, fit_lightgbm, fit_extra_trees], ids=['xgboost', 'lightgbm', 'extra_trees'])
+def test_boosters_and_forests_match_native(fit, h4_features):
+    X_train, y_train, X_test = split_features(h4_features)
+    model = fit(X_train, y_train)
+    compiled = compile_model(model)
+
+    np.testing.assert_allclose(compiled.predict_proba(X_test), model.predict_proba(X_test), rtol=1e-6, atol=1e-7)
+    np.testing.assert_array_equal(compiled.predict(X_test), model.predict(X_test))
+
+
+@pytest.mark.parametrize('fit', [fit_xgboost, fit_lightgbm], ids=['xgboost', 'lightgbm'])
+def test_missing_values_follow_native_default_direction(fit, h4_features):
+    X_train, y_train, X_test = split_features(h4_features)
+    model = fit(X_train, y_train)
+    X_missing = X_test[:200].copy()
+    X_missing[::3, 0] = np.nan
+    X_missing[1::4, 5] = np.nan
+
+    np.testing.assert_allclose(compile_model(model).predict_proba(X_missing), model.predict_proba(X_missing),
+                               rtol=1e-6, atol=1e-7)
+
+
+def test_single_row_and_pickle_round_trip(forest, h4_features):
+    _, _, X_test = split_features(h4_features)
+    compiled = pickle.loads(pickle.dumps(compile_model(forest)))
+
+    np.testing.assert_allclose(compiled.predict_proba(X_test[-1]), forest.predict_proba(X_test[-1:]), atol=1e-12)
@@ -3,40 +3,62 @@ Train Model Script
 Trains a RandomForestClassifier on Gold (XAUUSD) historical data
 """
 
+import os
+import io
+import contextlib
+import contextvars
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing import shared_memory
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
 # Import custom utilities
-from utils.indicators import add_all_indicators, prepare_features
+from utils.indicators import prepare_features, indicator_warmup_bars, indicator_params
+from utils.indicator_cache import cached_indicators, cached_csv_indicators
 from utils.model_loader import save_model, save_training_metadata
+from utils.model_registry import ModelRegistry
 from utils.av_fetch import fetch_fx_history, period_to_days
 from utils.mt5_fetch import load_csv_data
-import config
+from utils.bar_cache import window_offset
+from utils.resample import infer_timeframe
+from utils.settings import resolve_settings
 
 
-def fetch_training_data(ticker, period, interval):
+def fetch_training_data(ticker, period, interval, days=None, settings=None):
     """
     Fetch historical Gold data for training.
+    For MT5 CSV data, 'days' limits loading to the most recent window
+    (plus indicator warm-up bars); by default the full history is used.
+    'settings' selects the data source and CSV (default: current config).
     Returns tuple: (df, effective_period, used_ticker, used_interval)
     """
-    data_source = getattr(config, "DATA_SOURCE", "").lower()
+    settings = resolve_settings(settings)
+    data_source = getattr(settings, "DATA_SOURCE", "").lower()
     
     # MT5 CSV mode
     if data_source == "mt5_csv":
-        csv_path = getattr(config, "MT5_CSV_PATH", "data/mt5_history.csv")
-        symbol = getattr(config, "MT5_SYMBOL", "XAUUSD")
-        timeframe = getattr(config, "MT5_TIMEFRAME", "H4")
+        csv_path = getattr(settings, "MT5_CSV_PATH", "data/mt5_history.csv")
+        symbol = getattr(settings, "MT5_SYMBOL", "XAUUSD")
+        timeframe = getattr(settings, "MT5_TIMEFRAME", "H4")
         
         print(f"📊 Loading historical data from MT5 CSV...")
         print(f"   Symbol: {symbol}, Timeframe: {timeframe}")
         print(f"   CSV Path: {csv_path}")
         
         df = load_csv_data(csv_path)
+        if df is not None and days and len(df) >= 2:
+            # The warm-up follows the bars' own timeframe (MT5_TIMEFRAME may describe another file);
+            # cached bars are memory-mapped, so only the window is materialized
+            if not df.index.is_monotonic_increasing:
+                df = df.sort_index()
+            warmup_bars = indicator_warmup_bars(settings, base_timeframe=infer_timeframe(df.index))
+            df = df.iloc[window_offset(df.index.values, datetime.now() - timedelta(days=days), warmup_bars):].copy()
         if df is not None and not df.empty:
             effective_period = f"{len(df)} bars"
             print(f"✅ Loaded {len(df)} candles")
@@ -62,7 +84,7 @@ def fetch_training_data(ticker, period, interval):
     return None, period, ticker, interval
 
 
-def train_model(X_train, y_train, *, model_type, n_estimators, random_state, max_depth, min_samples_split):
+def train_model(X_train, y_train, *, model_type, n_estimators, random_state, max_depth, min_samples_split, n_jobs=-1):
     """
     Train specified model type
     
@@ -74,6 +96,7 @@ def train_model(X_train, y_train, *, model_type, n_estimators, random_state, max
         random_state: Random state
         max_depth: Maximum depth
         min_samples_split: Minimum samples to split
+        n_jobs: Cores the model may use (-1 = all)
     
     Returns:
         Trained model
@@ -89,7 +112,7 @@ def train_model(X_train, y_train, *, model_type, n_estimators, random_state, max
             max_depth=max_depth,
             learning_rate=0.05,
             random_state=random_state,
-            n_jobs=-1,
+            n_jobs=n_jobs,
             verbosity=0
         )
     elif model_type == 'lightgbm':
@@ -99,14 +122,14 @@ def train_model(X_train, y_train, *, model_type, n_estimators, random_state, max
             max_depth=max_depth,
             learning_rate=0.05,
             random_state=random_state,
-            n_jobs=-1,
+            n_jobs=n_jobs,
             importance_type='gain'
         )
     else: # Default to RandomForest
         model = RandomForestClassifier(
             n_estimators=n_estimators,
             random_state=random_state,
-            n_jobs=-1,
+            n_jobs=n_jobs,
             max_depth=max_depth,
             min_samples_split=min_samples_split,
             class_weight='balanced_subsample'
@@ -159,28 +182,196 @@ def evaluate_model(model, X_test, y_test):
     }
 
 
-def main(status_callback=None):
-    """Main training pipeline"""
+def split_core_budget(core_budget, n_members):
+    """
+    Split a core budget across concurrently trained models
+    
+    Returns:
+        list of n_jobs values (at least 1 each; leftover cores go to the first members)
+    """
+    base, extra = divmod(max(core_budget, n_members), n_members)
+    return [base + (1 if i < extra else 0) for i in range(n_members)]
+
+
+def walk_forward_splits(n_samples, n_folds, mode='expanding'):
+    """
+    Chronological train/test ranges for walk-forward evaluation
+    
+    The data is cut into n_folds + 1 equal blocks; fold k tests on block k.
+    'expanding' trains on every block before it, 'rolling' only on the
+    block immediately before it.
+    
+    Returns:
+        list of ((train_start, train_end), (test_start, test_end)) tuples
+    """
+    block = n_samples // (n_folds + 1)
+    if block == 0:
+        return []
+    
+    splits = []
+    for k in range(1, n_folds + 1):
+        test_start = k * block
+        test_end = n_samples if k == n_folds else (k + 1) * block
+        train_start = 0 if mode == 'expanding' else test_start - block
+        splits.append(((train_start, test_start), (test_start, test_end)))
+    return splits
+
+
+# Worker-side view of the shared feature matrix (set by _attach_shared_matrix)
+_shared_fold_data = {}
+
+
+def _attach_shared_matrix(x_name, x_shape, y_name, y_shape):
+    """Process-pool initializer: map the parent's feature matrix without copying it"""
+    x_shm = shared_memory.SharedMemory(name=x_name)
+    y_shm = shared_memory.SharedMemory(name=y_name)
+    _shared_fold_data['handles'] = (x_shm, y_shm)
+    _shared_fold_data['X'] = np.ndarray(x_shape, dtype=np.float64, buffer=x_shm.buf)
+    _shared_fold_data['y'] = np.ndarray(y_shape, dtype=np.int64, buffer=y_shm.buf)
+
+
+def _run_walk_forward_fold(task):
+    """Train and evaluate one (fold, model type) pair in a worker process"""
+    X = _shared_fold_data['X']
+    y = _shared_fold_data['y']
+    (train_start, train_end), (test_start, test_end) = task['train'], task['test']
+    
+    # Keep worker output quiet; the parent reports progress
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = train_model(
+            X[train_start:train_end],
+            y[train_start:train_end],
+            model_type=task['model_type'],
+            n_jobs=task['n_jobs'],
+            **task['params']
+        )
+    y_pred = model.predict(X[test_start:test_end])
+    
+    return {
+        'fold': task['fold'],
+        'model_type': task['model_type'],
+        'accuracy': float(accuracy_score(y[test_start:test_end], y_pred)),
+        'train_samples': train_end - train_start,
+        'test_samples': test_end - test_start
+    }
+
+
+def walk_forward_evaluate(X, y, models_to_train, *, n_folds, mode, params, workers=None, status_callback=None):
+    """
+    Walk-forward evaluation with folds trained in parallel processes
+    
+    The feature matrix is placed in shared memory once; workers map it
+    read-only instead of receiving pickled copies.
+    
+    Args:
+        X: Feature matrix
+        y: Target vector
+        models_to_train: Model types to evaluate
+        n_folds: Number of walk-forward folds
+        mode: 'expanding' or 'rolling'
+        params: Model hyperparameters passed to train_model
+        workers: Worker processes (default: one per fold, capped by CPU count)
+        status_callback: Optional progress callback
+    
+    Returns:
+        dict: Per-fold accuracies and aggregate metrics per model type
+    """
+    splits = walk_forward_splits(len(X), n_folds, mode)
+    if not splits:
+        print("⚠️ Not enough samples for walk-forward evaluation")
+        return {}
+    
+    cpu_count = os.cpu_count() or 1
+    tasks = []
+    for mtype in models_to_train:
+        for fold, (train_range, test_range) in enumerate(splits, 1):
+            tasks.append({'fold': fold, 'model_type': mtype, 'train': train_range, 'test': test_range, 'params': params})
+    if workers is None:
+        workers = min(len(tasks), cpu_count)
+    workers = max(1, workers)
+    # Split cores between workers so fold models don't oversubscribe the CPU
+    n_jobs = max(1, cpu_count // workers)
+    for task in tasks:
+        task['n_jobs'] = n_jobs
+    
+    print(f"\n🚶 Walk-forward evaluation ({mode}, {len(splits)} folds, {workers} workers x {n_jobs} cores)...")
+    
+    X_shared = np.ascontiguousarray(X, dtype=np.float64)
+    y_shared = np.ascontiguousarray(y, dtype=np.int64)
+    x_shm = shared_memory.SharedMemory(create=True, size=max(1, X_shared.nbytes))
+    y_shm = shared_memory.SharedMemory(create=True, size=max(1, y_shared.nbytes))
+    fold_results = []
+    try:
+        np.ndarray(X_shared.shape, dtype=np.float64, buffer=x_shm.buf)[:] = X_shared
+        np.ndarray(y_shared.shape, dtype=np.int64, buffer=y_shm.buf)[:] = y_shared
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach_shared_matrix,
+                                 initargs=(x_shm.name, X_shared.shape, y_shm.name, y_shared.shape)) as pool:
+            futures = [pool.submit(_run_walk_forward_fold, task) for task in tasks]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                fold_results.append(result)
+                print(f"   Fold {result['fold']} [{result['model_type']}]: accuracy={result['accuracy']:.4f} "
+                      f"(train={result['train_samples']}, test={result['test_samples']})")
+                if status_callback:
+                    status_callback(f"Walk-forward: {done}/{len(tasks)} folds evaluated", 80 + int(8 * done / len(tasks)))
+    finally:
+        x_shm.close()
+        x_shm.unlink()
+        y_shm.close()
+        y_shm.unlink()
+    
+    summary = {'mode': mode, 'folds': len(splits)}
+    for mtype in models_to_train:
+        results = sorted((r for r in fold_results if r['model_type'] == mtype), key=lambda r: r['fold'])
+        accuracies = np.array([r['accuracy'] for r in results])
+        summary[mtype] = {
+            'fold_accuracy': [round(a, 4) for a in accuracies],
+            'mean_accuracy': round(float(accuracies.mean()), 4),
+            'std_accuracy': round(float(accuracies.std()), 4),
+            'min_accuracy': round(float(accuracies.min()), 4),
+            'max_accuracy': round(float(accuracies.max()), 4)
+        }
+        print(f"   {mtype.upper()} walk-forward accuracy: {summary[mtype]['mean_accuracy']:.4f} "
+              f"± {summary[mtype]['std_accuracy']:.4f}")
+    return summary
+
+
+def main(status_callback=None, settings=None):
+    """
+    Main training pipeline
+    
+    Args:
+        status_callback: Optional progress callback(message, progress)
+        settings: Optional per-job Settings (default: current config)
+    """
+    settings = resolve_settings(settings)
     
     print("=" * 60)
     print("ML GOLD SIGNAL BOT - MODEL TRAINING")
     print("=" * 60)
     
     # Step 1: Fetch data
-    df, effective_period, used_ticker, used_interval = fetch_training_data(ticker=config.TICKER, period=config.TRAINING_PERIOD, interval=config.INTERVAL)
+    df, effective_period, used_ticker, used_interval = fetch_training_data(ticker=settings.TICKER, period=settings.TRAINING_PERIOD, interval=settings.INTERVAL, settings=settings)
     if df is None:
         return
     
     # Step 2: Add technical indicators
     if status_callback: status_callback("Computing technical indicators...", 15)
     print("\n🔧 Computing technical indicators...")
-    df_with_indicators = add_all_indicators(df)
+    if getattr(settings, "DATA_SOURCE", "").lower() == "mt5_csv":
+        # Keyed by the CSV file, so a later backtest on it reuses this frame;
+        # df is already the file's full history, so it isn't read again
+        df_with_indicators = cached_csv_indicators(getattr(settings, "MT5_CSV_PATH", "data/mt5_history.csv"),
+                                                   settings=settings, bars=df)
+    else:
+        df_with_indicators = cached_indicators(df, settings=settings)
     print(f"✅ Indicators computed. Total samples: {len(df_with_indicators)}")
     
     # Step 3: Prepare features
     if status_callback: status_callback("Preparing features for training...", 25)
     print("\n🎯 Preparing features for training...")
-    X, y = prepare_features(df_with_indicators)
+    X, y = prepare_features(df_with_indicators, settings=settings)
     print(f"✅ Feature matrix shape: {X.shape}")
     print(f"✅ Target distribution: Up={sum(y)}, Down={len(y)-sum(y)}")
     
@@ -195,64 +386,122 @@ def main(status_callback=None):
     print(f"   Testing: {len(X_test)} samples")
     
     # Step 5: Train & Evaluate models
-    models_to_train = [config.MODEL_TYPE]
-    if config.MODEL_TYPE == 'ensemble':
-        models_to_train = config.ENSEMBLE_MODELS
+    models_to_train = [settings.MODEL_TYPE]
+    if settings.MODEL_TYPE == 'ensemble':
+        models_to_train = settings.ENSEMBLE_MODELS
     
     trained_models = {}
     model_metrics = {}
     total_models = len(models_to_train)
-    
-    for i, mtype in enumerate(models_to_train):
-        display_name = {
+    display_names = {
+        mtype: {
             'rf': 'Random Forest',
             'xgboost': 'XGBoost',
             'lightgbm': 'LightGBM'
         }.get(mtype, mtype.upper())
+        for mtype in models_to_train
+    }
+    
+    # Ensemble members train concurrently, each on its own share of the cores
+    if total_models > 1:
+        core_budget = getattr(settings, 'ENSEMBLE_CORE_BUDGET', None) or os.cpu_count() or 1
+        core_split = split_core_budget(core_budget, total_models)
+    else:
+        core_split = [-1]
+    
+    if status_callback:
+        names = ', '.join(display_names[m] for m in models_to_train)
+        suffix = " (in parallel)" if total_models > 1 else ""
+        status_callback(f"{names} Model Training{suffix}...", 30)
+    
+    # Every saved artifact is recorded as a model version
+    registry = ModelRegistry(getattr(settings, 'MODEL_REGISTRY_PATH', None))
+    version_params = {
+        'n_estimators': settings.N_ESTIMATORS,
+        'max_depth': settings.MAX_DEPTH,
+        'min_samples_split': settings.MIN_SAMPLES_SPLIT,
+        'random_state': settings.RANDOM_STATE,
+        'indicators': dict(indicator_params(settings=settings)),
+        'ticker': used_ticker,
+        'interval': used_interval,
+        'period': effective_period,
+        'train_samples': len(X_train)
+    }
+    
+    # Members run in the caller's context, so output captured per job (API) follows them
+    with ThreadPoolExecutor(max_workers=total_models) as pool:
+        futures = {
+            pool.submit(
+                contextvars.copy_context().run,
+                train_model,
+                X_train,
+                y_train,
+                model_type=mtype,
+                n_estimators=settings.N_ESTIMATORS,
+                random_state=settings.RANDOM_STATE,
+                max_depth=settings.MAX_DEPTH,
+                min_samples_split=settings.MIN_SAMPLES_SPLIT,
+                n_jobs=n_jobs
+            ): mtype
+            for mtype, n_jobs in zip(models_to_train, core_split)
+        }
         
-        progress = 30 + (i / total_models) * 50
-        if status_callback: 
-            status_callback(f"{display_name} Model Training...", int(progress))
+        for done, future in enumerate(as_completed(futures), 1):
+            mtype = futures[future]
+            display_name = display_names[mtype]
+            model = future.result()
+            trained_models[mtype] = model
             
-        model = train_model(
-            X_train,
-            y_train,
-            model_type=mtype,
-            n_estimators=config.N_ESTIMATORS,
-            random_state=config.RANDOM_STATE,
-            max_depth=config.MAX_DEPTH,
-            min_samples_split=config.MIN_SAMPLES_SPLIT
-        )
-        trained_models[mtype] = model
-        
-        # Evaluate each model
-        if status_callback: 
-            status_callback(f"Evaluating {display_name}...", int(progress + 5))
+            # Evaluate each model as soon as it is trained
+            progress = 30 + (done / total_models) * 50
+            if status_callback:
+                status_callback(f"Evaluating {display_name} ({done}/{total_models} trained)...", int(progress))
             
-        metrics = evaluate_model(model, X_test, y_test)
-        model_metrics[mtype] = {
-            'name': display_name,
-            'accuracy': f"{metrics['accuracy']:.4f}",
-            'train_samples': metrics['train_samples'],
-            'test_samples': metrics['test_samples']
-        }
-        
-        # Step 7: Save model
-        model_name = 'gold_signal_model.pkl'
-        if config.MODEL_TYPE == 'ensemble':
-            model_name = f'gold_signal_model_{mtype}.pkl'
-        
-        print(f"\n💾 Saving {mtype.upper()} model...")
-        save_model(model, model_dir=config.MODEL_DIR, model_name=model_name)
+            metrics = evaluate_model(model, X_test, y_test)
+            model_metrics[mtype] = {
+                'name': display_name,
+                'accuracy': f"{metrics['accuracy']:.4f}",
+                'train_samples': metrics['train_samples'],
+                'test_samples': metrics['test_samples']
+            }
+            
+            # Step 7: Save model
+            model_name = 'gold_signal_model.pkl'
+            if settings.MODEL_TYPE == 'ensemble':
+                model_name = f'gold_signal_model_{mtype}.pkl'
+            
+            print(f"\n💾 Saving {mtype.upper()} model...")
+            model_path = save_model(model, model_dir=settings.MODEL_DIR, model_name=model_name)
+            registry.register(model_path, mtype, params=version_params, metrics=model_metrics[mtype])
+    
+    # Keep metrics in configured order (the first entry feeds the headline accuracy)
+    model_metrics = {mtype: model_metrics[mtype] for mtype in models_to_train}
+    
+    # Step 7b: Optional walk-forward robustness check
+    walk_forward = None
+    if getattr(settings, 'WALK_FORWARD', False):
+        walk_forward = walk_forward_evaluate(
+            X, y, models_to_train,
+            n_folds=getattr(settings, 'WALK_FORWARD_FOLDS', 5),
+            mode=getattr(settings, 'WALK_FORWARD_MODE', 'expanding'),
+            params={
+                'n_estimators': settings.N_ESTIMATORS,
+                'random_state': settings.RANDOM_STATE,
+                'max_depth': settings.MAX_DEPTH,
+                'min_samples_split': settings.MIN_SAMPLES_SPLIT
+            },
+            workers=getattr(settings, 'WALK_FORWARD_WORKERS', None),
+            status_callback=status_callback
+        )
     
     # Step 8: Save metadata
     metadata = {
         'Ticker': used_ticker,
         'Interval': used_interval,
         'Period': effective_period,
-        'Model Type': config.MODEL_TYPE,
+        'Model Type': settings.MODEL_TYPE,
         'Features': X.shape[1],
-        'Prob_Threshold': config.PROB_THRESHOLD,
+        'Prob_Threshold': settings.PROB_THRESHOLD,
         'Models': model_metrics # This will be stringified or saved as JSON
     }
     
@@ -263,12 +512,14 @@ def main(status_callback=None):
         'Training Samples': main_metrics['train_samples'],
         'Test Samples': main_metrics['test_samples']
     })
+    if walk_forward:
+        metadata['Walk Forward'] = walk_forward
     
-    save_training_metadata(metadata, model_dir=config.MODEL_DIR)
+    save_training_metadata(metadata, model_dir=settings.MODEL_DIR)
     
     print("\n" + "=" * 60)
     print("✅ TRAINING COMPLETE!")
-    if config.MODEL_TYPE == 'ensemble':
+    if settings.MODEL_TYPE == 'ensemble':
         print(f"All {len(models_to_train)} models trained and saved for ensemble.")
     print("You can now run 'signal_bot.py' to generate signals.")
     print("=" * 60)
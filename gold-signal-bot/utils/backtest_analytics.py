@@ -0,0 +1,198 @@
+"""
+Backtest Analytics Module
+Columnar post-processing of simulated trades: P&L summary, equity and
+drawdown curves, daily and monthly aggregates. Each function sorts or groups
+the trades once with NumPy/pandas instead of re-scanning the trade list per
+day or month.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def trades_to_frame(trades):
+    """
+    Columnar view of trade dicts
+
+    Args:
+        trades: List of trade dicts from the backtester
+
+    Returns:
+        pandas DataFrame (one row per trade, in input order) with 'entry_time',
+        'pl_time' (close time, or entry time for trades without one), 'pips'
+        (NaN when unset) and 'closed'
+    """
+    entry_time = pd.DatetimeIndex([t['timestamp'] for t in trades])
+    close_time = pd.DatetimeIndex([t.get('close_timestamp') for t in trades])
+    return pd.DataFrame({
+        'entry_time': entry_time,
+        'pl_time': close_time.where(~close_time.isna(), entry_time),
+        'pips': np.array([np.nan if t['pips'] is None else t['pips'] for t in trades], dtype=np.float64),
+        'closed': np.array([t['status'] == 'Closed' for t in trades], dtype=bool)
+    })
+
+
+def profit_factor(gross_profit, gross_loss):
+    """Gross profit / gross loss (inf when there are only wins, 0 with no wins)"""
+    if gross_loss > 0:
+        return gross_profit / gross_loss
+    return float('inf') if gross_profit > 0 else 0.0
+
+
+def pips_summary(pips):
+    """
+    Win/loss statistics for a set of trade results
+
+    Args:
+        pips: Array-like of pips per trade (NaN entries are ignored)
+
+    Returns:
+        dict: trades, total_pips, winning_trades, losing_trades, win_rate,
+        avg_win, avg_loss, gross_profit, gross_loss, profit_factor
+    """
+    pips = np.asarray(pips, dtype=np.float64)
+    pips = pips[~np.isnan(pips)]
+    wins = pips[pips > 0]
+    losses = pips[pips < 0]
+    gross_profit = float(wins.sum())
+    gross_loss = float(-losses.sum())
+    return {
+        'trades': len(pips),
+        'total_pips': float(pips.sum()),
+        'winning_trades': len(wins),
+        'losing_trades': len(losses),
+        'win_rate': len(wins) / len(pips) * 100 if len(pips) else 0.0,
+        'avg_win': float(wins.mean()) if len(wins) else 0.0,
+        'avg_loss': float(losses.mean()) if len(losses) else 0.0,
+        'gross_profit': gross_profit,
+        'gross_loss': gross_loss,
+        'profit_factor': profit_factor(gross_profit, gross_loss)
+    }
+
+
+def monthly_breakdown(timestamps, pips):
+    """
+    Per-month P&L statistics
+
+    Args:
+        timestamps: Trade timestamps used to bucket trades
+        pips: Pips per trade (NaN entries count towards no statistic)
+
+    Returns:
+        pandas DataFrame indexed by 'YYYY-MM' (sorted) with total_pips,
+        trades, wins, losses, win_rate and profit_factor columns
+    """
+    frame = pd.DataFrame({
+        'month': pd.DatetimeIndex(timestamps).strftime('%Y-%m'),
+        'pips': np.asarray(pips, dtype=np.float64)
+    })
+    frame['win'] = frame['pips'].where(frame['pips'] > 0)
+    frame['loss'] = frame['pips'].where(frame['pips'] < 0)
+    grouped = frame.groupby('month', sort=True)
+    months = pd.DataFrame({
+        'total_pips': grouped['pips'].sum(),
+        'trades': grouped['pips'].count(),
+        'wins': grouped['win'].count(),
+        'losses': grouped['loss'].count(),
+        'gross_profit': grouped['win'].sum(),
+        'gross_loss': -grouped['loss'].sum()
+    })
+    months['win_rate'] = np.where(months['trades'] > 0, months['wins'] / months['trades'].clip(lower=1) * 100, 0.0)
+    months['profit_factor'] = [profit_factor(gp, gl) for gp, gl in zip(months['gross_profit'], months['gross_loss'])]
+    return months
+
+
+def equity_report(trades, initial_balance, pip_value):
+    """
+    Equity, drawdown and daily/monthly performance of the closed trades
+
+    Trades are replayed in order of realisation (close time, entry time for
+    trades without one) against a starting balance; a day's balance is the
+    balance after the last trade realised that day.
+
+    Args:
+        trades: List of trade dicts from the backtester
+        initial_balance: Starting account balance
+        pip_value: Money per pip
+
+    Returns:
+        dict: 'profit_money' (array aligned with the closed trades in input
+        order), 'equity_curve', 'drawdown_curve', 'daily_performance',
+        'monthly_performance' (API shapes, rounded to cents), plus
+        final_balance, total_profit_money, max_drawdown_amount,
+        max_drawdown_percent and max_daily_drawdown_percent
+    """
+    report = {
+        'profit_money': np.zeros(0),
+        'equity_curve': [{'timestamp': 'Start', 'balance': initial_balance, 'pips': 0}],
+        'drawdown_curve': [],
+        'daily_performance': {},
+        'monthly_performance': [],
+        'final_balance': initial_balance,
+        'total_profit_money': 0.0,
+        'max_drawdown_amount': 0.0,
+        'max_drawdown_percent': 0.0,
+        'max_daily_drawdown_percent': 0.0
+    }
+    if not trades:
+        return report
+
+    frame = trades_to_frame(trades)
+    closed = frame[frame['closed']]
+    profit_money = closed['pips'].to_numpy() * pip_value
+    report['profit_money'] = profit_money
+
+    # Realised trades in P&L order (stable, so ties keep entry order)
+    realised = closed[closed['pips'].notna()]
+    order = np.argsort(realised['pl_time'].to_numpy(), kind='stable')
+    pl_time = pd.DatetimeIndex(realised['pl_time'].to_numpy()[order])
+    pips = realised['pips'].to_numpy()[order]
+    profits = pips * pip_value
+    if len(profits) == 0:
+        return report
+
+    # Running balance, peak and drawdown
+    balance = np.cumsum(np.concatenate(([initial_balance], profits)))[1:]
+    peak = np.maximum.accumulate(np.maximum(balance, initial_balance))
+    drawdown = peak - balance
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown_percent = np.where(peak > 0, drawdown / peak * 100, 0.0)
+    cumulative_pips = np.cumsum(pips)
+
+    stamps = [ts.isoformat() for ts in pl_time]
+    report['equity_curve'].extend(
+        {'timestamp': stamp, 'balance': round(float(b), 2), 'pips': round(float(p), 2)}
+        for stamp, b, p in zip(stamps, balance, cumulative_pips)
+    )
+    report['drawdown_curve'] = [
+        {'timestamp': stamp, 'drawdown': round(float(d), 2)}
+        for stamp, d in zip(stamps, drawdown_percent)
+    ]
+
+    # Daily: closing balance (last trade of the day) and trade count
+    days = pl_time.normalize()
+    by_day = pd.DataFrame({'balance': balance}, index=days).groupby(level=0, sort=True)['balance']
+    day_close = by_day.last()
+    day_count = by_day.size()
+    day_profit = np.diff(np.concatenate(([initial_balance], day_close.to_numpy())))
+    day_percent = [round(float(p / initial_balance * 100), 2) for p in day_profit]
+    report['daily_performance'] = {
+        day.date().isoformat(): {'profit': round(float(profit), 2), 'percent': percent, 'count': int(count)}
+        for day, profit, percent, count in zip(day_close.index, day_profit, day_percent, day_count)
+    }
+
+    # Monthly realised profit
+    months = pd.Series(profits, index=pl_time.strftime('%Y-%m')).groupby(level=0, sort=True).sum()
+    report['monthly_performance'] = [
+        {'month': month, 'percent': round(float(profit / initial_balance * 100), 2), 'profit': round(float(profit), 2)}
+        for month, profit in months.items()
+    ]
+
+    report.update(
+        final_balance=float(balance[-1]),
+        total_profit_money=float(np.cumsum(profits)[-1]),
+        max_drawdown_amount=float(max(drawdown.max(), 0.0)),
+        max_drawdown_percent=float(max(drawdown_percent.max(), 0.0)),
+        max_daily_drawdown_percent=min(0.0, min(day_percent))
+    )
+    return report
@@ -0,0 +1,372 @@
+"""
+Backtest Engine Module
+Array-based trade simulation used by GoldBacktester.run_backtest
+"""
+
+import heapq
+import itertools
+import numpy as np
+from utils.settings import resolve_settings
+
+
+def compute_signal_masks(results_df, settings=None):
+    """
+    Evaluate the entry rules of the backtest for every bar at once
+
+    Args:
+        results_df: DataFrame with indicators plus 'Prediction', 'Prob_Up'
+                    and 'Prob_Down' columns
+        settings: Optional Settings with the filter/threshold values (default: current config)
+
+    Returns:
+        dict of boolean numpy arrays: 'buy', 'sell', 'volatility_reject',
+        'confidence_reject', 'macd_reject', plus the 'confidence' array
+    """
+    settings = resolve_settings(settings)
+    n = len(results_df)
+    close = results_df['Close'].to_numpy(dtype=np.float64)
+    pred = results_df['Prediction'].to_numpy().astype(np.int64)
+    prob_up = results_df['Prob_Up'].to_numpy(dtype=np.float64)
+    prob_down = results_df['Prob_Down'].to_numpy(dtype=np.float64)
+    confidence = np.maximum(prob_up, prob_down)
+
+    # First bar has no previous prediction and is skipped entirely
+    has_prev = np.zeros(n, dtype=bool)
+    has_prev[1:] = True
+    prev_pred = np.empty(n, dtype=np.int64)
+    prev_pred[0] = -1
+    prev_pred[1:] = pred[:-1]
+
+    # 1. Volatility filter (ATR)
+    if getattr(settings, 'USE_VOLATILITY_FILTER', False):
+        atr = results_df['ATR'].to_numpy(dtype=np.float64)
+        min_atr = getattr(settings, 'ATR_FILTER_MIN', 0)
+        max_atr = getattr(settings, 'ATR_FILTER_MAX', 999999)
+        volatility_reject = has_prev & ((atr < min_atr) | (atr > max_atr))
+    else:
+        volatility_reject = np.zeros(n, dtype=bool)
+    remaining = has_prev & ~volatility_reject
+
+    # 2. Trend filter: only trade with EMA200 trend
+    macd = results_df['MACD'].to_numpy(dtype=np.float64)
+    macd_sig = results_df['MACD_Signal'].to_numpy(dtype=np.float64)
+    rsi = results_df['RSI'].to_numpy(dtype=np.float64)
+    if getattr(settings, 'USE_TREND_FILTER', False):
+        ema_slow = results_df['EMA_Slow'].to_numpy(dtype=np.float64)
+        trend_ok_buy = close > ema_slow
+        trend_ok_sell = close < ema_slow
+    else:
+        trend_ok_buy = trend_ok_sell = np.ones(n, dtype=bool)
+
+    macd_ok_buy = (macd > macd_sig) & (rsi > settings.RSI_BUY_MIN) & trend_ok_buy
+    macd_ok_sell = (macd < macd_sig) & (rsi < settings.RSI_SELL_MAX) & trend_ok_sell
+
+    # Confidence gate
+    confidence_reject = remaining & (confidence < float(settings.PROB_THRESHOLD))
+    remaining &= ~confidence_reject
+
+    # BUY on 0 -> 1 flip, SELL on 1 -> 0 flip
+    buy = remaining & (prev_pred == 0) & (pred == 1) & macd_ok_buy
+    sell = remaining & (prev_pred == 1) & (pred == 0) & macd_ok_sell
+    macd_reject = remaining & ~buy & ~sell
+
+    return {
+        'buy': buy,
+        'sell': sell,
+        'volatility_reject': volatility_reject,
+        'confidence_reject': confidence_reject,
+        'macd_reject': macd_reject,
+        'confidence': confidence
+    }
+
+
+def first_crossing(prices, start, level, below, chunk=64):
+    """
+    Find the first bar at or after 'start' whose price crosses 'level'
+
+    Scans forward in geometrically growing windows; inside each window the
+    running extreme is monotonic, so the hit is located with searchsorted.
+
+    Args:
+        prices: 1-D float array of closing prices
+        start: Index to start searching from (inclusive)
+        level: Price level to test against
+        below: True to look for price <= level, False for price >= level
+        chunk: Size of the first window
+
+    Returns:
+        int: Index of the first crossing, or -1 if the level is never hit
+    """
+    n = len(prices)
+    lo = start
+    while lo < n:
+        hi = min(n, lo + chunk)
+        window = prices[lo:hi]
+        if below:
+            extreme = -np.minimum.accumulate(window)
+            pos = int(np.searchsorted(extreme, -level, side='left'))
+        else:
+            extreme = np.maximum.accumulate(window)
+            pos = int(np.searchsorted(extreme, level, side='left'))
+        if pos < len(window):
+            return lo + pos
+        lo = hi
+        chunk *= 4
+    return -1
+
+
+def resolve_exit(prices, start, trade_type, sl, tp):
+    """
+    Resolve when and how a trade leaves the market
+
+    SL is checked before TP on the same bar, matching the per-bar loop.
+
+    Args:
+        prices: 1-D float array of closing prices
+        start: Entry bar index (exits are checked from the entry bar on)
+        trade_type: 'BUY' or 'SELL'
+        sl: Stop loss level
+        tp: Take profit level
+
+    Returns:
+        tuple: (exit_index, reason) or (-1, None) if the trade stays open
+    """
+    is_buy = trade_type == 'BUY'
+    sl_idx = first_crossing(prices, start, sl, below=is_buy)
+    tp_idx = first_crossing(prices, start, tp, below=not is_buy)
+
+    if sl_idx >= 0 and (tp_idx < 0 or sl_idx <= tp_idx):
+        return sl_idx, 'SL_HIT'
+    if tp_idx >= 0:
+        return tp_idx, 'TP_HIT'
+    return -1, None
+
+
+class OpenPositionIndex:
+    """
+    Heaps of open trades keyed by their SL and TP levels
+
+    Each trade sits in one SL heap and one TP heap for its side, arranged so
+    the level closest to being crossed is always on top. Checking a bar only
+    pops the trades whose level was actually crossed; entries of trades that
+    were closed through the other heap are discarded lazily.
+    """
+
+    def __init__(self):
+        self._seq = itertools.count()
+        # BUY: SL hit when price <= sl (max-heap), TP hit when price >= tp (min-heap)
+        # SELL: SL hit when price >= sl (min-heap), TP hit when price <= tp (max-heap)
+        self._buy_sl = []
+        self._buy_tp = []
+        self._sell_sl = []
+        self._sell_tp = []
+
+    def add(self, trade):
+        """Register a newly opened trade"""
+        seq = next(self._seq)
+        if trade['type'] == 'BUY':
+            heapq.heappush(self._buy_sl, (-trade['sl'], seq, trade))
+            heapq.heappush(self._buy_tp, (trade['tp'], seq, trade))
+        else:
+            heapq.heappush(self._sell_sl, (trade['sl'], seq, trade))
+            heapq.heappush(self._sell_tp, (-trade['tp'], seq, trade))
+
+    @staticmethod
+    def _pop_crossed(heap, crossed):
+        """Pop open trades from the top of a heap while their level is crossed"""
+        hits = []
+        while heap:
+            key, _, trade = heap[0]
+            if trade['status'] != 'Open':
+                heapq.heappop(heap)
+            elif crossed(key):
+                heapq.heappop(heap)
+                hits.append(trade)
+            else:
+                break
+        return hits
+
+    def pop_stop_losses(self, price):
+        """Return open trades whose SL is crossed at 'price'"""
+        hits = self._pop_crossed(self._buy_sl, lambda key: price <= -key)
+        hits += self._pop_crossed(self._sell_sl, lambda key: price >= key)
+        return hits
+
+    def pop_take_profits(self, price):
+        """Return open trades whose TP is crossed at 'price'"""
+        hits = self._pop_crossed(self._buy_tp, lambda key: price >= key)
+        hits += self._pop_crossed(self._sell_tp, lambda key: price <= -key)
+        return hits
+
+
+def _sl_tp_levels(trade_type, price, atr_val, settings):
+    """Compute rounded SL/TP levels for a new trade"""
+    use_atr = getattr(settings, 'USE_ATR_STOPS', False)
+    if trade_type == 'BUY':
+        if use_atr and atr_val > 0:
+            atr_stop_mult = getattr(settings, 'ATR_STOP_MULTIPLIER', 2.0)
+            atr_tp_mult = getattr(settings, 'ATR_TP_MULTIPLIER', 10)
+            return round(price - (atr_val * atr_stop_mult), 2), round(price + (atr_val * atr_tp_mult), 2)
+        return round(price * (1 - settings.STOP_LOSS_PERCENT), 2), round(price * (1 + settings.TAKE_PROFIT_PERCENT), 2)
+
+    if use_atr and atr_val > 0:
+        atr_stop_mult = getattr(settings, 'ATR_STOP_MULTIPLIER', 2.0)
+        atr_tp_mult = getattr(settings, 'ATR_TP_MULTIPLIER', 5.0)
+        return round(price + (atr_val * atr_stop_mult), 2), round(price - (atr_val * atr_tp_mult), 2)
+    return round(price * (1 + settings.STOP_LOSS_PERCENT), 2), round(price * (1 - settings.TAKE_PROFIT_PERCENT), 2)
+
+
+def simulate_trades(results_df, settings=None):
+    """
+    Simulate the backtest strategy over a prediction frame
+
+    Args:
+        results_df: DataFrame with indicators, predictions and probabilities
+        settings: Optional Settings with the strategy values (default: current config)
+
+    Returns:
+        tuple: (trades, stats) where trades is a list of trade dicts in entry
+        order and stats holds the signal/filter counters
+    """
+    settings = resolve_settings(settings)
+    masks = compute_signal_masks(results_df, settings)
+    close = results_df['Close'].to_numpy(dtype=np.float64)
+    atr = results_df['ATR'].to_numpy(dtype=np.float64)
+    confidence = masks['confidence']
+    index = results_df.index
+
+    entries = np.flatnonzero(masks['buy'] | masks['sell'])
+    trades = []
+    for idx in entries:
+        trade_type = 'BUY' if masks['buy'][idx] else 'SELL'
+        entry_price = float(close[idx])
+        sl, tp = _sl_tp_levels(trade_type, entry_price, float(atr[idx]), settings)
+
+        trade = {
+            'timestamp': index[idx],
+            'type': trade_type,
+            'entry_price': entry_price,
+            'sl': sl,
+            'tp': tp,
+            'close_price': None,
+            'close_timestamp': None,
+            'close_reason': None,
+            'pips': None,
+            'status': 'Open',
+            'confidence': float(confidence[idx])
+        }
+
+        exit_idx, reason = resolve_exit(close, idx, trade_type, sl, tp)
+        if exit_idx >= 0:
+            level = sl if reason == 'SL_HIT' else tp
+            trade['close_price'] = level
+            trade['close_timestamp'] = index[exit_idx]
+            trade['close_reason'] = reason
+            # For Gold: pips = price_diff * 10 (each 0.1 = 1 pip)
+            if trade_type == 'BUY':
+                trade['pips'] = (level - entry_price) * 10
+            else:
+                trade['pips'] = (entry_price - level) * 10
+            trade['status'] = 'Closed'
+
+        trades.append(trade)
+
+    stats = {
+        'signals_generated': len(trades),
+        'confidence_rejects': int(masks['confidence_reject'].sum()),
+        'macd_rejects': int(masks['macd_reject'].sum()),
+        'volatility_rejects': int(masks['volatility_reject'].sum())
+    }
+    return trades, stats
+
+
+def _next_index(indices, start):
+    """First value of the sorted array 'indices' at or after 'start', or -1"""
+    pos = int(np.searchsorted(indices, start, side='left'))
+    return int(indices[pos]) if pos < len(indices) else -1
+
+
+def simulate_single_position(close, pred, proba, rsi, settings=None):
+    """
+    Simulate the one-position-at-a-time reversal strategy of the timeframe comparison
+
+    A position opens on a bar where the prediction flips with probability
+    >= PROB_THRESHOLD (BUY on 0 -> 1 with RSI >= RSI_BUY_MIN, SELL on 1 -> 0
+    with RSI <= RSI_SELL_MAX) and closes on the first later bar that hits the
+    fixed-percentage SL, the TP, or a confident opposite prediction (checked
+    in that order on the same bar). Rather than visiting every bar, each
+    trade jumps to its next entry and exit with searchsorted, so the cost
+    grows with the number of trades.
+
+    Args:
+        close: 1-D array of closing prices
+        pred: 1-D array of predicted classes (0/1)
+        proba: 1-D array of the predicted class's probability
+        rsi: 1-D array of RSI values
+        settings: Optional Settings with the strategy values (default: current config)
+
+    Returns:
+        list of trade dicts with 'Type', 'Entry' and 'Exit' (bar indices),
+        'Pips' and 'Reason' ('SL', 'TP' or 'Signal'); a position still open
+        at the last bar is not included
+    """
+    settings = resolve_settings(settings)
+    close = np.asarray(close, dtype=np.float64)
+    pred = np.asarray(pred).astype(np.int64)
+    proba = np.asarray(proba, dtype=np.float64)
+    rsi = np.asarray(rsi, dtype=np.float64)
+    sl_pct = settings.STOP_LOSS_PERCENT
+    tp_pct = settings.TAKE_PROFIT_PERCENT
+
+    confident = proba >= settings.PROB_THRESHOLD
+    prev_pred = np.empty_like(pred)
+    prev_pred[0] = -1  # The first bar has no previous prediction
+    prev_pred[1:] = pred[:-1]
+    buy_entries = np.flatnonzero(confident & (pred == 1) & (prev_pred == 0) & (rsi >= settings.RSI_BUY_MIN))
+    sell_entries = np.flatnonzero(confident & (pred == 0) & (prev_pred == 1) & (rsi <= settings.RSI_SELL_MAX))
+    # A confident opposite prediction closes the position
+    buy_reversals = np.flatnonzero(confident & (pred == 0))
+    sell_reversals = np.flatnonzero(confident & (pred == 1))
+
+    trades = []
+    start = 1
+    while True:
+        buy_idx = _next_index(buy_entries, start)
+        sell_idx = _next_index(sell_entries, start)
+        if buy_idx < 0 and sell_idx < 0:
+            break
+        is_buy = sell_idx < 0 or 0 <= buy_idx < sell_idx
+        entry = buy_idx if is_buy else sell_idx
+        entry_price = close[entry]
+        if is_buy:
+            sl, tp = entry_price * (1 - sl_pct), entry_price * (1 + tp_pct)
+            reversal = _next_index(buy_reversals, entry + 1)
+        else:
+            sl, tp = entry_price * (1 + sl_pct), entry_price * (1 - tp_pct)
+            reversal = _next_index(sell_reversals, entry + 1)
+
+        # Exits are checked from the bar after entry; min() keeps SL > TP > Signal on ties
+        exits = [(idx, reason) for idx, reason in (
+            (first_crossing(close, entry + 1, sl, below=is_buy), 'SL'),
+            (first_crossing(close, entry + 1, tp, below=not is_buy), 'TP'),
+            (reversal, 'Signal')
+        ) if idx >= 0]
+        if not exits:
+            break
+        exit_idx, reason = min(exits, key=lambda e: e[0])
+
+        if reason == 'SL':
+            pips = -abs(sl_pct * 100)
+        elif reason == 'TP':
+            pips = tp_pct * 100
+        else:
+            pips = (close[exit_idx] - entry_price if is_buy else entry_price - close[exit_idx]) * 100
+        trades.append({
+            'Type': 'BUY' if is_buy else 'SELL',
+            'Entry': entry,
+            'Exit': exit_idx,
+            'Pips': float(pips),
+            'Reason': reason
+        })
+        start = exit_idx + 1
+    return trades
@@ -0,0 +1,160 @@
+"""
+Bar Cache Module
+Binary columnar sidecar cache for OHLCV CSV exports, with date-window loads
+"""
+
+import os
+import json
+import glob
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+import config
+
+
+CACHE_VERSION = 2
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+BAR_COLUMNS = PRICE_COLUMNS + ['Volume']
+
+
+def _cache_prefix(csv_path):
+    """Cache directory prefix for a CSV path (independent of its contents)"""
+    abs_path = os.path.abspath(csv_path)
+    digest = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(abs_path))[0]
+    cache_dir = getattr(config, 'CSV_CACHE_DIR', os.path.join(config.DATA_DIR, 'cache'))
+    return os.path.join(cache_dir, f"{name}-{digest}")
+
+
+def cache_path_for(csv_path):
+    """
+    Cache directory for the current version of a CSV file
+
+    The directory name encodes path, size and mtime, so any change to the CSV
+    points at a new directory and the old one is never rewritten in place
+    (it may still be memory-mapped by another process).
+    """
+    stat = os.stat(csv_path)
+    return f"{_cache_prefix(csv_path)}-v{CACHE_VERSION}-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def window_offset(dates, start, warmup_bars=0):
+    """
+    Binary-search the first bar to load for a window
+
+    Args:
+        dates: Sorted datetime64 array of bar timestamps
+        start: First timestamp of the window
+        warmup_bars: Extra bars to keep before 'start' for indicator warm-up
+
+    Returns:
+        int: Offset of the first bar to materialize
+    """
+    pos = int(np.searchsorted(dates, pd.Timestamp(start).to_datetime64(), side='left'))
+    return max(0, pos - warmup_bars)
+
+
+def read_cache(csv_path, start=None, warmup_bars=0):
+    """
+    Load cached bars for a CSV file
+
+    Args:
+        csv_path: Path to the source CSV file
+        start: Optional first timestamp to load; only bars from that point
+               (plus 'warmup_bars' before it) are materialized
+        warmup_bars: Bars to keep before 'start'
+
+    Returns:
+        DataFrame backed by copy-on-write memory maps (a materialized copy of
+        the window when 'start' is given), or None on cache miss
+    """
+    path = cache_path_for(csv_path)
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != CACHE_VERSION:
+            return None
+        dates = np.load(os.path.join(path, 'Date.npy'), mmap_mode='c')
+        prices = np.load(os.path.join(path, 'prices.npy'), mmap_mode='c')
+        volume = np.load(os.path.join(path, 'Volume.npy'), mmap_mode='c')
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring unreadable bar cache {path}: {e}")
+        return None
+
+    if start is not None:
+        if meta.get('sorted', False):
+            offset = window_offset(dates, start, warmup_bars)
+            dates, prices, volume = np.array(dates[offset:]), np.array(prices[offset:]), np.array(volume[offset:])
+        else:
+            mask = dates >= pd.Timestamp(start).to_datetime64()
+            dates, prices, volume = dates[mask], prices[mask], volume[mask]
+
+    index = pd.DatetimeIndex(dates, name='Date')
+    df = pd.DataFrame(prices, index=index, columns=PRICE_COLUMNS, copy=False)
+    df['Volume'] = volume
+    return df
+
+
+def write_cache(csv_path, df):
+    """
+    Store parsed bars next to the CSV's other cache versions
+
+    Only plain OHLCV frames with a naive DatetimeIndex are cached.
+
+    Args:
+        csv_path: Path to the source CSV file
+        df: DataFrame returned by the CSV parser
+
+    Returns:
+        bool: True if the cache was written
+    """
+    if list(df.columns) != BAR_COLUMNS:
+        return False
+    if not isinstance(df.index, pd.DatetimeIndex) or df.index.tz is not None:
+        return False
+    if not np.issubdtype(df['Volume'].dtype, np.number):
+        return False
+
+    path = cache_path_for(csv_path)
+    if os.path.exists(os.path.join(path, 'meta.json')):
+        return True
+
+    stat = os.stat(csv_path)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    try:
+        os.makedirs(tmp_path, exist_ok=True)
+        np.save(os.path.join(tmp_path, 'Date.npy'), df.index.values)
+        np.save(os.path.join(tmp_path, 'prices.npy'),
+                np.ascontiguousarray(df[PRICE_COLUMNS].to_numpy(dtype=np.float64)))
+        np.save(os.path.join(tmp_path, 'Volume.npy'), df['Volume'].to_numpy())
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump({
+                'version': CACHE_VERSION,
+                'source': os.path.abspath(csv_path),
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'rows': len(df),
+                'sorted': bool(df.index.is_monotonic_increasing)
+            }, f, indent=4)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # Another process may have published the same version first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not os.path.exists(os.path.join(path, 'meta.json')):
+            print(f"⚠️ Could not write bar cache {path}: {e}")
+            return False
+
+    _prune_stale(csv_path, keep=path)
+    return True
+
+
+def _prune_stale(csv_path, keep):
+    """Remove cache versions of a CSV other than 'keep' (best effort)"""
+    for old in glob.glob(f"{glob.escape(_cache_prefix(csv_path))}-*"):
+        if os.path.abspath(old) != os.path.abspath(keep) and '.tmp' not in os.path.basename(old):
+            shutil.rmtree(old, ignore_errors=True)
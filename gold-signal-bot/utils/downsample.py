@@ -0,0 +1,79 @@
+"""
+Downsampling Module
+Largest-Triangle-Three-Buckets (LTTB) reduction of chart series, keeping the
+visual shape (peaks, troughs, drawdowns) of long curves within a point budget
+"""
+
+import numpy as np
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices of the points LTTB keeps
+
+    The first and last points are always kept; the rest of the series is
+    split into n_out - 2 buckets and from each bucket the point forming the
+    largest triangle with the previously kept point and the next bucket's
+    average is selected.
+
+    Args:
+        x: 1-D array of increasing x values
+        y: 1-D array of y values
+        n_out: Point budget (series at or below it are returned whole)
+
+    Returns:
+        numpy int array of sorted indices into the series
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+
+    # Bucket edges over the interior points 1..n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    selected = 0
+    for b in range(n_out - 2):
+        start, end = edges[b], max(edges[b + 1], edges[b] + 1)
+        if b + 1 < n_out - 2:
+            next_start, next_end = edges[b + 1], max(edges[b + 2], edges[b + 1] + 1)
+            avg_x = x[next_start:next_end].mean()
+            avg_y = y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        # Twice the triangle area for every candidate in the bucket
+        area = np.abs(
+            (x[selected] - avg_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (avg_y - y[selected])
+        )
+        selected = start + int(np.argmax(area))
+        keep[b + 1] = selected
+    return keep
+
+
+def downsample_points(points, y_key, n_out):
+    """
+    LTTB-downsample a list of chart point dicts
+
+    Points are spaced by position (the curves are in time order and may
+    start with a non-date 'Start' point).
+
+    Args:
+        points: List of dicts, e.g. equity_curve entries
+        y_key: Key holding the plotted value ('balance', 'drawdown', ...)
+        n_out: Point budget
+
+    Returns:
+        list: The kept points, in order
+    """
+    if not points or n_out >= len(points):
+        return points
+    y = np.array([p.get(y_key) or 0.0 for p in points], dtype=np.float64)
+    return [points[i] for i in lttb_indices(np.arange(len(points)), y, n_out)]
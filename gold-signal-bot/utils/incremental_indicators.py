@@ -0,0 +1,317 @@
+"""
+Incremental Indicators Module
+Streaming counterpart of add_all_indicators: keeps running EMA state and
+small rolling windows so each new bar costs O(1) instead of a full recompute.
+Higher-timeframe features keep one such state per timeframe, advanced only
+when a higher-timeframe bar closes.
+"""
+
+import copy
+from collections import deque
+import numpy as np
+import pandas as pd
+import config
+from utils.indicators import FEATURE_COLUMNS, normalize_price_frame
+from utils.resample import TIMEFRAME_MINUTES, bin_starts, infer_timeframe, normalize_timeframe
+
+
+class IncrementalIndicators:
+    """Indicator state for one symbol/timeframe, advanced one bar at a time"""
+
+    def __init__(self, rsi_period=None, macd_fast=None, macd_slow=None, macd_signal=None,
+                 bb_period=None, bb_std_dev=None, atr_period=None, ema_fast=None, ema_slow=None):
+        """
+        Initialize empty state (parameters default to the config values)
+        """
+        self.rsi_period = rsi_period or getattr(config, 'RSI_PERIOD', 14)
+        self.macd_fast = macd_fast or getattr(config, 'MACD_FAST', 12)
+        self.macd_slow = macd_slow or getattr(config, 'MACD_SLOW', 26)
+        self.macd_signal = macd_signal or getattr(config, 'MACD_SIGNAL', 9)
+        self.bb_period = bb_period or getattr(config, 'BB_PERIOD', 20)
+        self.bb_std_dev = bb_std_dev or getattr(config, 'BB_STD_DEV', 2)
+        self.atr_period = atr_period or getattr(config, 'ATR_PERIOD', 14)
+        self.ema_fast_period = ema_fast or getattr(config, 'EMA_FAST', 50)
+        self.ema_slow_period = ema_slow or getattr(config, 'EMA_SLOW', 200)
+
+        self.last_timestamp = None
+        self.latest = None
+        self._prev_close = None
+        self._gains = deque(maxlen=self.rsi_period)
+        self._losses = deque(maxlen=self.rsi_period)
+        self._bb_closes = deque(maxlen=self.bb_period)
+        self._true_ranges = deque(maxlen=self.atr_period)
+        self._closes = deque(maxlen=4)
+        self._ema_fast_hist = deque(maxlen=4)
+        self._ema = {}
+
+    @classmethod
+    def from_history(cls, df, **params):
+        """
+        Build state by replaying a history of bars
+
+        Args:
+            df: pandas DataFrame with High/Low/Close columns
+            **params: Indicator periods (see __init__)
+
+        Returns:
+            IncrementalIndicators warmed up to the last bar of df
+        """
+        state = cls(**params)
+        frame = normalize_price_frame(df)
+        highs = frame['High'].to_numpy(dtype=np.float64)
+        lows = frame['Low'].to_numpy(dtype=np.float64)
+        closes = frame['Close'].to_numpy(dtype=np.float64)
+        for i, timestamp in enumerate(frame.index):
+            state.update(highs[i], lows[i], closes[i], timestamp=timestamp)
+        return state
+
+    def _ema_step(self, key, span, value):
+        """Advance an adjust=False EMA (same recursion as pandas ewm)"""
+        prev = self._ema.get(key)
+        if prev is None:
+            self._ema[key] = value
+        else:
+            alpha = 2.0 / (span + 1.0)
+            self._ema[key] = (1.0 - alpha) * prev + alpha * value
+        return self._ema[key]
+
+    def update(self, high, low, close, timestamp=None):
+        """
+        Commit a completed bar
+
+        Args:
+            high, low, close: Bar prices
+            timestamp: Optional bar timestamp (tracked in last_timestamp)
+
+        Returns:
+            dict of indicator values for the bar (NaN while warming up)
+        """
+        high, low, close = float(high), float(low), float(close)
+        prev_close = self._prev_close
+
+        # RSI (rolling mean of gains/losses; first bar counts as no change)
+        delta = 0.0 if prev_close is None else close - prev_close
+        self._gains.append(delta if delta > 0 else 0.0)
+        self._losses.append(-delta if delta < 0 else 0.0)
+        rsi = np.nan
+        if len(self._gains) == self.rsi_period:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rs = np.float64(sum(self._gains) / self.rsi_period) / np.float64(sum(self._losses) / self.rsi_period)
+                rsi = float(100 - (100 / (1 + rs)))
+
+        # MACD
+        macd = self._ema_step('macd_fast', self.macd_fast, close) - self._ema_step('macd_slow', self.macd_slow, close)
+        macd_signal = self._ema_step('macd_signal', self.macd_signal, macd)
+
+        # Bollinger %B
+        self._bb_closes.append(close)
+        bb_b = np.nan
+        if len(self._bb_closes) == self.bb_period:
+            window = np.fromiter(self._bb_closes, dtype=np.float64, count=self.bb_period)
+            middle = window.mean()
+            std = window.std(ddof=1)
+            upper = middle + std * self.bb_std_dev
+            lower = middle - std * self.bb_std_dev
+            width = upper - lower
+            bb_b = (close - lower) / width if width != 0 else np.nan
+
+        # ATR
+        if prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        self._true_ranges.append(true_range)
+        atr = sum(self._true_ranges) / self.atr_period if len(self._true_ranges) == self.atr_period else np.nan
+
+        # EMAs and slope
+        ema_fast = self._ema_step('ema_fast', self.ema_fast_period, close)
+        ema_slow = self._ema_step('ema_slow', self.ema_slow_period, close)
+        self._ema_fast_hist.append(ema_fast)
+        ema_slope = (ema_fast - self._ema_fast_hist[0]) / 3 if len(self._ema_fast_hist) == 4 else np.nan
+
+        # Price returns
+        self._closes.append(close)
+        price_return = (close / self._closes[-2] - 1) * 100 if len(self._closes) >= 2 else np.nan
+        return_3 = (close / self._closes[0] - 1) * 100 if len(self._closes) == 4 else np.nan
+
+        self._prev_close = close
+        self.last_timestamp = timestamp
+        self.latest = {
+            'Close': close,
+            'RSI': rsi,
+            'MACD': macd,
+            'MACD_Signal': macd_signal,
+            'MACD_Hist': macd - macd_signal,
+            'BB_%B': bb_b,
+            'ATR': atr,
+            'EMA_Fast': ema_fast,
+            'EMA_Slow': ema_slow,
+            'EMA_Slope': ema_slope,
+            'EMA_Ratio': ema_fast / ema_slow,
+            'Price_Return': price_return,
+            'Return_3': return_3
+        }
+        return self.latest
+
+    def preview(self, high, low, close, timestamp=None):
+        """
+        Compute indicator values for a bar without committing it
+        (e.g. the still-forming candle of a live feed)
+        """
+        return self.clone().update(high, low, close, timestamp=timestamp)
+
+    def clone(self):
+        """Independent copy of the state"""
+        probe = copy.copy(self)
+        probe._gains = deque(self._gains, maxlen=self._gains.maxlen)
+        probe._losses = deque(self._losses, maxlen=self._losses.maxlen)
+        probe._bb_closes = deque(self._bb_closes, maxlen=self._bb_closes.maxlen)
+        probe._true_ranges = deque(self._true_ranges, maxlen=self._true_ranges.maxlen)
+        probe._closes = deque(self._closes, maxlen=self._closes.maxlen)
+        probe._ema_fast_hist = deque(self._ema_fast_hist, maxlen=self._ema_fast_hist.maxlen)
+        probe._ema = dict(self._ema)
+        return probe
+
+
+# Columns of IncrementalIndicators.update, usable as higher-timeframe features
+STREAMED_COLUMNS = ['Close'] + FEATURE_COLUMNS
+
+
+class _HigherTimeframeBar:
+    """Forming bar and indicator state of one higher timeframe"""
+
+    def __init__(self, timeframe, session_offset_minutes, params):
+        self.timeframe = timeframe
+        self.minutes = TIMEFRAME_MINUTES[timeframe]
+        self.session_offset_minutes = session_offset_minutes
+        self.state = IncrementalIndicators(**params)
+        self.values = None       # Indicators of the last closed bar
+        self.bin_start = None    # Open time of the forming bar
+        self.high = self.low = self.close = None
+
+    def add(self, timestamp, close_time, high, low, close):
+        start = bin_starts(pd.DatetimeIndex([timestamp]), self.minutes, self.session_offset_minutes)[0]
+        if self.bin_start is not None and start != self.bin_start:
+            self._close_bar()  # The previous bin ended before this bar began
+        if self.bin_start is None:
+            self.bin_start, self.high, self.low = start, high, low
+        else:
+            self.high, self.low = max(self.high, high), min(self.low, low)
+        self.close = close
+        if close_time >= self.bin_start + np.timedelta64(self.minutes, 'm'):
+            self._close_bar()
+
+    def _close_bar(self):
+        self.values = self.state.update(self.high, self.low, self.close, timestamp=self.bin_start)
+        self.bin_start = None
+
+    def clone(self):
+        probe = copy.copy(self)
+        probe.state = self.state.clone()
+        return probe
+
+
+class HigherTimeframeIndicators:
+    """
+    Streaming counterpart of add_htf_features
+
+    Base bars are aggregated into each higher timeframe's forming bar; its
+    indicator state advances only when that bar closes, and the features
+    are those of the last closed bar, exactly as add_htf_features aligns
+    them. Each base bar costs O(1).
+    """
+
+    def __init__(self, htf_features, base_timeframe, session_offset_hours=None, **params):
+        """
+        Initialize empty state
+
+        Args:
+            htf_features: (timeframe, indicator column) pairs, e.g. [('D1', 'RSI')]
+            base_timeframe: Timeframe of the bars fed to update()
+            session_offset_hours: Session start after midnight
+                                  (default config.RESAMPLE_SESSION_OFFSET_HOURS)
+            **params: Indicator periods (see IncrementalIndicators)
+        """
+        if session_offset_hours is None:
+            session_offset_hours = getattr(config, 'RESAMPLE_SESSION_OFFSET_HOURS', 0)
+        offset_minutes = int(round(session_offset_hours * 60))
+        self.base_minutes = TIMEFRAME_MINUTES[normalize_timeframe(base_timeframe)]
+        self.features = [(normalize_timeframe(timeframe), column) for timeframe, column in htf_features]
+        self.last_timestamp = None
+        self._bars = {}
+        for timeframe, column in self.features:
+            if column not in STREAMED_COLUMNS:
+                raise ValueError(f"{column} is not computed incrementally; use one of {STREAMED_COLUMNS}")
+            if TIMEFRAME_MINUTES[timeframe] <= self.base_minutes:
+                raise ValueError(f"{timeframe} is not a higher timeframe than the {base_timeframe} bars")
+            if timeframe not in self._bars:
+                self._bars[timeframe] = _HigherTimeframeBar(timeframe, offset_minutes, params)
+
+    @classmethod
+    def from_history(cls, df, htf_features, **params):
+        """
+        Build state by replaying a history of base bars
+
+        Args:
+            df: pandas DataFrame with High/Low/Close columns (at least two bars)
+            htf_features: (timeframe, indicator column) pairs
+            **params: Indicator periods (see IncrementalIndicators)
+
+        Returns:
+            HigherTimeframeIndicators advanced to the last bar of df
+        """
+        frame = normalize_price_frame(df)
+        state = cls(htf_features, infer_timeframe(frame.index), **params)
+        bars = frame[['High', 'Low', 'Close']].to_numpy(dtype=np.float64)
+        for timestamp, (high, low, close) in zip(frame.index, bars):
+            state.update(high, low, close, timestamp=timestamp)
+        return state
+
+    def update(self, high, low, close, timestamp):
+        """
+        Commit a completed base bar
+
+        Returns:
+            dict of '<timeframe>_<column>' values (NaN while warming up)
+        """
+        stamp = pd.Timestamp(timestamp).to_datetime64().astype('datetime64[ns]')
+        close_time = stamp + np.timedelta64(self.base_minutes, 'm')
+        for bar in self._bars.values():
+            bar.add(stamp, close_time, float(high), float(low), float(close))
+        self.last_timestamp = timestamp
+        return self.latest()
+
+    def preview(self, high, low, close, timestamp):
+        """Feature values for a base bar without committing it (the forming candle)"""
+        probe = copy.copy(self)
+        probe._bars = {timeframe: bar.clone() for timeframe, bar in self._bars.items()}
+        return probe.update(high, low, close, timestamp)
+
+    def latest(self):
+        """Feature values after the last committed bar"""
+        values = {}
+        for timeframe, column in self.features:
+            closed = self._bars[timeframe].values
+            values[f"{timeframe}_{column}"] = closed[column] if closed is not None else np.nan
+        return values
+
+
+def to_feature_row(values, columns=None):
+    """
+    Convert indicator values into a prepare_features-compatible row
+
+    Args:
+        values: dict returned by IncrementalIndicators.update/preview (merged
+                with HigherTimeframeIndicators values when HTF features are used)
+        columns: Feature columns in model order (default FEATURE_COLUMNS;
+                 indicators.feature_columns() with HTF features)
+
+    Returns:
+        numpy array of shape (1, n_features), or None while warming up
+    """
+    if values is None:
+        return None
+    row = np.array([values[col] for col in (columns or FEATURE_COLUMNS)], dtype=np.float64)
+    if np.isnan(row).any():
+        return None
+    return row.reshape(1, -1)
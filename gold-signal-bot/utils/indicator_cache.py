@@ -0,0 +1,254 @@
+"""
+Indicator Cache Module
+Content-addressed cache of add_all_indicators results: the key is a hash of
+the input bars plus the indicator parameter tuple, so repeated train/backtest
+jobs on the same data skip indicator computation. Frames for a bar CSV's full
+history are keyed by the file itself, so a training run and a later backtest
+window on that file share one entry (backtests only read it; a cold backtest
+computes its own window).
+"""
+
+import os
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+import pandas as pd
+import config
+from utils.indicators import add_all_indicators, indicator_params
+from utils.mt5_fetch import load_csv_data
+
+
+def data_fingerprint(df):
+    """
+    Hash the contents of a price frame (index, columns, dtypes and values)
+
+    Args:
+        df: pandas DataFrame of bars
+
+    Returns:
+        str: Hex digest identifying the frame's contents
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class IndicatorCache:
+    """Thread-safe LRU of indicator frames with an optional on-disk tier"""
+
+    def __init__(self, max_bytes=None, disk_dir=None, max_disk_files=32):
+        """
+        Initialize cache
+
+        Args:
+            max_bytes: Memory budget for cached frames
+            disk_dir: Directory for the on-disk tier (None disables it)
+            max_disk_files: Maximum number of frames kept on disk
+        """
+        if max_bytes is None:
+            max_bytes = int(getattr(config, 'INDICATOR_CACHE_MAX_MB', 256) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_files = max_disk_files
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (frame, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_file_key(csv_path, params=None):
+        """Cache key for a bar CSV's full history (path, size and mtime) and indicator parameters"""
+        if params is None:
+            params = indicator_params()
+        real = os.path.realpath(csv_path)
+        st = os.stat(real)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{real}|{st.st_size}|{st.st_mtime_ns}".encode('utf-8'))
+        h.update(repr(params).encode('utf-8'))
+        return h.hexdigest()
+
+    @staticmethod
+    def make_key(df, params=None):
+        """Cache key for a price frame and indicator parameters"""
+        if params is None:
+            params = indicator_params()
+        h = hashlib.blake2b(digest_size=16)
+        h.update(data_fingerprint(df).encode('utf-8'))
+        h.update(repr(params).encode('utf-8'))
+        return h.hexdigest()
+
+    def get(self, key):
+        """Return a copy of the cached frame for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy()
+
+        frame = self._read_disk(key)
+        with self._lock:
+            if frame is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._store_memory(key, frame)
+        return frame.copy()
+
+    def put(self, key, frame):
+        """Store a computed indicator frame in memory (and on disk if enabled)"""
+        frame = frame.copy()
+        self._store_memory(key, frame)
+        self._write_disk(key, frame)
+
+    def clear(self):
+        """Drop all in-memory entries"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store_memory(self, key, frame):
+        nbytes = int(frame.memory_usage(index=True, deep=False).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (frame, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            frame = pd.read_pickle(path)
+            os.utime(path)  # Track recency for disk eviction
+            return frame
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable indicator cache file {path}: {e}")
+            return None
+
+    def _write_disk(self, key, frame):
+        if not self.disk_dir:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self._disk_path(key)
+            tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+            frame.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not write indicator cache file: {e}")
+            return
+
+        files = sorted(glob.glob(os.path.join(self.disk_dir, '*.pkl')), key=os.path.getmtime)
+        for old in files[:max(0, len(files) - self.max_disk_files)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+def _default_disk_dir():
+    if not getattr(config, 'INDICATOR_CACHE_DISK', False):
+        return None
+    return getattr(config, 'INDICATOR_CACHE_DIR', os.path.join(config.DATA_DIR, 'cache', 'indicators'))
+
+
+# Process-wide cache shared by training, backtests and the API
+indicator_cache = IndicatorCache(disk_dir=_default_disk_dir())
+
+
+def cached_indicators(df, settings=None):
+    """
+    add_all_indicators with result caching
+
+    Args:
+        df: pandas DataFrame with OHLCV data
+        settings: Optional Settings with the indicator periods (default: current config)
+
+    Returns:
+        pandas DataFrame with indicator columns (a private copy for the caller)
+    """
+    key = IndicatorCache.make_key(df, indicator_params(settings=settings))
+    frame = indicator_cache.get(key)
+    if frame is not None:
+        print("⚡ Using cached indicators")
+        return frame
+
+    frame = add_all_indicators(df, settings=settings)
+    indicator_cache.put(key, frame)
+    return frame
+
+
+def find_csv_indicators(csv_path, settings=None, start=None):
+    """
+    Cached full-history indicators of a bar CSV, if already computed
+
+    Args:
+        csv_path: Bars CSV
+        settings: Optional Settings with the indicator periods (default: current config)
+        start: Optional first timestamp of the returned rows
+
+    Returns:
+        pandas DataFrame with indicator columns (a private copy), or None on a miss
+    """
+    if not os.path.exists(csv_path):
+        return None
+    frame = indicator_cache.get(IndicatorCache.make_file_key(csv_path, indicator_params(settings=settings)))
+    if frame is None:
+        return None
+    print("⚡ Using cached indicators")
+    if start is not None:
+        frame = frame[frame.index >= start]
+    return frame
+
+
+def cached_csv_indicators(csv_path, settings=None, start=None, bars=None):
+    """
+    Indicators over a bar CSV's full history, optionally from a start time on
+
+    Training and backtests on the same file read the same entry, so a
+    backtest after training (or another backtest window) computes nothing.
+    Every window is cut from the full-history frame, so its indicator values
+    are the ones the model was trained on.
+
+    Args:
+        csv_path: Bars CSV
+        settings: Optional Settings with the indicator periods (default: current config)
+        start: Optional first timestamp of the returned rows
+        bars: The CSV's full history if the caller already loaded it (read
+              from csv_path otherwise)
+
+    Returns:
+        pandas DataFrame with indicator columns (a private copy), or None if
+        the CSV can't be loaded
+    """
+    if not os.path.exists(csv_path):
+        print(f"❌ CSV file not found: {csv_path}")
+        return None
+    frame = find_csv_indicators(csv_path, settings=settings)
+    if frame is None:
+        if bars is None:
+            bars = load_csv_data(csv_path)
+            if bars is None:
+                return None
+        frame = add_all_indicators(bars, settings=settings)
+        indicator_cache.put(IndicatorCache.make_file_key(csv_path, indicator_params(settings=settings)), frame)
+
+    if start is not None:
+        frame = frame[frame.index >= start]
+    return frame
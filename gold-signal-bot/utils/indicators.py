@@ -5,7 +5,25 @@ Computes RSI, MACD, Bollinger Bands, and other features for ML model
 
 import pandas as pd
 import numpy as np
-import config
+from utils.settings import resolve_settings
+from utils.resample import TIMEFRAME_MINUTES, infer_timeframe, normalize_timeframe, resample_ohlcv
+
+
+# Model input columns, in the order the trained models expect them
+FEATURE_COLUMNS = [
+    'RSI',
+    'MACD',
+    'MACD_Signal',
+    'MACD_Hist',
+    'BB_%B',
+    'ATR',
+    'EMA_Fast',
+    'EMA_Slow',
+    'EMA_Slope',
+    'EMA_Ratio',
+    'Price_Return',
+    'Return_3'
+]
 
 
 def calculate_rsi(data, period=14):
@@ -97,15 +115,108 @@ def calculate_slope(series, period=3):
     return series.diff(periods=period) / period
 
 
-def add_all_indicators(df):
+def indicator_params(overrides=None, settings=None):
     """
-    Add all technical indicators to dataframe
+    Indicator settings as a hashable tuple (cache key component)
     
     Args:
-        df: pandas DataFrame with OHLCV data (must have 'Close' column)
+        overrides: Optional dict using the API's lowercase keys (e.g. 'rsi_period');
+                   missing keys fall back to the settings values
+        settings: Optional Settings (default: current config)
     
     Returns:
-        pandas DataFrame with added indicator columns
+        tuple of (name, value) pairs
+    """
+    overrides = overrides or {}
+    settings = resolve_settings(settings)
+    defaults = (
+        ('rsi_period', getattr(settings, 'RSI_PERIOD', 14)),
+        ('macd_fast', getattr(settings, 'MACD_FAST', 12)),
+        ('macd_slow', getattr(settings, 'MACD_SLOW', 26)),
+        ('macd_signal', getattr(settings, 'MACD_SIGNAL', 9)),
+        ('bb_period', getattr(settings, 'BB_PERIOD', 20)),
+        ('bb_std_dev', getattr(settings, 'BB_STD_DEV', 2)),
+        ('atr_period', getattr(settings, 'ATR_PERIOD', 14)),
+        ('ema_fast', getattr(settings, 'EMA_FAST', 50)),
+        ('ema_slow', getattr(settings, 'EMA_SLOW', 200))
+    )
+    params = tuple((name, overrides.get(name, value)) for name, value in defaults)
+    htf_features = htf_feature_specs(settings)
+    if htf_features:
+        params += (('htf_features', htf_features),)
+    return params
+
+
+def htf_feature_specs(settings=None):
+    """
+    Configured higher-timeframe features as (timeframe, indicator column) pairs
+    
+    Args:
+        settings: Optional Settings (default: current config)
+    
+    Returns:
+        tuple of (canonical timeframe, column) pairs, e.g. (('D1', 'RSI'),)
+    """
+    settings = resolve_settings(settings)
+    specs = getattr(settings, 'HTF_FEATURES', None) or ()
+    return tuple((normalize_timeframe(timeframe), column) for timeframe, column in specs)
+
+
+def feature_columns(settings=None):
+    """
+    Model input columns: FEATURE_COLUMNS followed by the higher-timeframe ones ('D1_RSI', ...)
+    
+    Args:
+        settings: Optional Settings (default: current config)
+    
+    Returns:
+        list of column names
+    """
+    return FEATURE_COLUMNS + [f"{timeframe}_{column}" for timeframe, column in htf_feature_specs(settings)]
+
+
+def indicator_warmup_bars(settings=None, base_timeframe=None):
+    """
+    Number of bars needed before the first bar with settled indicator values
+    
+    Args:
+        settings: Optional Settings (default: current config)
+        base_timeframe: Timeframe of the bars being loaded (e.g. infer_timeframe
+                        of their index); required when HTF_FEATURES is set
+    
+    Returns:
+        int: Warm-up bars of the base timeframe
+    """
+    settings = resolve_settings(settings)
+    warmup = max(
+        getattr(settings, 'RSI_PERIOD', 14) + 1,
+        getattr(settings, 'MACD_SLOW', 26) + getattr(settings, 'MACD_SIGNAL', 9),
+        getattr(settings, 'BB_PERIOD', 20),
+        getattr(settings, 'ATR_PERIOD', 14) + 1,
+        getattr(settings, 'EMA_SLOW', 200),
+        4  # Return_3 and EMA_Slope
+    )
+    htf_features = htf_feature_specs(settings)
+    if not htf_features:
+        return warmup
+
+    # Higher-timeframe indicators need the same number of their own bars
+    if base_timeframe is None:
+        raise ValueError("base_timeframe is required to size the warm-up of HTF_FEATURES")
+    base_minutes = TIMEFRAME_MINUTES[normalize_timeframe(base_timeframe)]
+    ratio = max(-(-TIMEFRAME_MINUTES[timeframe] // base_minutes) for timeframe, _ in htf_features)
+    return (warmup + 1) * ratio
+
+
+def normalize_price_frame(df):
+    """
+    Copy a price frame with flattened, canonical OHLCV column names
+    
+    Args:
+        df: pandas DataFrame with OHLCV data (any casing, possibly MultiIndex columns)
+    
+    Returns:
+        pandas DataFrame with canonical 'Open', 'High', 'Low', 'Close', 'Volume' names
     """
     df = df.copy()
 
@@ -168,33 +279,63 @@ def add_all_indicators(df):
 
     df = _normalize_ohlc_columns(df)
 
+    return df
+
+
+def add_all_indicators(df, settings=None):
+    """
+    Add all technical indicators to dataframe
+    
+    Higher-timeframe features configured in HTF_FEATURES are added as
+    '<timeframe>_<column>' columns (see add_htf_features).
+    
+    Args:
+        df: pandas DataFrame with OHLCV data (must have 'Close' column)
+        settings: Optional Settings with the indicator periods (default: current config)
+    
+    Returns:
+        pandas DataFrame with added indicator columns
+    """
+    df = _add_timeframe_indicators(normalize_price_frame(df), settings)
+    htf_features = htf_feature_specs(settings)
+    if htf_features:
+        df = add_htf_features(df, htf_features, settings)
+    
+    # Drop NaN values
+    df = df.dropna()
+    
+    return df
+
+
+def _add_timeframe_indicators(df, settings=None):
+    """Indicator and Target columns of one timeframe, in place and without dropping warm-up rows"""
+    p = dict(indicator_params(settings=settings))
+
     missing = [c for c in ['Close', 'High', 'Low'] if c not in df.columns]
     if missing:
         raise ValueError(f"Missing required price columns: {missing}")
     
     # RSI
-    df['RSI'] = calculate_rsi(df['Close'], period=config.RSI_PERIOD if hasattr(config, 'RSI_PERIOD') else 14)
+    df['RSI'] = calculate_rsi(df['Close'], period=p['rsi_period'])
 
     # MACD
     df['MACD'], df['MACD_Signal'], df['MACD_Hist'] = calculate_macd(
-        df['Close'], fast=config.MACD_FAST if hasattr(config, 'MACD_FAST') else 12,
-        slow=config.MACD_SLOW if hasattr(config, 'MACD_SLOW') else 26,
-        signal=config.MACD_SIGNAL if hasattr(config, 'MACD_SIGNAL') else 9)
+        df['Close'], fast=p['macd_fast'], slow=p['macd_slow'], signal=p['macd_signal'])
 
     # Bollinger Bands
-    bb_period = config.BB_PERIOD if hasattr(config, 'BB_PERIOD') else 20
-    bb_std = config.BB_STD_DEV if hasattr(config, 'BB_STD_DEV') else 2
+    bb_period = p['bb_period']
+    bb_std = p['bb_std_dev']
     df['BB_Upper'], df['BB_Middle'], df['BB_Lower'] = calculate_bollinger_bands(df['Close'], period=bb_period, std_dev=bb_std)
     bb_width = df['BB_Upper'] - df['BB_Lower']
     df['BB_%B'] = (df['Close'] - df['BB_Lower']) / bb_width.replace(0, np.nan)
 
     # ATR
-    atr_period = config.ATR_PERIOD if hasattr(config, 'ATR_PERIOD') else 14
+    atr_period = p['atr_period']
     df['ATR'] = calculate_atr(df, period=atr_period)
 
     # EMAs and slope
-    ema_fast = calculate_ema(df['Close'], period=getattr(config, 'EMA_FAST', 50))
-    ema_slow = calculate_ema(df['Close'], period=getattr(config, 'EMA_SLOW', 200))
+    ema_fast = calculate_ema(df['Close'], period=p['ema_fast'])
+    ema_slow = calculate_ema(df['Close'], period=p['ema_slow'])
     df['EMA_Fast'] = ema_fast
     df['EMA_Slow'] = ema_slow
     df['EMA_Slope'] = calculate_slope(ema_fast, period=3)
@@ -207,38 +348,221 @@ def add_all_indicators(df):
     # Target: 1 if next bar is higher, 0 otherwise
     df['Target'] = (df['Close'].shift(-1) > df['Close']).astype(int)
     
-    # Drop NaN values
-    df = df.dropna()
+    return df
+
+
+def align_asof(source_times, target_times, values):
+    """
+    Forward-only as-of alignment of one series onto another's timestamps
+    
+    Each target row takes the last source row whose time is at or before the
+    target time, found with one searchsorted over the sorted source times
+    instead of a per-call merge_asof/join.
+    
+    Args:
+        source_times: Sorted datetime64 array of the times the source values become known
+        target_times: datetime64 array of the times the values are needed
+        values: numpy array with one row per source time
+    
+    Returns:
+        float numpy array with one row per target time (NaN before the first source row)
+    """
+    pos = np.searchsorted(source_times, target_times, side='right') - 1
+    aligned = np.asarray(values, dtype=np.float64).take(np.maximum(pos, 0), axis=0)
+    aligned[pos < 0] = np.nan
+    return aligned
+
+
+def add_htf_features(df, htf_features, settings=None):
+    """
+    Add indicators of higher timeframes to a frame of base bars
+    
+    The base bars are resampled into each higher timeframe and the indicators
+    computed there. A higher-timeframe bar is only known once it has closed,
+    so every value is keyed by the bar's close time (bin start + bar length)
+    and a base bar receives the last one that closed no later than the base
+    bar itself: an H4 bar closing at 16:00 sees the previous day's D1 RSI,
+    and the 20:00-24:00 bar the D1 RSI of its own day. No value from a
+    still-forming higher-timeframe bar leaks into earlier base bars.
+    
+    Args:
+        df: pandas DataFrame of base bars with OHLC columns, indexed by bar open time
+        htf_features: (timeframe, indicator column) pairs, e.g. [('D1', 'RSI')]
+        settings: Optional Settings with the indicator periods (default: current config)
+    
+    Returns:
+        pandas DataFrame with added '<timeframe>_<column>' columns
+    
+    Raises:
+        ValueError: If a timeframe is not above the base bars' timeframe
+    """
+    by_timeframe = {}
+    for timeframe, column in htf_features:
+        by_timeframe.setdefault(normalize_timeframe(timeframe), []).append(column)
+    
+    if len(df) < 2:
+        for timeframe, columns in by_timeframe.items():
+            for column in columns:
+                df[f"{timeframe}_{column}"] = np.nan
+        return df
+    
+    base_timeframe = infer_timeframe(df.index)
+    base_minutes = TIMEFRAME_MINUTES[base_timeframe]
+    base_close = df.index.values.astype('datetime64[ns]') + np.timedelta64(base_minutes, 'm')
+    
+    for timeframe, columns in by_timeframe.items():
+        minutes = TIMEFRAME_MINUTES[timeframe]
+        if minutes <= base_minutes:
+            raise ValueError(f"{timeframe} is not a higher timeframe than the {base_timeframe} bars")
+        htf = _add_timeframe_indicators(resample_ohlcv(df, timeframe), settings)
+        htf_close = htf.index.values.astype('datetime64[ns]') + np.timedelta64(minutes, 'm')
+        aligned = align_asof(htf_close, base_close, htf[columns].to_numpy(dtype=np.float64))
+        for column, values in zip(columns, aligned.T):
+            df[f"{timeframe}_{column}"] = values
     
     return df
 
 
-def prepare_features(df):
+def prepare_features(df, settings=None):
     """
     Prepare feature matrix (X) and target vector (y) for ML model
     
     Args:
         df: pandas DataFrame with indicators
+        settings: Optional Settings selecting the higher-timeframe features (default: current config)
     
     Returns:
         tuple: (X, y) - features and target
     """
-    feature_columns = [
-        'RSI',
-        'MACD',
-        'MACD_Signal',
-        'MACD_Hist',
-        'BB_%B',
-        'ATR',
-        'EMA_Fast',
-        'EMA_Slow',
-        'EMA_Slope',
-        'EMA_Ratio',
-        'Price_Return',
-        'Return_3'
-    ]
-    
-    X = df[feature_columns].values
+    X = df[feature_columns(settings)].values
     y = df['Target'].values
     
     return X, y
+
+
+def batch_feature_matrices(df, param_sets, settings=None):
+    """
+    Build feature matrices for many indicator parameter sets in one pass
+    
+    Price diffs, gains/losses, true range, returns and the target are computed
+    once; rolling window sums and EMAs are memoized per period and shared by
+    every parameter set that uses the same period. Higher-timeframe features
+    (HTF_FEATURES) are computed per parameter set, on the resampled bars.
+    
+    Args:
+        df: pandas DataFrame with OHLCV data
+        param_sets: list of dicts with indicator keys ('rsi_period', 'macd_fast',
+                    'macd_slow', 'macd_signal', 'bb_period', 'bb_std_dev',
+                    'atr_period', 'ema_fast', 'ema_slow'); missing keys use settings
+        settings: Optional Settings supplying the defaults and the
+                  higher-timeframe features (default: current config)
+    
+    Returns:
+        dict: indicator_params tuple -> (X, y), each equal to
+        prepare_features(add_all_indicators(df)) under those settings
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+    
+    frame = normalize_price_frame(df)
+    missing = [c for c in ['Close', 'High', 'Low'] if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing required price columns: {missing}")
+    
+    close = frame['Close'].to_numpy(dtype=np.float64)
+    high = frame['High'].to_numpy(dtype=np.float64)
+    low = frame['Low'].to_numpy(dtype=np.float64)
+    n = len(close)
+    
+    # Shared intermediates
+    prev_close = np.empty(n)
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+    delta = close - prev_close
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+    true_range = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    price_return = (close / prev_close - 1) * 100
+    return_3 = np.full(n, np.nan)
+    return_3[3:] = (close[3:] / close[:-3] - 1) * 100
+    target = np.zeros(n, dtype=int)
+    target[:-1] = close[1:] > close[:-1]
+    base_valid = frame.notna().all(axis=1).to_numpy()
+    
+    settings = resolve_settings(settings)
+    htf_features = htf_feature_specs(settings)
+    htf_columns = feature_columns(settings)[len(FEATURE_COLUMNS):]
+    
+    rolling_memo = {}
+    ema_memo = {}
+    
+    def rolling_mean(name, values, period):
+        key = (name, period)
+        if key not in rolling_memo:
+            out = np.full(n, np.nan)
+            if n >= period:
+                out[period - 1:] = sliding_window_view(values, period).sum(axis=1) / period
+            rolling_memo[key] = out
+        return rolling_memo[key]
+    
+    def rolling_std(values, period):
+        key = ('close_std', period)
+        if key not in rolling_memo:
+            out = np.full(n, np.nan)
+            if n >= period:
+                out[period - 1:] = sliding_window_view(values, period).std(axis=1, ddof=1)
+            rolling_memo[key] = out
+        return rolling_memo[key]
+    
+    def ema(key, values, span):
+        if key not in ema_memo:
+            ema_memo[key] = pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+        return ema_memo[key]
+    
+    results = {}
+    for overrides in param_sets:
+        params = indicator_params(overrides, settings=settings)
+        if params in results:
+            continue
+        p = dict(params)
+        
+        # RSI
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = rolling_mean('gain', gains, p['rsi_period']) / rolling_mean('loss', losses, p['rsi_period'])
+            rsi = 100 - (100 / (1 + rs))
+        
+        # MACD
+        macd = ema(('close', p['macd_fast']), close, p['macd_fast']) - ema(('close', p['macd_slow']), close, p['macd_slow'])
+        macd_signal = ema(('macd', p['macd_fast'], p['macd_slow'], p['macd_signal']), macd, p['macd_signal'])
+        
+        # Bollinger %B
+        middle = rolling_mean('close', close, p['bb_period'])
+        std = rolling_std(close, p['bb_period'])
+        upper = middle + std * p['bb_std_dev']
+        lower = middle - std * p['bb_std_dev']
+        width = upper - lower
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bb_b = np.where(width == 0, np.nan, (close - lower) / width)
+        
+        # ATR
+        atr = rolling_mean('true_range', true_range, p['atr_period'])
+        
+        # EMAs and slope
+        ema_fast = ema(('close', p['ema_fast']), close, p['ema_fast'])
+        ema_slow = ema(('close', p['ema_slow']), close, p['ema_slow'])
+        ema_slope = np.full(n, np.nan)
+        ema_slope[3:] = (ema_fast[3:] - ema_fast[:-3]) / 3
+        
+        X = np.column_stack([
+            rsi, macd, macd_signal, macd - macd_signal, bb_b, atr,
+            ema_fast, ema_slow, ema_slope, ema_fast / ema_slow,
+            price_return, return_3
+        ])
+        if htf_features:
+            # Same periods as the base indicators, as add_all_indicators would use
+            set_settings = settings.replace(**{name.upper(): value for name, value in params if name != 'htf_features'})
+            htf_frame = add_htf_features(frame.copy(), htf_features, set_settings)
+            X = np.column_stack([X, htf_frame[htf_columns].to_numpy(dtype=np.float64)])
+        valid = base_valid & ~np.isnan(X).any(axis=1)
+        results[params] = (X[valid], target[valid])
+    
+    return results
@@ -1,15 +1,21 @@
 """
 Model Loader/Saver Module
 Handles saving and loading of trained ML models
+
+Models are written uncompressed by default so joblib can memory-map their
+NumPy arrays on load (MODEL_MMAP_MODE); files are replaced atomically, so a
+process still mapping the previous version keeps reading valid data.
 """
 
 import joblib
 import os
 from datetime import datetime
 import config
+from utils.model_registry import model_cache
+from utils.tree_inference import compile_model
 
 
-def save_model(model, model_dir=config.MODEL_DIR, model_name='gold_signal_model.pkl'):
+def save_model(model, model_dir=config.MODEL_DIR, model_name='gold_signal_model.pkl', compress=None):
     """
     Save trained model to disk
     
@@ -17,25 +23,44 @@ def save_model(model, model_dir=config.MODEL_DIR, model_name='gold_signal_model.
         model: Trained scikit-learn model
         model_dir: Directory to save model (default 'models')
         model_name: Name of model file (default 'gold_signal_model.pkl')
+        compress: joblib compression level (default config.MODEL_COMPRESS;
+                  0 keeps the arrays memory-mappable)
     
     Returns:
         str: Path to saved model
     """
+    if compress is None:
+        compress = getattr(config, 'MODEL_COMPRESS', 0)
     os.makedirs(model_dir, exist_ok=True)
     model_path = os.path.join(model_dir, model_name)
     
-    joblib.dump(model, model_path)
+    # Write then rename: overwriting in place would corrupt memory-mapped readers
+    tmp_path = f"{model_path}.tmp{os.getpid()}"
+    try:
+        joblib.dump(model, tmp_path, compress=compress)
+        os.replace(tmp_path, model_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    model_cache.invalidate(model_path)
     print(f"✅ Model saved to: {model_path}")
     
     return model_path
 
 
-def load_model(model_path=config.MODEL_PATH):
+def load_model(model_path=config.MODEL_PATH, use_cache=True, mmap_mode=None, backend=None):
     """
     Load trained model from disk
     
     Args:
         model_path: Path to saved model file
+        use_cache: Share one loaded instance per artifact through the
+                   process-wide model cache (treat the model as read-only)
+        mmap_mode: joblib mmap mode for the model's arrays, e.g. 'r'
+                   (default config.MODEL_MMAP_MODE; ignored for compressed files)
+        backend: 'native' (the library's own predict_proba) or 'compiled'
+                 (flat-array NumPy inference, utils.tree_inference)
+                 (default config.INFERENCE_BACKEND)
     
     Returns:
         Loaded scikit-learn model or None if not found
@@ -45,13 +70,31 @@ def load_model(model_path=config.MODEL_PATH):
         print("Please train the model first by running train_model.py")
         return None
     
+    if mmap_mode is None:
+        mmap_mode = getattr(config, 'MODEL_MMAP_MODE', None)
+    if backend is None:
+        backend = getattr(config, 'INFERENCE_BACKEND', 'native')
+    
     try:
-        model = joblib.load(model_path)
-        print(f"✅ Model loaded from: {model_path}")
-        return model
+        if use_cache:
+            model, hit = model_cache.get(model_path, mmap_mode=mmap_mode)
+            if hit:
+                print(f"⚡ Using cached model: {model_path}")
+            else:
+                print(f"✅ Model loaded from: {model_path}")
+        else:
+            model = joblib.load(model_path, mmap_mode=mmap_mode)
+            print(f"✅ Model loaded from: {model_path}")
     except Exception as e:
         print(f"❌ Error loading model: {e}")
         return None
+    
+    if backend == 'compiled':
+        try:
+            model = compile_model(model)
+        except ValueError as e:
+            print(f"⚠️ Using native inference: {e}")
+    return model
 
 
 def save_training_metadata(metadata, model_dir=config.MODEL_DIR):
@@ -0,0 +1,216 @@
+"""
+Model Registry Module
+Versioned record of trained model artifacts (content hash, training params,
+metrics) and a process-wide, memory-bounded LRU cache of loaded models, so
+repeated backtests and live strategies share one instance per artifact
+instead of unpickling it every time
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import joblib
+import config
+
+
+def artifact_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a model file's contents"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _file_key(path):
+    """(real path, mtime, size): changes whenever the artifact is rewritten"""
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    return real, st.st_mtime_ns, st.st_size
+
+
+class ModelRegistry:
+    """
+    JSON index of model versions
+
+    Each version is keyed by the artifact's content hash and records the
+    file it was saved to, the model type, training parameters and metrics.
+    """
+
+    def __init__(self, index_path=None):
+        """
+        Initialize registry
+
+        Args:
+            index_path: JSON index file (default config.MODEL_REGISTRY_PATH)
+        """
+        self.index_path = index_path or getattr(config, 'MODEL_REGISTRY_PATH',
+                                                os.path.join(config.MODEL_DIR, 'registry.json'))
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not os.path.exists(self.index_path):
+            return []
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable model registry {self.index_path}: {e}")
+            return []
+
+    def _write(self, versions):
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(versions, f, indent=2, default=str)
+        os.replace(tmp_path, self.index_path)
+
+    def register(self, model_path, model_type, params=None, metrics=None):
+        """
+        Record a saved artifact as a new version
+
+        Args:
+            model_path: Saved model file
+            model_type: 'rf', 'xgboost', 'lightgbm', ...
+            params: Training parameters
+            metrics: Evaluation metrics
+
+        Returns:
+            dict: The version entry (re-registering identical contents returns the existing one)
+        """
+        digest = artifact_hash(model_path)
+        entry = {
+            'version': digest[:12],
+            'sha256': digest,
+            'path': os.path.realpath(model_path),
+            'model_type': model_type,
+            'size': os.path.getsize(model_path),
+            'params': params or {},
+            'metrics': metrics or {},
+            'created_at': datetime.now().isoformat()
+        }
+        with self._lock:
+            versions = self._read()
+            for existing in versions:
+                if existing['sha256'] == digest and existing['path'] == entry['path']:
+                    return existing
+            versions.append(entry)
+            keep = getattr(config, 'MODEL_REGISTRY_KEEP', 100)
+            self._write(versions[-keep:])
+        print(f"📚 Registered {model_type} model version {entry['version']}")
+        return entry
+
+    def versions(self, model_path=None):
+        """All versions, oldest first (only those saved to model_path when given)"""
+        versions = self._read()
+        if model_path is not None:
+            real = os.path.realpath(model_path)
+            versions = [v for v in versions if v['path'] == real]
+        return versions
+
+    def current(self, model_path):
+        """Version entry matching the artifact currently at model_path, or None"""
+        if not os.path.exists(model_path):
+            return None
+        digest = artifact_hash(model_path)
+        for version in reversed(self.versions(model_path)):
+            if version['sha256'] == digest:
+                return version
+        return None
+
+
+class ModelCache:
+    """Thread-safe LRU of loaded models, bounded by total artifact size"""
+
+    def __init__(self, max_bytes=None):
+        """
+        Initialize cache
+
+        Args:
+            max_bytes: Budget for cached models, measured by artifact size
+                       (default config.MODEL_CACHE_MAX_MB)
+        """
+        if max_bytes is None:
+            max_bytes = int(getattr(config, 'MODEL_CACHE_MAX_MB', 512) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # file key -> (model, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading = {}             # file key -> Lock, so one thread unpickles each artifact
+
+    def get(self, model_path, mmap_mode=None):
+        """
+        Loaded model for a file, unpickling it only on a miss
+
+        The instance is shared: callers must treat it as read-only.
+
+        Args:
+            model_path: Saved model file
+            mmap_mode: joblib mmap mode used on a miss (e.g. 'r')
+
+        Returns:
+            (model, hit): hit is True when the model came from the cache
+        """
+        key = _file_key(model_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], True
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0], True
+                self.misses += 1
+            try:
+                model = joblib.load(key[0], mmap_mode=mmap_mode)
+                self._store(key, model)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return model, False
+
+    def invalidate(self, model_path):
+        """Drop every cached version of a file"""
+        real = os.path.realpath(model_path)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == real]:
+                _, nbytes = self._entries.pop(key)
+                self._bytes -= nbytes
+
+    def clear(self):
+        """Drop all cached models"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key, model):
+        nbytes = key[2]
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            # Older versions of the same file can't be requested again
+            for old in [k for k in self._entries if k[0] == key[0]]:
+                self._bytes -= self._entries.pop(old)[1]
+            self._entries[key] = (model, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+
+
+# Process-wide registry and cache shared by training, backtests, the bot and the API
+model_registry = ModelRegistry()
+model_cache = ModelCache()
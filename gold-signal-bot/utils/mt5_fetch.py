@@ -5,6 +5,8 @@ MT5 Data Fetcher - Export historical data from MetaTrader 5
 import pandas as pd
 from datetime import datetime, timedelta
 import os
+import config
+from utils.bar_cache import read_cache, write_cache, window_offset
 
 # Try to import MetaTrader5 (optional for CSV-only mode)
 try:
@@ -155,13 +157,33 @@ def fetch_live_data(symbol="XAUUSD", timeframe="H4", bars=500):
     return df
 
 
-def load_csv_data(csv_path, days=None):
+def _parse_csv(csv_path):
+    """Parse an MT5 export (or a standard CSV with headers) into a DataFrame"""
+    # Try to detect MT5 format (tab-separated, no headers)
+    try:
+        # First try: MT5 export format (tab-separated, no column names)
+        df = pd.read_csv(csv_path, sep='\t', header=None, names=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
+        df['Date'] = pd.to_datetime(df['Date'])
+        df.set_index('Date', inplace=True)
+    except Exception as e:
+        # Fallback: standard CSV with headers
+        try:
+            df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+        except Exception as e2:
+            print(f"❌ Failed to parse CSV: {e2}")
+            return None
+    return df
+
+
+def load_csv_data(csv_path, days=None, start=None, warmup_bars=0):
     """
     Load historical data from CSV file
     
     Args:
         csv_path: Path to CSV file
         days: Optional number of recent days to load
+        start: Optional first timestamp to load (overrides days)
+        warmup_bars: Extra bars to load before the window for indicator warm-up
     
     Returns:
         DataFrame with OHLCV data
@@ -172,28 +194,30 @@ def load_csv_data(csv_path, days=None):
     
     print(f"\n📊 Loading data from CSV: {csv_path}")
     
-    # Try to detect MT5 format (tab-separated, no headers)
-    try:
-        # First try: MT5 export format (tab-separated, no column names)
-        df = pd.read_csv(csv_path, sep='\t', header=None, names=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'])
-        df['Date'] = pd.to_datetime(df['Date'])
-        df.set_index('Date', inplace=True)
-    except Exception as e:
-        # Fallback: standard CSV with headers
-        try:
-            df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
-        except Exception as e2:
-            print(f"❌ Failed to parse CSV: {e2}")
+    if start is None and days is not None:
+        start = datetime.now() - timedelta(days=days)
+    
+    use_cache = getattr(config, 'USE_CSV_CACHE', True)
+    df = read_cache(csv_path, start=start, warmup_bars=warmup_bars) if use_cache else None
+    if df is not None:
+        print("⚡ Using binary bar cache")
+    else:
+        df = _parse_csv(csv_path)
+        if df is None:
             return None
+        if use_cache and not df.empty:
+            write_cache(csv_path, df)
+        
+        if start is not None and not df.empty:
+            if df.index.is_monotonic_increasing:
+                df = df.iloc[window_offset(df.index.values, start, warmup_bars):]
+            else:
+                df = df[df.index >= start]
     
     if df.empty:
         print("❌ CSV loaded but contains no data")
         return None
     
-    if days is not None:
-        cutoff = datetime.now() - timedelta(days=days)
-        df = df[df.index >= cutoff]
-    
     print(f"✅ Loaded {len(df)} candles")
     print(f"   Date range: {df.index[0]} to {df.index[-1]}")
     
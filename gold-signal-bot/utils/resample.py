@@ -0,0 +1,235 @@
+"""
+Resample Module
+Derives higher-timeframe OHLCV bars (H1, H4, D1, ...) from a single
+finest-granularity export: the base bars are loaded once and every other
+timeframe is aggregated from them on demand and cached, so multi-timeframe
+work needs one export and one parse
+"""
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+import config
+from utils.mt5_fetch import load_csv_data
+
+
+# Bar length in minutes, by MT5 timeframe name
+TIMEFRAME_MINUTES = {
+    'M1': 1, 'M5': 5, 'M15': 15, 'M30': 30,
+    'H1': 60, 'H4': 240, 'D1': 1440
+}
+
+# Other spellings used for the same timeframes across the project (and yfinance intervals)
+TIMEFRAME_ALIASES = {'1D': 'D1', 'D': 'D1', '1H': 'H1', '4H': 'H4',
+                     '1M': 'M1', '5M': 'M5', '15M': 'M15', '30M': 'M30', '60M': 'H1'}
+
+
+def normalize_timeframe(timeframe):
+    """
+    Canonical MT5 timeframe name
+
+    Args:
+        timeframe: 'H4', 'h4', '1D', 'D1', ...
+
+    Returns:
+        str: Key of TIMEFRAME_MINUTES
+
+    Raises:
+        ValueError: For unknown timeframes
+    """
+    name = str(timeframe).upper()
+    name = TIMEFRAME_ALIASES.get(name, name)
+    if name not in TIMEFRAME_MINUTES:
+        raise ValueError(f"Unknown timeframe '{timeframe}'")
+    return name
+
+
+def infer_timeframe(index):
+    """
+    Timeframe of a bar index from its most common bar spacing
+
+    Returns:
+        str: Largest timeframe that does not exceed the typical spacing
+    """
+    if len(index) < 2:
+        raise ValueError("At least two bars are needed to infer the timeframe")
+    spacing = np.diff(pd.DatetimeIndex(index).values.astype('datetime64[m]').astype(np.int64))
+    values, counts = np.unique(spacing[spacing > 0], return_counts=True)
+    minutes = int(values[np.argmax(counts)])
+    fitting = [name for name, length in TIMEFRAME_MINUTES.items() if length <= minutes]
+    if not fitting:
+        raise ValueError(f"Bar spacing of {minutes} minutes is finer than any known timeframe")
+    return max(fitting, key=TIMEFRAME_MINUTES.get)
+
+
+def bin_starts(index, minutes, session_offset_minutes=0):
+    """
+    Start time of the bin each bar falls into
+
+    Bins are 'minutes' long and aligned to the session start: with an offset
+    of 0, D1 bins start at midnight and H4 bins at 00:00, 04:00, ... of the
+    bar timestamps' clock (broker server time for MT5 exports).
+
+    Args:
+        index: DatetimeIndex of bar open times
+        minutes: Bin length
+        session_offset_minutes: Session start after midnight
+
+    Returns:
+        numpy datetime64[ns] array, one bin start per bar
+    """
+    stamps = pd.DatetimeIndex(index).values.astype('datetime64[ns]').astype(np.int64)
+    width = np.int64(minutes) * 60 * 10**9
+    offset = np.int64(session_offset_minutes) * 60 * 10**9
+    return ((stamps - offset) // width * width + offset).astype('datetime64[ns]')
+
+
+def resample_ohlcv(bars, timeframe, session_offset_hours=None):
+    """
+    Aggregate bars into a higher timeframe
+
+    Bars are grouped by bin start; because the bars are sorted, each bin is
+    one contiguous run and every column is reduced with a single reduceat
+    over the run boundaries. Bins without any bars (weekends, holidays) are
+    not produced. The last bin may still be forming if the base data ends
+    mid-bin, like the live bar of an MT5 export.
+
+    Args:
+        bars: DataFrame indexed by bar open time with Open/High/Low/Close
+              (and optionally Volume) columns, sorted by time
+        timeframe: Target timeframe ('H1', 'H4', 'D1', ...)
+        session_offset_hours: Session start after midnight
+                              (default config.RESAMPLE_SESSION_OFFSET_HOURS)
+
+    Returns:
+        DataFrame with the same columns, indexed by bin start ('Date')
+    """
+    if session_offset_hours is None:
+        session_offset_hours = getattr(config, 'RESAMPLE_SESSION_OFFSET_HOURS', 0)
+    if not bars.index.is_monotonic_increasing:
+        bars = bars.sort_index()
+    minutes = TIMEFRAME_MINUTES[normalize_timeframe(timeframe)]
+    starts = bin_starts(bars.index, minutes, int(round(session_offset_hours * 60)))
+    if len(starts) == 0:
+        return bars.iloc[:0].copy()
+
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:] - 1, len(starts) - 1]
+    columns = {
+        'Open': bars['Open'].to_numpy()[first],
+        'High': np.maximum.reduceat(bars['High'].to_numpy(), first),
+        'Low': np.minimum.reduceat(bars['Low'].to_numpy(), first),
+        'Close': bars['Close'].to_numpy()[last]
+    }
+    if 'Volume' in bars:
+        columns['Volume'] = np.add.reduceat(bars['Volume'].to_numpy(), first)
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(starts[first], name='Date'))
+
+
+class BarStore:
+    """
+    One base-timeframe export with resampled views of higher timeframes
+
+    The base CSV is loaded once (through the binary bar cache) and each
+    timeframe is resampled the first time it is requested. Frames are
+    shared between callers: treat them as read-only.
+    """
+
+    def __init__(self, csv_path=None, base_timeframe=None, session_offset_hours=None):
+        """
+        Initialize store
+
+        Args:
+            csv_path: Finest-granularity export (default config.BASE_BARS_CSV_PATH)
+            base_timeframe: Timeframe of the export (default: inferred from the bars)
+            session_offset_hours: Session start after midnight
+                                  (default config.RESAMPLE_SESSION_OFFSET_HOURS)
+        """
+        self.csv_path = csv_path or getattr(config, 'BASE_BARS_CSV_PATH', None)
+        if not self.csv_path:
+            raise ValueError("No base bars CSV configured (BASE_BARS_CSV_PATH)")
+        self._base_timeframe = normalize_timeframe(base_timeframe) if base_timeframe else None
+        if session_offset_hours is None:
+            session_offset_hours = getattr(config, 'RESAMPLE_SESSION_OFFSET_HOURS', 0)
+        self.session_offset_hours = session_offset_hours
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base(self):
+        """Base bars (loaded on first use)"""
+        with self._lock:
+            return self._load_base_locked()
+
+    @property
+    def base_timeframe(self):
+        """Timeframe of the base bars"""
+        with self._lock:
+            self._load_base_locked()
+            return self._base_timeframe
+
+    def _load_base_locked(self):
+        if 'base' not in self._frames:
+            bars = load_csv_data(self.csv_path)
+            if bars is None:
+                raise ValueError(f"Could not load base bars from {self.csv_path}")
+            if self._base_timeframe is None:
+                self._base_timeframe = infer_timeframe(bars.index)
+            self._frames['base'] = bars
+        return self._frames['base']
+
+    def get(self, timeframe):
+        """
+        Bars for a timeframe at or above the base timeframe
+
+        Args:
+            timeframe: 'H1', 'H4', 'D1', ... (aliases such as '1D' accepted)
+
+        Returns:
+            DataFrame of OHLCV bars
+
+        Raises:
+            ValueError: If the timeframe is finer than the base bars
+        """
+        name = normalize_timeframe(timeframe)
+        with self._lock:
+            base = self._load_base_locked()
+            if name in self._frames:
+                return self._frames[name]
+            if TIMEFRAME_MINUTES[name] < TIMEFRAME_MINUTES[self._base_timeframe]:
+                raise ValueError(f"Cannot derive {name} bars from {self._base_timeframe} bars")
+            if name == self._base_timeframe:
+                frame = base
+            else:
+                frame = resample_ohlcv(base, name, self.session_offset_hours)
+                print(f"🔁 Resampled {len(base)} {self._base_timeframe} bars into {len(frame)} {name} bars")
+            self._frames[name] = frame
+            return frame
+
+    def available_timeframes(self):
+        """Timeframes that can be derived from the base bars, finest first"""
+        base_minutes = TIMEFRAME_MINUTES[self.base_timeframe]
+        return [name for name, minutes in TIMEFRAME_MINUTES.items() if minutes >= base_minutes]
+
+
+# Process-wide stores, one per base export
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def bar_store(csv_path=None):
+    """
+    Shared BarStore for a base export (default config.BASE_BARS_CSV_PATH)
+
+    Returns:
+        BarStore
+    """
+    csv_path = csv_path or getattr(config, 'BASE_BARS_CSV_PATH', None)
+    if not csv_path:
+        raise ValueError("No base bars CSV configured (BASE_BARS_CSV_PATH)")
+    key = os.path.abspath(csv_path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = BarStore(csv_path)
+        return _stores[key]
@@ -0,0 +1,69 @@
+"""
+Settings Module
+Immutable per-job snapshot of the config module, so concurrent jobs can use
+different parameters without writing to the shared config globals
+"""
+
+from types import MappingProxyType
+import config
+
+
+class Settings:
+    """
+    Read-only view of config values
+
+    Attribute access mirrors the config module (settings.RSI_PERIOD,
+    getattr(settings, 'USE_ATR_STOPS', False)), so code written against
+    config can take a Settings object instead.
+    """
+
+    __slots__ = ('_values',)
+
+    def __init__(self, values):
+        object.__setattr__(self, '_values', MappingProxyType(dict(values)))
+
+    @classmethod
+    def from_config(cls, **overrides):
+        """
+        Snapshot the current config module
+
+        Args:
+            **overrides: Upper-case config names to replace in the snapshot
+
+        Returns:
+            Settings
+        """
+        values = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+        values.update(overrides)
+        return cls(values)
+
+    def replace(self, **overrides):
+        """Return a copy with some values replaced"""
+        values = dict(self._values)
+        values.update(overrides)
+        return Settings(values)
+
+    def as_dict(self):
+        """Plain dict copy of all values"""
+        return dict(self._values)
+
+    def __getattr__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(f"Settings has no value '{name}'") from None
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Settings are immutable; use replace() to derive new settings")
+
+    def __reduce__(self):
+        # Picklable for process pools
+        return (Settings, (dict(self._values),))
+
+    def __repr__(self):
+        return f"Settings({len(self._values)} values)"
+
+
+def resolve_settings(settings=None):
+    """Return 'settings', or a snapshot of the config module when None"""
+    return settings if settings is not None else Settings.from_config()
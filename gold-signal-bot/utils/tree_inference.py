@@ -0,0 +1,312 @@
+"""
+Tree Inference Module
+Compiles a trained RandomForest, XGBoost or LightGBM classifier into flat
+node arrays (feature, threshold, children, leaf values) and evaluates it with
+NumPy, one tree level at a time for every (row, tree) pair. This skips the
+per-call overhead of the library wrappers, which dominates when predicting a
+single 12-feature bar. Compiled models are plain arrays, so they pickle and
+memory-map like any other saved model.
+"""
+
+import json
+import weakref
+import numpy as np
+
+
+# Rows evaluated together are bounded so the (rows x trees) work arrays stay small
+MAX_CHUNK_ELEMENTS = 1 << 20
+
+
+class CompiledForest:
+    """
+    Flat-array tree ensemble with a scikit-learn style predict/predict_proba
+
+    All trees share one node table. A node's children are stored next to
+    each other (right = left + 1), so a step is left[node] + (x > threshold).
+    Leaves point to themselves with an infinite threshold, so every row can
+    take exactly max_depth steps without checking for leaves.
+    """
+
+    def __init__(self, kind, roots, feature, threshold, left, missing_left, value,
+                 max_depth, classes, n_features, strict=False, input_dtype=np.float64,
+                 base_margin=0.0, scale=1.0):
+        """
+        Initialize compiled model
+
+        Args:
+            kind: 'mean' (average of per-tree class probabilities) or
+                  'sigmoid' (binary logistic over the summed leaf values)
+            roots: Root node index of each tree
+            feature, threshold: Split feature index and threshold per node
+            left: Left child per node (the right child follows it; a leaf's is itself)
+            missing_left: Per node, whether a missing (NaN) value goes left
+            value: Leaf values, shape (n_nodes, n_outputs)
+            max_depth: Deepest tree's depth
+            classes: Class labels, as the source model's classes_
+            n_features: Expected feature count
+            strict: Split test is x < threshold (XGBoost) instead of x <= threshold
+            input_dtype: Precision the source library compares features in
+            base_margin: Margin added before the sigmoid
+            scale: Sigmoid slope
+        """
+        self.kind = kind
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.missing_left = np.ascontiguousarray(missing_left, dtype=bool)
+        self.value = np.ascontiguousarray(np.asarray(value, dtype=np.float64).T)  # (n_outputs, n_nodes)
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        self.strict = bool(strict)
+        self.input_dtype = np.dtype(input_dtype)
+        self.base_margin = float(base_margin)
+        self.scale = float(scale)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """
+        Leaf reached in every tree
+
+        Args:
+            X: 2-D array-like of features
+
+        Returns:
+            numpy int array of node indices, shape (n_rows, n_trees)
+        """
+        X = self._validate(X)
+        has_missing = bool(np.isnan(X).any())
+        chunk = max(1, MAX_CHUNK_ELEMENTS // max(self.n_trees, 1))
+        leaves = np.empty((len(X), self.n_trees), dtype=np.int32)
+        for start in range(0, len(X), chunk):
+            leaves[start:start + chunk] = self._traverse(X[start:start + chunk], has_missing)
+        return leaves
+
+    def _traverse(self, X, has_missing):
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.int32) * n_features)[:, np.newaxis]
+        node = np.repeat(self.roots[np.newaxis, :], n_rows, axis=0)
+        for _ in range(self.max_depth):
+            x = flat.take(row_offset + self.feature.take(node))
+            threshold = self.threshold.take(node)
+            # Right when the split test fails: x > t (x >= t for XGBoost's strict x < t)
+            go_right = x >= threshold if self.strict else x > threshold
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self.missing_left.take(node), go_right)
+            node = self.left.take(node) + go_right
+        return node
+
+    def predict_proba(self, X):
+        """Class probabilities, shape (n_rows, n_classes)"""
+        leaves = self.apply(X)
+        if self.kind == 'mean':
+            return np.column_stack([column.take(leaves).sum(axis=1) for column in self.value]) / self.n_trees
+        margin = self.base_margin + self.value[0].take(leaves).sum(axis=1)
+        prob_up = 1.0 / (1.0 + np.exp(-self.scale * margin))
+        return np.column_stack([1.0 - prob_up, prob_up])
+
+    def predict(self, X):
+        """Most probable class label per row"""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def _validate(self, X):
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"X has {X.shape[1]} features, but the model expects {self.n_features_in_}")
+        # Round to the library's feature precision so split decisions match exactly
+        return X.astype(self.input_dtype, copy=False).astype(np.float64, copy=False)
+
+
+def _renumber(tree):
+    """Breadth-first node order with each node's children stored side by side"""
+    left, right = tree['left'], tree['right']
+    order, depth = [0], [0]
+    new_left = {}
+    for position, node in enumerate(order):  # order grows while iterating
+        if left[node] >= 0:
+            new_left[node] = len(order)
+            order.extend((left[node], right[node]))
+            depth.extend((depth[position] + 1,) * 2)
+    order = np.asarray(order)
+    is_leaf = left[order] < 0
+    return {
+        'feature': np.where(is_leaf, 0, tree['feature'][order]),
+        # Leaves loop back to themselves: the test never sends them right
+        'threshold': np.where(is_leaf, np.inf, tree['threshold'][order]),
+        'left': np.array([new_left.get(node, position) for position, node in enumerate(order)]),
+        'missing_left': np.where(is_leaf, True, tree['missing_left'][order]),
+        'value': tree['value'][order],
+        'depth': max(depth)
+    }
+
+
+def _assemble(trees):
+    """Renumber each tree and concatenate them into one node table"""
+    trees = [_renumber(tree) for tree in trees]
+    offsets = np.cumsum([0] + [len(t['feature']) for t in trees])
+    arrays = {
+        key: np.concatenate([t[key] for t in trees])
+        for key in ('feature', 'threshold', 'missing_left', 'value')
+    }
+    arrays['left'] = np.concatenate([t['left'] + offset for offset, t in zip(offsets, trees)])
+    arrays['roots'] = offsets[:-1]
+    arrays['max_depth'] = max(t['depth'] for t in trees)
+    return arrays
+
+
+def _from_sklearn_forest(model):
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        if tree.n_outputs != 1:
+            raise ValueError("Multi-output forests are not supported")
+        value = tree.value[:, 0, :].astype(np.float64)
+        totals = value.sum(axis=1, keepdims=True)
+        value = value / np.where(totals == 0, 1.0, totals)
+        trees.append({
+            'feature': tree.feature,
+            'threshold': tree.threshold,
+            'left': tree.children_left,
+            'right': tree.children_right,
+            'missing_left': getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool)).astype(bool),
+            'value': value
+        })
+    # sklearn casts features to float32 before comparing them with the thresholds
+    return CompiledForest('mean', classes=model.classes_, n_features=model.n_features_in_,
+                          input_dtype=np.float32, **_assemble(trees))
+
+
+def _from_xgboost(model):
+    learner = json.loads(model.get_booster().save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"XGBoost objective '{objective}' is not supported")
+    booster = learner['gradient_booster']
+    if booster['name'] != 'gbtree':
+        raise ValueError(f"XGBoost booster '{booster['name']}' is not supported")
+
+    trees = []
+    for tree in booster['model']['trees']:
+        if any(tree.get('split_type', [])):
+            raise ValueError("Categorical XGBoost splits are not supported")
+        left = np.asarray(tree['left_children'])
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32).astype(np.float64)
+        is_leaf = left < 0
+        trees.append({
+            'feature': np.asarray(tree['split_indices']),
+            'threshold': np.where(is_leaf, 0.0, conditions),
+            'left': left,
+            'right': np.asarray(tree['right_children']),
+            'missing_left': np.asarray(tree['default_left'], dtype=bool),
+            'value': np.where(is_leaf, conditions, 0.0)[:, np.newaxis]
+        })
+
+    # base_score is a probability, serialized like '[5.120075E-1]' by newer versions
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    return CompiledForest('sigmoid', classes=model.classes_,
+                          n_features=int(learner['learner_model_param']['num_feature']),
+                          strict=True, input_dtype=np.float32,
+                          base_margin=np.log(base_score / (1.0 - base_score)), **_assemble(trees))
+
+
+def _flatten_lightgbm_tree(root):
+    """Nested LightGBM tree_structure -> node arrays (pre-order)"""
+    nodes = []
+    stack = [(root, None, None)]
+    while stack:
+        node, parent, side = stack.pop()
+        index = len(nodes)
+        if parent is not None:
+            nodes[parent][side] = index
+        if 'leaf_value' in node:
+            nodes.append({'feature': 0, 'threshold': 0.0, 'left': -1, 'right': -1,
+                          'missing_left': False, 'value': node['leaf_value']})
+            continue
+        if node['decision_type'] != '<=':
+            raise ValueError(f"LightGBM decision type '{node['decision_type']}' is not supported")
+        missing_type = node.get('missing_type', 'None')
+        if missing_type == 'NaN':
+            missing_left = node['default_left']
+        elif missing_type == 'None':
+            # Without a missing-value split LightGBM compares NaN as 0.0
+            missing_left = 0.0 <= node['threshold']
+        else:
+            raise ValueError(f"LightGBM missing type '{missing_type}' is not supported")
+        nodes.append({'feature': node['split_feature'], 'threshold': node['threshold'], 'left': -1,
+                      'right': -1, 'missing_left': missing_left, 'value': 0.0})
+        stack.append((node['right_child'], index, 'right'))
+        stack.append((node['left_child'], index, 'left'))
+    return {
+        'feature': np.array([n['feature'] for n in nodes]),
+        'threshold': np.array([n['threshold'] for n in nodes], dtype=np.float64),
+        'left': np.array([n['left'] for n in nodes]),
+        'right': np.array([n['right'] for n in nodes]),
+        'missing_left': np.array([n['missing_left'] for n in nodes], dtype=bool),
+        'value': np.array([n['value'] for n in nodes], dtype=np.float64)[:, np.newaxis]
+    }
+
+
+def _from_lightgbm(model):
+    dump = model.booster_.dump_model()
+    objective = dump['objective'].split()
+    if objective[0] != 'binary' or dump['num_class'] != 1 or dump.get('average_output'):
+        raise ValueError(f"LightGBM objective '{dump['objective']}' is not supported")
+    scale = 1.0
+    for option in objective[1:]:
+        if option.startswith('sigmoid:'):
+            scale = float(option.split(':', 1)[1])
+    trees = [_flatten_lightgbm_tree(info['tree_structure']) for info in dump['tree_info']]
+    return CompiledForest('sigmoid', classes=model.classes_, n_features=dump['max_feature_idx'] + 1,
+                          scale=scale, **_assemble(trees))
+
+
+_compiled = weakref.WeakKeyDictionary()
+
+
+def compile_model(model):
+    """
+    Flat-array version of a trained classifier
+
+    Compiled once per model instance (models from the shared cache are
+    compiled once per process).
+
+    Args:
+        model: RandomForestClassifier (or another sklearn forest),
+               XGBClassifier or LGBMClassifier, binary or multi-class
+               for forests and binary for boosters
+
+    Returns:
+        CompiledForest
+
+    Raises:
+        ValueError: For unsupported models or objectives
+    """
+    if isinstance(model, CompiledForest):
+        return model
+    try:
+        return _compiled[model]
+    except (KeyError, TypeError):
+        pass
+
+    module = type(model).__module__
+    if module.startswith('xgboost'):
+        compiled = _from_xgboost(model)
+    elif module.startswith('lightgbm'):
+        compiled = _from_lightgbm(model)
+    elif hasattr(model, 'estimators_') and all(hasattr(e, 'tree_') for e in model.estimators_):
+        compiled = _from_sklearn_forest(model)
+    else:
+        raise ValueError(f"Cannot compile model of type {type(model).__name__}")
+
+    try:
+        _compiled[model] = compiled
+    except TypeError:
+        pass
+    return compiled